@@ -1,12 +1,18 @@
 from flask import Flask
 from flask_cors import CORS
 from backend.app.api.chat import chat_bp
-from backend.app.api.knowledge_graph import kg_bp
+from backend.app.api.knowledge_graph import kg_bp,init_graph_db
+from backend.app.api.metrics import metrics_bp,init_instrumentation
 
-def create_app():
+def create_app(config=None):
     app=Flask(__name__)
+    if config:
+        app.config.update(config)
     CORS(app,supports_credentials=True)
+    init_graph_db(app)
+    init_instrumentation(app)
 
     app.register_blueprint(chat_bp,url_prefix='/chat')
     app.register_blueprint(kg_bp,url_prefix='/knowledge_graph')
+    app.register_blueprint(metrics_bp)
     return app
\ No newline at end of file
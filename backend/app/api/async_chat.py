@@ -0,0 +1,88 @@
+from datetime import datetime
+
+from quart import Blueprint, request, jsonify, current_app
+
+from backend.app.api import async_knowledge_graph
+from backend.app.api.chat import (
+    ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, CHAT_USE_LLM, PLACEHOLDER_ANSWER, admin_authorized, chat_messages,
+    parse_chat_request,
+)
+from backend.app.utils.answer_cache import AnswerCache
+from backend.app.utils.llm_client import AsyncLLMClient
+
+async_chat_bp = Blueprint('async_chat', __name__)
+
+answer_cache = AnswerCache(max_size=ANSWER_CACHE_SIZE,
+                           ttl=ANSWER_CACHE_TTL)
+llm_client = None
+
+
+@async_chat_bp.before_app_serving
+async def open_llm_client():
+    global llm_client
+    llm_client = AsyncLLMClient()
+
+
+@async_chat_bp.after_app_serving
+async def close_llm_client():
+    if llm_client:
+        await llm_client.aclose()
+
+
+async def current_graph_version():
+    """当前图谱版本(使用快照时为快照版本), 图谱不可用时返回None"""
+    provider = async_knowledge_graph.provider
+    if provider.policy.unavailable(provider.health["status"]):
+        return None
+    try:
+        version, _ = await provider.query(lambda source: source.get_graph_version())
+        return version
+    except Exception:
+        current_app.logger.exception("获取图谱版本失败")
+        return None
+
+
+async def generate_answer(message, entities):
+    """生成问答结果, 大模型调用不阻塞事件循环"""
+    if not CHAT_USE_LLM or llm_client is None or not llm_client.configured:
+        return PLACEHOLDER_ANSWER
+    return await llm_client.chat(chat_messages(message))
+
+
+@async_chat_bp.route('/answer_questions', methods=['POST'])
+async def chat():
+    try:
+        user_message, entities, error = parse_chat_request(await request.get_json(silent=True))
+        if error:
+            return jsonify({"error": error}), 400
+
+        graph_version = await current_graph_version()
+        response = answer_cache.get(user_message, entities, graph_version)
+        cached = response is not None
+        if not cached:
+            response = await generate_answer(user_message, entities)
+            answer_cache.put(user_message, response, entities, graph_version)
+
+        return jsonify({
+            "response": response,
+            "cached": cached,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+
+    except Exception as e:
+        current_app.logger.exception("处理问答消息时出错")
+        return jsonify({"error": f"处理问答消息时出错{str(e)}"}), 500
+
+
+@async_chat_bp.route('/cache/stats', methods=['GET'])
+async def cache_stats():
+    return jsonify(answer_cache.stats())
+
+
+@async_chat_bp.route('/cache/invalidate', methods=['POST'])
+async def cache_invalidate():
+    """手动清空本进程的问答缓存, 需要请求头 X-Admin-Token 与 CACHE_ADMIN_TOKEN 一致"""
+    if not admin_authorized(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "无权清空问答缓存"}), 403
+    answer_cache.invalidate()
+    return jsonify({"status": "ok", "message": "问答缓存已清空"})
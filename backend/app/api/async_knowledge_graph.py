@@ -0,0 +1,385 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from functools import wraps
+
+from neo4j import AsyncGraphDatabase
+from quart import Blueprint, jsonify, request, Response, current_app
+
+from backend.app.api.knowledge_graph import (
+    GRAPH_VERSION_TTL,
+    NEO4J_MAX_POOL_SIZE, NEO4J_ACQUISITION_TIMEOUT, NEO4J_CONNECTION_TIMEOUT, NEO4J_HEALTH_INTERVAL,
+    RATE_LIMIT_GET_KG, RATE_LIMIT_GET_KG_LOD, RATE_LIMIT_SEARCH, RATE_LIMIT_NEIGHBORHOOD, RATE_LIMIT_TRUST_PROXY,
+    GRAPH_SOURCE, GRAPH_SNAPSHOT_PATH, LAYOUT_MAX_NODES, NEIGHBORHOOD_LIMIT, NEIGHBORHOOD_MAX_DEPTH,
+    NODES_QUERY, LINKS_QUERY, SEARCH_QUERY, NODE_COUNT_QUERY, REL_COUNT_QUERY, GRAPH_META_QUERY, NEIGHBORHOOD_NODES_QUERY,
+    NEO4J_QUERY_SECONDS, NEO4J_QUERY_ROWS, NEO4J_QUERY_ERRORS,
+    SnapshotKnowledgeGraph, graph_db_settings, graph_version, neighborhood_links_query,
+    node_from_record, link_from_record, graph_args_error, needs_graph_version, prepare_graph, layout_cache,
+)
+from backend.app.utils.graph_snapshot import SnapshotStore
+from backend.app.utils.graph_codec import encode_compact, encode_body, negotiate_encoding
+from backend.app.utils.graph_source import (
+    FALLBACK_ERRORS, RATE_LIMITED_MESSAGE, GraphSourcePolicy, PoolStats,
+    client_key, health_result, rate_limit_retry_after,
+)
+from backend.app.utils.rate_limit import limiter_from_config
+from backend.app.utils.singleflight import AsyncSingleFlight
+
+async_kg_bp = Blueprint('async_knowledge_graph', __name__)
+
+
+class AsyncNeo4jKnowledgeGraph:
+    """Neo4jKnowledgeGraph的异步版本, 查询语句与结果格式保持一致"""
+
+    def __init__(self, uri, username, password,
+                 max_pool_size=NEO4J_MAX_POOL_SIZE,
+                 acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                 connection_timeout=NEO4J_CONNECTION_TIMEOUT):
+        self.driver = AsyncGraphDatabase.driver(
+            uri, auth=(username, password),
+            max_connection_pool_size=max_pool_size,
+            connection_acquisition_timeout=acquisition_timeout,
+            connection_timeout=connection_timeout,
+        )
+        self.max_pool_size = max_pool_size
+        self.acquisition_timeout = acquisition_timeout
+        self._version = None
+        self._version_checked_at = 0.0
+        self._version_lock = asyncio.Lock()
+        self._pool_stats = PoolStats(max_pool_size)
+
+    async def close(self):
+        await self.driver.close()
+
+    @asynccontextmanager
+    async def session(self):
+        """打开会话并记录占用数, 连接数上限与获取连接的超时由驱动的连接池负责(与同步版本一致)"""
+        self._pool_stats.acquired()
+        try:
+            async with self.driver.session() as session:
+                yield session
+        finally:
+            self._pool_stats.released()
+
+    def pool_metrics(self):
+        return self._pool_stats.metrics()
+
+    async def _query(self, session, name, cypher, **params):
+        """执行查询并读取全部结果, 与同步版本记录相同的查询指标"""
+        start = time.perf_counter()
+        try:
+            result = await session.run(cypher, params)
+            records = [record async for record in result]
+        except Exception:
+            NEO4J_QUERY_ERRORS.inc(query=name)
+            raise
+        finally:
+            NEO4J_QUERY_SECONDS.observe(time.perf_counter() - start, query=name)
+        NEO4J_QUERY_ROWS.observe(len(records), query=name)
+        return records
+
+    async def ping(self):
+        """执行一次最简单的查询, 返回耗时(毫秒)"""
+        start = time.perf_counter()
+        async with self.session() as session:
+            await self._query(session, "ping", "RETURN 1 as test")
+        return (time.perf_counter() - start) * 1000
+
+    async def get_graph_version(self, max_age=GRAPH_VERSION_TTL):
+        """获取图谱版本(与同步版本的格式一致), 结果在本地缓存max_age秒"""
+        async with self._version_lock:
+            if self._version is not None and time.monotonic() - self._version_checked_at < max_age:
+                return self._version
+
+            async with self.session() as session:
+                node_count = (await self._query(session, "node_count", NODE_COUNT_QUERY))[0]["count"]
+                rel_count = (await self._query(session, "rel_count", REL_COUNT_QUERY))[0]["count"]
+                meta = await self._query(session, "graph_meta", GRAPH_META_QUERY)
+
+            self._version = graph_version(node_count, rel_count, meta[0]["updated_at"] if meta else None)
+            self._version_checked_at = time.monotonic()
+            return self._version
+
+    async def get_knowledge_graph(self):
+        """从 Neo4j 获取知识图谱数据"""
+        async with self.session() as session:
+            nodes = [node_from_record(record) for record in await self._query(session, "nodes", NODES_QUERY)]
+            links = [link_from_record(record) for record in await self._query(session, "links", LINKS_QUERY)]
+            return {"nodes": nodes, "links": links}
+
+    async def search_nodes(self, query):
+        """搜索节点"""
+        async with self.session() as session:
+            result = await self._query(session, "search", SEARCH_QUERY, query=query)
+            return [node_from_record(record) for record in result]
+
+    async def neighborhood(self, node_id, depth=1, limit=NEIGHBORHOOD_LIMIT):
+        """中心节点depth跳以内的子图, 节点不存在时返回None"""
+        async with self.session() as session:
+            links = [link_from_record(record) for record in await self._query(
+                session, "neighborhood_links", neighborhood_links_query(depth), id=node_id, limit=limit)]
+            ids = {node_id} | {link["source"] for link in links} | {link["target"] for link in links}
+            nodes = [node_from_record(record) for record in await self._query(
+                session, "neighborhood_nodes", NEIGHBORHOOD_NODES_QUERY, ids=sorted(ids))]
+        if not any(node["id"] == node_id for node in nodes):
+            return None
+        return {"center": node_id, "nodes": nodes, "links": links}
+
+
+class AsyncSnapshotKnowledgeGraph:
+    """SnapshotKnowledgeGraph的异步包装, 解码在线程池中执行, 不阻塞事件循环"""
+
+    def __init__(self, snapshot):
+        self._graph = SnapshotKnowledgeGraph(snapshot)
+
+    async def get_graph_version(self):
+        return self._graph.get_graph_version()
+
+    async def get_knowledge_graph(self):
+        return await asyncio.to_thread(self._graph.get_knowledge_graph)
+
+    async def search_nodes(self, query):
+        return await asyncio.to_thread(self._graph.search_nodes, query)
+
+    async def neighborhood(self, node_id, depth=1, limit=NEIGHBORHOOD_LIMIT):
+        return await asyncio.to_thread(self._graph.neighborhood, node_id, depth, limit)
+
+
+class AsyncGraphDBProvider:
+    """
+    GraphDBProvider的异步版本: 数据源选择、回退与状态信息使用相同的GraphSourcePolicy
+    异步驱动需要绑定服务的事件循环, 因此在服务启动时创建(驱动本身在首次查询时才建立连接);
+    后台健康检查与同步版本一样在第一次使用Neo4j时启动
+    """
+
+    def __init__(self, uri, username, password, max_pool_size=NEO4J_MAX_POOL_SIZE,
+                 acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT, health_interval=NEO4J_HEALTH_INTERVAL,
+                 source=GRAPH_SOURCE, snapshot_path=GRAPH_SNAPSHOT_PATH):
+        self.uri = uri
+        self.source = source
+        self.snapshots = SnapshotStore(snapshot_path)
+        self.policy = GraphSourcePolicy(source, self.snapshots, AsyncSnapshotKnowledgeGraph)
+        self.max_pool_size = max_pool_size
+        self.health_interval = health_interval
+        self._graph_db = AsyncNeo4jKnowledgeGraph(uri, username, password, max_pool_size=max_pool_size,
+                                                  acquisition_timeout=acquisition_timeout)
+        self._health = {"status": "unknown", "message": "尚未检查Neo4j连接", "checked_at": None}
+        self._monitor = None
+
+    def get(self):
+        self.start_health_monitor()
+        return self._graph_db
+
+    @property
+    def health(self):
+        return dict(self._health)
+
+    async def query(self, fn):
+        """
+        在当前数据源上执行await fn(source), 规则与GraphDBProvider.query一致
+        Returns:
+            (fn的返回值, 数据源名称 neo4j/snapshot)
+        """
+        snapshot = self.policy.preferred(self._health["status"])
+        if snapshot is not None:
+            return await fn(snapshot), 'snapshot'
+        try:
+            return await fn(self.get()), 'neo4j'
+        except FALLBACK_ERRORS as e:
+            snapshot = self.policy.fallback(e)
+            if snapshot is None:
+                raise
+            current_app.logger.warning("Neo4j不可用, 改用图谱快照", exc_info=True)
+            return await fn(snapshot), 'snapshot'
+
+    async def check_health(self):
+        """执行一次健康检查并更新缓存的状态"""
+        try:
+            health = health_result(latency_ms=await self.get().ping())
+        except Exception as e:
+            health = health_result(error=e)
+        self._health = health
+        return health
+
+    async def current_health(self):
+        """后台检查未在运行时(未配置, 或尚未使用过Neo4j)检查一次, 否则返回缓存的状态"""
+        if self.policy.uses_neo4j and self._monitor is None:
+            return await self.check_health()
+        return self.health
+
+    def pool_metrics(self):
+        return self._graph_db.pool_metrics()
+
+    def start_health_monitor(self):
+        if self.health_interval <= 0 or self._monitor is not None or not self.policy.uses_neo4j:
+            return
+        self._monitor = asyncio.get_running_loop().create_task(self._run_monitor())
+
+    async def _run_monitor(self):
+        while True:
+            if (await self.check_health())["status"] == 'connected':
+                try:
+                    await warm_layout(self._graph_db)
+                except Exception:
+                    pass  # 预计算失败时由请求在后台重新触发
+            await asyncio.sleep(self.health_interval)
+
+    async def close(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        await self._graph_db.close()
+
+
+provider = None
+
+
+@async_kg_bp.before_app_serving
+async def open_graph_db():
+    global provider
+    provider = AsyncGraphDBProvider(**graph_db_settings(current_app.config))
+
+
+@async_kg_bp.after_app_serving
+async def close_graph_db():
+    if provider is not None:
+        await provider.close()
+
+
+@async_kg_bp.route('/test_connection', methods=["GET"])
+async def test_connection():
+    return jsonify({
+        "status": "healthy",
+        "message": "系统运行正常",
+        "database_status": provider.policy.database_status((await provider.current_health())["status"])
+    })
+
+
+kg_flight = AsyncSingleFlight()
+get_kg_limiter = limiter_from_config(RATE_LIMIT_GET_KG)
+get_kg_lod_limiter = limiter_from_config(RATE_LIMIT_GET_KG_LOD)
+search_limiter = limiter_from_config(RATE_LIMIT_SEARCH)
+neighborhood_limiter = limiter_from_config(RATE_LIMIT_NEIGHBORHOOD)
+route_limiters = {'get_kg': get_kg_limiter, 'get_kg_lod': get_kg_lod_limiter,
+                  'search': search_limiter, 'neighborhood': neighborhood_limiter}
+
+
+def get_kg_limiter_for(args):
+    """细节层次预取(top=N)与完整图谱使用各自的限流器"""
+    return get_kg_lod_limiter if args.get('top') else get_kg_limiter
+
+
+def client_id():
+    return client_key(request.remote_addr, request.headers.get('X-Forwarded-For'), RATE_LIMIT_TRUST_PROXY)
+
+
+def rate_limited(limiter):
+    """按客户端限流, 超出时返回429及Retry-After; limiter为限流器, 或按请求参数选择限流器的函数"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            selected = limiter(request.args) if callable(limiter) else limiter
+            retry_after = rate_limit_retry_after(selected, client_id())
+            if retry_after is not None:
+                response = jsonify({"error": RATE_LIMITED_MESSAGE})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            return await view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def warm_layout(graph_db):
+    """warm_layout的异步版本: 布局在线程池中计算"""
+    version = await graph_db.get_graph_version()
+    if layout_cache.version == version:
+        return
+    graph_data = await graph_db.get_knowledge_graph()
+    if len(graph_data["nodes"]) <= LAYOUT_MAX_NODES:
+        await asyncio.to_thread(layout_cache.positions, version, graph_data)
+
+
+async def build_graph_body(graph_db, args, accept_encoding):
+    """查询并序列化图谱, 支持format=compact与gzip/brotli协商"""
+    graph_data = await graph_db.get_knowledge_graph()
+    if needs_graph_version(args):
+        # 布局与图分析为CPU密集计算, 在线程池中执行, 不阻塞事件循环
+        version = await graph_db.get_graph_version()
+        graph_data = await asyncio.to_thread(prepare_graph, graph_data, version, args)
+    if args.get('format') == 'compact':
+        graph_data = encode_compact(graph_data)
+    return await asyncio.to_thread(encode_body, graph_data, accept_encoding)
+
+
+@async_kg_bp.route('/get_kg', methods=['GET'])
+@rate_limited(get_kg_limiter_for)
+async def get_kg():
+    error = graph_args_error(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        args = request.args
+        accept_encoding = request.headers.get('Accept-Encoding')
+        key = ('get_kg', tuple(sorted(args.items(multi=True))), negotiate_encoding(accept_encoding))
+        ((body, encoding), source), _ = await kg_flight.do(
+            key, lambda: provider.query(lambda source: build_graph_body(source, args, accept_encoding)))
+        response = Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['X-Graph-Source'] = source
+        return response
+    except Exception as e:
+        current_app.logger.exception("获取知识图谱失败")
+        return jsonify({"error": f"获取知识图谱失败{str(e)}"}), 500
+
+
+@async_kg_bp.route('/search', methods=['GET'])
+@rate_limited(search_limiter)
+async def search():
+    term = request.args.get('q', '').strip()
+    if not term:
+        return jsonify({"error": "搜索关键词不能为空"}), 400
+    try:
+        (results, source), _ = await kg_flight.do(
+            ('search', term), lambda: provider.query(lambda source: source.search_nodes(term)))
+        response = jsonify({"query": term, "results": results})
+        response.headers['X-Graph-Source'] = source
+        return response
+    except Exception as e:
+        current_app.logger.exception("搜索节点失败")
+        return jsonify({"error": f"搜索节点失败{str(e)}"}), 500
+
+
+@async_kg_bp.route('/neighborhood', methods=['GET'])
+@rate_limited(neighborhood_limiter)
+async def neighborhood():
+    """节点depth跳以内的子图"""
+    node_id = request.args.get('id', '').strip()
+    if not node_id:
+        return jsonify({"error": "节点id不能为空"}), 400
+    depth = min(max(request.args.get('depth', 1, type=int), 1), NEIGHBORHOOD_MAX_DEPTH)
+    try:
+        (subgraph, source), _ = await kg_flight.do(
+            ('neighborhood', node_id, depth), lambda: provider.query(lambda source: source.neighborhood(node_id, depth)))
+    except Exception as e:
+        current_app.logger.exception("获取邻居节点失败")
+        return jsonify({"error": f"获取邻居节点失败{str(e)}"}), 500
+    if subgraph is None:
+        return jsonify({"error": f"节点不存在: {node_id}"}), 404
+    response = jsonify(subgraph)
+    response.headers['X-Graph-Source'] = source
+    return response
+
+
+@async_kg_bp.route('/neo4j/status', methods=['GET'])
+async def neo4j_status():
+    result = provider.policy.status(await provider.current_health(), provider.uri)
+    result["pool"] = provider.pool_metrics()
+    return jsonify(result)
+
+
+@async_kg_bp.route('/neo4j/pool', methods=['GET'])
+async def neo4j_pool():
+    return jsonify(provider.pool_metrics())
@@ -0,0 +1,52 @@
+import time
+
+from quart import Blueprint, Response, current_app, g, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+from backend.app.api import async_knowledge_graph
+from backend.app.api.async_chat import answer_cache
+from backend.app.api.metrics import HTTP_REQUEST_SECONDS, HTTP_RESPONSE_BYTES, HTTP_ERRORS, rule_label, service_collector
+from backend.app.utils.metrics import REGISTRY, CONTENT_TYPE
+
+async_metrics_bp = Blueprint('async_metrics', __name__)
+
+
+async def before_request():
+    g._request_start = time.perf_counter()
+
+
+async def after_request(response):
+    """记录与Flask版本相同的请求指标(按请求剖析只在wsgi模式下提供)"""
+    start = g.pop('_request_start', None)
+    if start is None:
+        return response
+    route = rule_label(request.url_rule)
+    status = str(response.status_code)
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route, status=status)
+    if response.content_length is not None:
+        HTTP_RESPONSE_BYTES.observe(response.content_length, route=route)
+    if response.status_code >= 500:
+        HTTP_ERRORS.inc(route=route, status=status)
+    return response
+
+
+async def handle_unexpected_error(e):
+    if isinstance(e, HTTPException):
+        return e
+    current_app.logger.exception("处理请求时出错")
+    return jsonify({"error": f"服务器内部错误{str(e)}"}), 500
+
+
+def init_async_instrumentation(app):
+    """create_async_app中注册请求指标与统一错误处理, 指标与/metrics的格式与Flask版本一致"""
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.register_error_handler(Exception, handle_unexpected_error)
+    REGISTRY.register_collector('app', service_collector(
+        lambda: async_knowledge_graph.provider, async_knowledge_graph.kg_flight,
+        async_knowledge_graph.route_limiters, answer_cache))
+
+
+@async_metrics_bp.route('/metrics', methods=['GET'])
+async def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
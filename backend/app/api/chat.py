@@ -1,23 +1,127 @@
-from flask import Blueprint,request,jsonify
+from flask import Blueprint,request,jsonify,current_app
 from datetime import datetime
+import hmac
+from backend.app.api.knowledge_graph import get_graph_provider
+from backend.app.utils.answer_cache import AnswerCache
+from backend.app.utils.llm_client import LLMClient
+import os
+import threading
 
 chat_bp=Blueprint('chat',__name__)
 
+# 问答缓存配置
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '1024'))
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '3600'))
+# 手动清空缓存接口的令牌(请求头X-Admin-Token), 未设置时该接口不可用
+CACHE_ADMIN_TOKEN = os.getenv('CACHE_ADMIN_TOKEN', '')
+# 是否调用大模型生成回答(未开启时返回占位回答)
+CHAT_USE_LLM = os.getenv('CHAT_USE_LLM', '0') == '1'
+CHAT_SYSTEM_PROMPT = "你是急诊科医疗知识助手, 请基于医学知识简洁、准确地回答问题。"
+PLACEHOLDER_ANSWER = "问答接口尚需开发，请等待"
+
+answer_cache=AnswerCache(max_size=ANSWER_CACHE_SIZE,
+                         ttl=ANSWER_CACHE_TTL)
+# 大模型客户端在第一次调用时创建(gunicorn fork出worker之后), 各worker使用各自的连接池
+_llm_client=None
+_llm_client_lock=threading.Lock()
+
+
+def current_graph_version():
+    """当前图谱版本(使用快照时为快照版本), 图谱不可用时返回None(缓存仍可用, 但不会随图谱更新失效)"""
+    provider=get_graph_provider()
+    if provider.policy.unavailable(provider.health["status"]):
+        return None
+    try:
+        version,_=provider.query(lambda graph_db: graph_db.get_graph_version())
+        return version
+    except Exception:
+        current_app.logger.exception("获取图谱版本失败")
+        return None
+
+
+def admin_authorized(token):
+    return bool(CACHE_ADMIN_TOKEN) and hmac.compare_digest(token or '',CACHE_ADMIN_TOKEN)
+
+
+def parse_chat_request(data):
+    """
+    校验问答请求体
+    Returns:
+        (message, entities, error), 请求有误时error为错误信息
+    """
+    if not isinstance(data,dict):
+        return None,None,"请求体必须为JSON对象"
+    message=data.get('message','')
+    if not isinstance(message,str) or not message.strip():
+        return None,None,"消息不能为空"
+    entities=data.get('entities',[])
+    if not isinstance(entities,list) or not all(isinstance(e,str) and e for e in entities):
+        return None,None,"entities必须为实体ID(非空字符串)的列表"
+    return message.strip(),entities,None
+
+
+def chat_messages(message):
+    return [
+        {"role":"system","content":CHAT_SYSTEM_PROMPT},
+        {"role":"user","content":message}
+    ]
+
+
+def get_llm_client():
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client=LLMClient()
+        return _llm_client
+
+
+def generate_answer(message, entities):
+    """生成问答结果(检索+大模型调用), 大模型调用期间占用当前工作线程"""
+    if not CHAT_USE_LLM:
+        return PLACEHOLDER_ANSWER
+    client=get_llm_client()
+    if not client.configured:
+        return PLACEHOLDER_ANSWER
+    return client.chat(chat_messages(message))
+
+
 @chat_bp.route('/answer_questions',methods=['POST'])
 def chat():
     try:
-        data=request.get_json()
-        user_message=data.get('message','').strip()
+        user_message,entities,error=parse_chat_request(request.get_json(silent=True))
+        if error:
+            return jsonify({"error":error}),400
 
-        if not user_message:
-            return jsonify({"error":"消息不能为空"}),400
-
-        response="问答接口尚需开发，请等待"
+        graph_version=current_graph_version()
+        response=answer_cache.get(user_message,entities,graph_version)
+        cached=response is not None
+        if not cached:
+            response=generate_answer(user_message,entities)
+            answer_cache.put(user_message,response,entities,graph_version)
 
         return jsonify({
             "response":response,
+            "cached":cached,
             "timestamp":datetime.utcnow().isoformat()
         })
 
     except Exception as e:
+        current_app.logger.exception("处理问答消息时出错")
         return jsonify({"error":f"处理问答消息时出错{str(e)}"}),500
+
+
+@chat_bp.route('/cache/stats',methods=['GET'])
+def cache_stats():
+    return jsonify(answer_cache.stats())
+
+
+@chat_bp.route('/cache/invalidate',methods=['POST'])
+def cache_invalidate():
+    """
+    手动清空本进程的问答缓存; 图谱更新后版本变化, 缓存会自动失效, 无需调用本接口
+    需要请求头 X-Admin-Token 与 CACHE_ADMIN_TOKEN 一致
+    """
+    if not admin_authorized(request.headers.get('X-Admin-Token')):
+        return jsonify({"error":"无权清空问答缓存"}),403
+    answer_cache.invalidate()
+    return jsonify({"status":"ok","message":"问答缓存已清空"})
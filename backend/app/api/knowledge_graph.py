@@ -1,199 +1,698 @@
-from flask import Blueprint,jsonify,request
+from flask import Blueprint,jsonify,request,current_app,Response
 from neo4j import GraphDatabase
+from backend.app.utils.graph_codec import encode_compact,encode_body,negotiate_encoding
+from backend.app.utils.graph_layout import LayoutCache,attach_positions
+from backend.app.utils.graph_analytics import AnalyticsCache,attach_metrics,top_n_subgraph
+from backend.app.utils.rate_limit import limiter_from_config
+from backend.app.utils.singleflight import SingleFlight
+from backend.app.utils.metrics import REGISTRY,ROW_BUCKETS
+from backend.app.utils.graph_snapshot import SEARCH_PROPERTY_KEYS,SnapshotStore,search_text
+from backend.app.utils.graph_source import (FALLBACK_ERRORS,RATE_LIMITED_MESSAGE,GraphSourcePolicy,PoolStats,
+                                            client_key,health_result,idle_pool_metrics,rate_limit_retry_after)
+from contextlib import contextmanager
+from functools import wraps
 import os
+import threading
+import time
 
 kg_bp=Blueprint('knowledge_graph',__name__)
 
+NEO4J_QUERY_SECONDS=REGISTRY.histogram('neo4j_query_duration_seconds','Neo4j查询耗时(含结果读取)',('query',))
+NEO4J_QUERY_ROWS=REGISTRY.histogram('neo4j_query_rows','Neo4j查询返回的行数',('query',),buckets=ROW_BUCKETS)
+NEO4J_QUERY_ERRORS=REGISTRY.counter('neo4j_query_errors_total','Neo4j查询失败次数',('query',))
+
 # Neo4j连接配置
 NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
 NEO4J_USERNAME = os.getenv('NEO4J_USERNAME', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'aqzdwsfneo')
+# 连接池配置: 最大连接数与获取连接的超时时间(秒)
+NEO4J_MAX_POOL_SIZE = int(os.getenv('NEO4J_MAX_POOL_SIZE', '50'))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv('NEO4J_ACQUISITION_TIMEOUT', '10'))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv('NEO4J_CONNECTION_TIMEOUT', '5'))
+# 后台健康检查间隔(秒), 为0时不启动后台检查
+NEO4J_HEALTH_INTERVAL = float(os.getenv('NEO4J_HEALTH_INTERVAL', '15'))
+# 图谱版本的本地缓存时间(秒), 避免每次请求都查询计数
+GRAPH_VERSION_TTL = float(os.getenv('GRAPH_VERSION_TTL', '10'))
+# 高开销接口的每客户端限流, 格式为 "次数/秒数", 设为空字符串时不限流; 各路由分别计数,
+# 细节层次预取(get_kg?top=N)与完整图谱分开计数(前端每次打开图谱页面各请求一次)。
+# 计数保存在各进程内, gunicorn/uvicorn启动N个worker时每个客户端的实际上限约为N倍;
+# 同一NAT或代理之后的浏览器共用一个IP, 上限按整个出口而不是单个用户估算
+RATE_LIMIT_GET_KG = os.getenv('RATE_LIMIT_GET_KG', '120/60')
+RATE_LIMIT_GET_KG_LOD = os.getenv('RATE_LIMIT_GET_KG_LOD', '120/60')
+RATE_LIMIT_SEARCH = os.getenv('RATE_LIMIT_SEARCH', '120/60')
+RATE_LIMIT_NEIGHBORHOOD = os.getenv('RATE_LIMIT_NEIGHBORHOOD', '240/60')
+# 部署在反向代理之后时, 按X-Forwarded-For的第一个地址识别客户端
+RATE_LIMIT_TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', '0') == '1'
+# 图谱数据源: neo4j / snapshot(只读副本, 不连接Neo4j) / auto(Neo4j不可用时改用快照)
+GRAPH_SOURCE = os.getenv('GRAPH_SOURCE', 'auto')
+# 构建脚本写出的图谱快照文件, 未设置时不使用快照
+GRAPH_SNAPSHOT_PATH = os.getenv('GRAPH_SNAPSHOT_PATH', '')
+# 服务端预计算布局的最大节点数; 超过时layout=1不附加坐标, 由前端自行布局,
+# 避免在请求中长时间计算(2万节点的首次布局约5秒, 之后按图谱版本缓存)
+LAYOUT_MAX_NODES = int(os.getenv('LAYOUT_MAX_NODES', '20000'))
+# 邻居查询的最大跳数与返回的最大关系数
+NEIGHBORHOOD_MAX_DEPTH = int(os.getenv('NEIGHBORHOOD_MAX_DEPTH', '2'))
+NEIGHBORHOOD_LIMIT = int(os.getenv('NEIGHBORHOOD_LIMIT', '500'))
+
+
+# 映射实体类型到颜色组
+GROUP_MAPPING = {
+    "疾病": "disease",
+    "治疗": "treatment",
+    "检查": "examination",
+    "药物": "medication",
+    "生命体征": "vital_signs",
+    "并发症": "complication"
+}
+
+# 节点查询的返回列，适配新的实体类型
+NODE_COLUMNS = """
+           n.id as id, 
+           n.name as name, 
+           labels(n)[0] as entityType,
+           CASE 
+            WHEN labels(n)[0] = '疾病' THEN n.严重程度
+            WHEN labels(n)[0] = '治疗' THEN n.紧急程度
+            WHEN labels(n)[0] = '检查' THEN n.检查目的
+            WHEN labels(n)[0] = '药物' THEN n.用药途径
+            WHEN labels(n)[0] = '生命体征' THEN n.正常范围
+            WHEN labels(n)[0] = '并发症' THEN n.发生率
+            ELSE null
+           END as properties"""
+
+# 关系查询的返回列，适配新的关系类型
+LINK_COLUMNS = """
+           type(r) as relationshipType,
+           CASE 
+            WHEN type(r) = '需要治疗' THEN {时机: r.时机, 顺序: r.顺序, 条件: r.条件}
+            WHEN type(r) = '需要检查' THEN {频率: r.频率, 目的: r.目的}
+            WHEN type(r) = '使用药物' THEN {剂量: r.剂量, 给药方式: r.给药方式, 使用时机: r.使用时机, 注意事项: r.注意事项}
+            WHEN type(r) = '监测指标' THEN {监测频率: r.监测频率, 目标值: r.目标值}
+            WHEN type(r) = '引起并发症' THEN {发生率: r.发生率, 条件: r.条件}
+            ELSE {}
+           END as properties"""
+
+# 获取所有节点(不含图谱元数据节点)
+NODES_QUERY = f"""
+    MATCH (n)
+    WHERE NOT n:GraphMeta
+    RETURN {NODE_COLUMNS}
+    ORDER BY id
+"""
+
+# 获取所有关系
+LINKS_QUERY = f"""
+    MATCH (a)-[r]->(b)
+    RETURN a.id as source, 
+           b.id as target, {LINK_COLUMNS}
+    ORDER BY source
+"""
+
+SEARCH_QUERY = f"""
+    MATCH (n)
+    WHERE toLower(n.name) CONTAINS toLower($query) 
+       OR toLower(n.症状描述) CONTAINS toLower($query)
+       OR toLower(n.注意事项) CONTAINS toLower($query)
+    RETURN {NODE_COLUMNS}
+    LIMIT 20
+"""
+
+# 邻居查询: 中心节点depth跳以内的关系(不区分方向); 可变长度路径的上限不能参数化, 由neighborhood_links_query填入
+NEIGHBORHOOD_LINKS_QUERY = """
+    MATCH (c {{id: $id}})-[rels*1..{depth}]-()
+    UNWIND rels AS r
+    WITH DISTINCT r LIMIT $limit
+    WITH startNode(r) AS a, r, endNode(r) AS b
+    RETURN a.id as source, 
+           b.id as target, {columns}
+"""
+
+NEIGHBORHOOD_NODES_QUERY = f"""
+    MATCH (n)
+    WHERE n.id IN $ids
+    RETURN {NODE_COLUMNS}
+    ORDER BY id
+"""
+
+NODE_COUNT_QUERY = "MATCH (n) WHERE NOT n:GraphMeta RETURN count(n) as count"
+REL_COUNT_QUERY = "MATCH ()-[r]->() RETURN count(r) as count"
+# 导出快照时每个节点参与搜索的字段, 与SEARCH_QUERY匹配的属性一致
+SEARCH_TEXT_QUERY = """
+    MATCH (n)
+    WHERE NOT n:GraphMeta
+    RETURN n.id as id, n.name as name, n.症状描述 as 症状描述, n.注意事项 as 注意事项
+"""
+# 构建脚本每次写入后更新的元数据节点, 只修改属性(节点数与关系数不变)时图谱版本同样变化
+GRAPH_META_QUERY = "MATCH (m:GraphMeta {key: 'graph'}) RETURN m.updated_at as updated_at"
+
+
+def graph_version(node_count, rel_count, updated_at=None):
+    """图谱版本: 节点数-关系数, 存在元数据节点时附加最近一次构建的时间"""
+    version = f"{node_count}-{rel_count}"
+    return f"{version}-{updated_at}" if updated_at else version
+
+
+def neighborhood_links_query(depth):
+    return NEIGHBORHOOD_LINKS_QUERY.format(depth=int(depth), columns=LINK_COLUMNS)
+
+
+def node_from_record(record):
+    """节点查询结果转换为前端使用的节点字典"""
+    entity_type = record["entityType"]
+    name = record["name"] or record["id"]
+    return {
+        "id": record["id"],
+        "label": name,
+        "group": GROUP_MAPPING.get(entity_type, "other"),
+        "type": entity_type,
+        "properties": record["properties"]
+    }
+
+
+def link_weight(relationship_type):
+    """简化关系权重用于可视化"""
+    weight = 1
+    if "治疗" in relationship_type:
+        weight = 3
+    elif "药物" in relationship_type:
+        weight = 2
+    elif "检查" in relationship_type or "监测" in relationship_type:
+        weight = 1
+    elif "并发症" in relationship_type:
+        weight = 2
+    return weight
+
+
+def link_from_record(record):
+    """关系查询结果转换为前端使用的连线字典"""
+    relationship_type = record["relationshipType"]
+    return {
+        "source": record["source"],
+        "target": record["target"],
+        "value": link_weight(relationship_type),
+        "relationshipType": relationship_type,
+        "properties": record["properties"]
+    }
 
 
 class Neo4jKnowledgeGraph:
-    def __init__(self, uri, username, password):
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
+    def __init__(self, uri, username, password,
+                 max_pool_size=NEO4J_MAX_POOL_SIZE,
+                 acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                 connection_timeout=NEO4J_CONNECTION_TIMEOUT):
+        self.driver = GraphDatabase.driver(
+            uri, auth=(username, password),
+            max_connection_pool_size=max_pool_size,
+            connection_acquisition_timeout=acquisition_timeout,
+            connection_timeout=connection_timeout,
+        )
+        self.max_pool_size = max_pool_size
+        self.acquisition_timeout = acquisition_timeout
+        self._version = None
+        self._version_checked_at = 0.0
+        self._version_lock = threading.Lock()
+        self._pool_stats = PoolStats(max_pool_size)
 
     def close(self):
         self.driver.close()
 
+    @contextmanager
+    def session(self):
+        """
+        打开会话并记录占用数; 连接数上限与获取连接的超时由驱动的连接池负责
+        (max_connection_pool_size / connection_acquisition_timeout)
+        """
+        self._pool_stats.acquired()
+        try:
+            with self.driver.session() as session:
+                yield session
+        finally:
+            self._pool_stats.released()
+
+    def pool_metrics(self):
+        """会话指标: 连接池上限、当前与历史最多同时使用的会话数"""
+        return self._pool_stats.metrics()
+
+    def _query(self, session, name, cypher, **params):
+        """执行查询并读取全部结果, 记录耗时、返回行数与失败次数"""
+        start = time.perf_counter()
+        try:
+            # 参数以字典传入, 避免与Session.run自身的query参数重名(如搜索的$query)
+            records = list(session.run(cypher, params))
+        except Exception:
+            NEO4J_QUERY_ERRORS.inc(query=name)
+            raise
+        finally:
+            NEO4J_QUERY_SECONDS.observe(time.perf_counter() - start, query=name)
+        NEO4J_QUERY_ROWS.observe(len(records), query=name)
+        return records
+
+    def ping(self):
+        """执行一次最简单的查询, 返回耗时(毫秒)"""
+        start = time.perf_counter()
+        with self.session() as session:
+            self._query(session, "ping", "RETURN 1 as test")
+        return (time.perf_counter() - start) * 1000
+
+    def get_graph_version(self, max_age=GRAPH_VERSION_TTL):
+        """
+        获取图谱版本(节点数、关系数与最近一次构建时间组成的指纹), 图谱增删节点或关系、
+        构建脚本重新写入后版本随之变化; 结果在本地缓存max_age秒
+        """
+        with self._version_lock:
+            if self._version is not None and time.monotonic() - self._version_checked_at < max_age:
+                return self._version
+
+            with self.session() as session:
+                node_count = self._query(session, "node_count", NODE_COUNT_QUERY)[0]["count"]
+                rel_count = self._query(session, "rel_count", REL_COUNT_QUERY)[0]["count"]
+                meta = self._query(session, "graph_meta", GRAPH_META_QUERY)
+
+            self._version = graph_version(node_count, rel_count, meta[0]["updated_at"] if meta else None)
+            self._version_checked_at = time.monotonic()
+            return self._version
+
     def get_knowledge_graph(self):
         """从 Neo4j 获取知识图谱数据"""
-        with self.driver.session() as session:
-            # 获取所有节点，适配新的实体类型
-            nodes_result = session.run("""
-                MATCH (n)
-                RETURN n.id as id, 
-                       n.name as name, 
-                       labels(n)[0] as entityType,
-                       CASE 
-                        WHEN labels(n)[0] = '疾病' THEN n.严重程度
-                        WHEN labels(n)[0] = '治疗' THEN n.紧急程度
-                        WHEN labels(n)[0] = '检查' THEN n.检查目的
-                        WHEN labels(n)[0] = '药物' THEN n.用药途径
-                        WHEN labels(n)[0] = '生命体征' THEN n.正常范围
-                        WHEN labels(n)[0] = '并发症' THEN n.发生率
-                        ELSE null
-                       END as properties
-                ORDER BY id
-            """)
-            nodes = []
-            for record in nodes_result:
-                entity_type = record["entityType"]
-                name = record["name"] or record["id"]
-
-                # 映射实体类型到颜色组
-                group_mapping = {
-                    "疾病": "disease",
-                    "治疗": "treatment",
-                    "检查": "examination",
-                    "药物": "medication",
-                    "生命体征": "vital_signs",
-                    "并发症": "complication"
-                }
-
-                nodes.append({
-                    "id": record["id"],
-                    "label": name,
-                    "group": group_mapping.get(entity_type, "other"),
-                    "type": entity_type,
-                    "properties": record["properties"]
-                })
-
-            # 获取所有关系，适配新的关系类型
-            links_result = session.run("""
-                MATCH (a)-[r]->(b)
-                RETURN a.id as source, 
-                       b.id as target, 
-                       type(r) as relationshipType,
-                       CASE 
-                        WHEN type(r) = '需要治疗' THEN {时机: r.时机, 顺序: r.顺序, 条件: r.条件}
-                        WHEN type(r) = '需要检查' THEN {频率: r.频率, 目的: r.目的}
-                        WHEN type(r) = '使用药物' THEN {剂量: r.剂量, 给药方式: r.给药方式, 使用时机: r.使用时机, 注意事项: r.注意事项}
-                        WHEN type(r) = '监测指标' THEN {监测频率: r.监测频率, 目标值: r.目标值}
-                        WHEN type(r) = '引起并发症' THEN {发生率: r.发生率, 条件: r.条件}
-                        ELSE {}
-                       END as properties
-                ORDER BY source
-            """)
-            links = []
-            for record in links_result:
-                relationship_type = record["relationshipType"]
-
-                # 简化关系权重用于可视化
-                weight = 1
-                if "治疗" in relationship_type:
-                    weight = 3
-                elif "药物" in relationship_type:
-                    weight = 2
-                elif "检查" in relationship_type or "监测" in relationship_type:
-                    weight = 1
-                elif "并发症" in relationship_type:
-                    weight = 2
-
-                links.append({
-                    "source": record["source"],
-                    "target": record["target"],
-                    "value": weight,
-                    "relationshipType": relationship_type,
-                    "properties": record["properties"]
-                })
-
+        with self.session() as session:
+            nodes = [node_from_record(record) for record in self._query(session, "nodes", NODES_QUERY)]
+            links = [link_from_record(record) for record in self._query(session, "links", LINKS_QUERY)]
             return {"nodes": nodes, "links": links}
 
+    def export_records(self):
+        """
+        导出完整图谱用于写入快照
+        Returns:
+            (node_records, link_records, search_texts, graph_updated_at), 记录与NODES_QUERY/LINKS_QUERY返回列一致,
+            属性保留Neo4j中的类型; 搜索文本包含SEARCH_QUERY匹配的属性
+        """
+        with self.session() as session:
+            node_records = [dict(record) for record in self._query(session, "nodes", NODES_QUERY)]
+            link_records = [dict(record) for record in self._query(session, "links", LINKS_QUERY)]
+            texts = {record["id"]: search_text(record["name"], *(record[k] for k in SEARCH_PROPERTY_KEYS))
+                     for record in self._query(session, "search_text", SEARCH_TEXT_QUERY)}
+            meta = self._query(session, "graph_meta", GRAPH_META_QUERY)
+        search_texts = [texts.get(record["id"], record["name"] or "") for record in node_records]
+        return node_records, link_records, search_texts, meta[0]["updated_at"] if meta else None
+
     def search_nodes(self, query):
         """搜索节点"""
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (n)
-                WHERE toLower(n.name) CONTAINS toLower($query) 
-                   OR toLower(n.症状描述) CONTAINS toLower($query)
-                   OR toLower(n.注意事项) CONTAINS toLower($query)
-                RETURN n.id as id, 
-                       n.name as name, 
-                       labels(n)[0] as entityType,
-                       CASE 
-                        WHEN labels(n)[0] = '疾病' THEN n.严重程度
-                        WHEN labels(n)[0] = '治疗' THEN n.紧急程度
-                        WHEN labels(n)[0] = '检查' THEN n.检查目的
-                        WHEN labels(n)[0] = '药物' THEN n.用药途径
-                        WHEN labels(n)[0] = '生命体征' THEN n.正常范围
-                        WHEN labels(n)[0] = '并发症' THEN n.发生率
-                        ELSE null
-                       END as properties
-                LIMIT 20
-            """, query=query)
-
-            nodes = []
-            for record in result:
-                entity_type = record["entityType"]
-                name = record["name"] or record["id"]
-
-                # 映射实体类型到颜色组
-                group_mapping = {
-                    "疾病": "disease",
-                    "治疗": "treatment",
-                    "检查": "examination",
-                    "药物": "medication",
-                    "生命体征": "vital_signs",
-                    "并发症": "complication"
-                }
-
-                nodes.append({
-                    "id": record["id"],
-                    "label": name,
-                    "group": group_mapping.get(entity_type, "other"),
-                    "type": entity_type,
-                    "properties": record["properties"]
-                })
-
-            return nodes
-
-graph_db=Neo4jKnowledgeGraph(NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD)
+        with self.session() as session:
+            result = self._query(session, "search", SEARCH_QUERY, query=query)
+            return [node_from_record(record) for record in result]
+
+    def neighborhood(self, node_id, depth=1, limit=NEIGHBORHOOD_LIMIT):
+        """
+        中心节点depth跳以内的关系及其端点
+        Returns:
+            与get_knowledge_graph相同格式的子图(附带center字段), 节点不存在时返回None
+        """
+        with self.session() as session:
+            links = [link_from_record(record) for record in self._query(
+                session, "neighborhood_links", neighborhood_links_query(depth), id=node_id, limit=limit)]
+            ids = {node_id} | {link["source"] for link in links} | {link["target"] for link in links}
+            nodes = [node_from_record(record) for record in self._query(
+                session, "neighborhood_nodes", NEIGHBORHOOD_NODES_QUERY, ids=sorted(ids))]
+        if not any(node["id"] == node_id for node in nodes):
+            return None
+        return {"center": node_id, "nodes": nodes, "links": links}
+
+
+class SnapshotKnowledgeGraph:
+    """基于图谱快照的只读数据源, 接口与Neo4jKnowledgeGraph一致"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def get_graph_version(self, max_age=None):
+        return self.snapshot.version
+
+    def get_knowledge_graph(self):
+        return {
+            "nodes": [node_from_record(record) for record in self.snapshot.node_records()],
+            "links": [link_from_record(record) for record in self.snapshot.link_records()],
+        }
+
+    def search_nodes(self, query):
+        return [node_from_record(record) for record in self.snapshot.search(query)]
+
+    def neighborhood(self, node_id, depth=1, limit=NEIGHBORHOOD_LIMIT):
+        result = self.snapshot.neighborhood(node_id, depth, limit)
+        if result is None:
+            return None
+        node_records, link_records = result
+        return {
+            "center": node_id,
+            "nodes": [node_from_record(record) for record in node_records],
+            "links": [link_from_record(record) for record in link_records],
+        }
+
+
+class GraphDBProvider:
+    """
+    Neo4j连接的延迟创建与健康状态缓存
+    驱动在第一次使用时创建, 同时启动后台线程定期检查连接, 之后状态接口直接读取内存中的结果
+    """
+
+    def __init__(self, uri, username, password, max_pool_size=NEO4J_MAX_POOL_SIZE,
+                 acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT, health_interval=NEO4J_HEALTH_INTERVAL,
+                 source=GRAPH_SOURCE, snapshot_path=GRAPH_SNAPSHOT_PATH):
+        self.uri = uri
+        self.source = source
+        self.snapshots = SnapshotStore(snapshot_path)
+        self.policy = GraphSourcePolicy(source, self.snapshots, SnapshotKnowledgeGraph)
+        self._username = username
+        self._password = password
+        self.max_pool_size = max_pool_size
+        self.acquisition_timeout = acquisition_timeout
+        self.health_interval = health_interval
+
+        self._graph_db = None
+        self._lock = threading.Lock()
+        self._health = {"status": "unknown", "message": "尚未检查Neo4j连接", "checked_at": None}
+        self._monitor = None
+        self._stop = threading.Event()
+
+    def get(self):
+        """获取(必要时创建)Neo4jKnowledgeGraph实例"""
+        if self._graph_db is None:
+            with self._lock:
+                if self._graph_db is None:
+                    self._graph_db = Neo4jKnowledgeGraph(
+                        self.uri, self._username, self._password,
+                        max_pool_size=self.max_pool_size,
+                        acquisition_timeout=self.acquisition_timeout,
+                    )
+                    self.start_health_monitor()
+        return self._graph_db
+
+    @property
+    def created(self):
+        return self._graph_db is not None
+
+    def snapshot_source(self):
+        """快照数据源, 未配置或文件不存在时返回None"""
+        return self.policy.snapshot_source()
+
+    def query(self, fn):
+        """
+        在当前数据源上执行fn(source), 选择与回退规则见GraphSourcePolicy
+        Returns:
+            (fn的返回值, 数据源名称 neo4j/snapshot)
+        """
+        snapshot = self.policy.preferred(self._health["status"])
+        if snapshot is not None:
+            return fn(snapshot), 'snapshot'
+        try:
+            return fn(self.get()), 'neo4j'
+        except FALLBACK_ERRORS as e:
+            snapshot = self.policy.fallback(e)
+            if snapshot is None:
+                raise
+            current_app.logger.warning("Neo4j不可用, 改用图谱快照", exc_info=True)
+            return fn(snapshot), 'snapshot'
+
+    def check_health(self):
+        """执行一次健康检查并更新缓存的状态"""
+        try:
+            health = health_result(latency_ms=self.get().ping())
+        except Exception as e:
+            health = health_result(error=e)
+        self._health = health
+        return health
+
+    @property
+    def health(self):
+        return dict(self._health)
+
+    def current_health(self):
+        """
+        后台检查未在运行时(未配置, 或驱动尚未创建)同步检查一次, 否则返回缓存的状态;
+        同步检查会创建驱动并启动后台检查
+        """
+        if self.policy.uses_neo4j and self._monitor is None:
+            return self.check_health()
+        return self.health
+
+    def pool_metrics(self):
+        if self._graph_db is None:
+            return idle_pool_metrics(self.max_pool_size)
+        return self._graph_db.pool_metrics()
+
+    def start_health_monitor(self):
+        """启动后台健康检查线程(守护线程), 在驱动创建时调用; 只读快照模式下不连接Neo4j"""
+        if self.health_interval <= 0 or self._monitor is not None or not self.policy.uses_neo4j:
+            return
+        self._monitor = threading.Thread(target=self._run_monitor, name='neo4j-health', daemon=True)
+        self._monitor.start()
+
+    def _run_monitor(self):
+        while not self._stop.is_set():
+            if self.check_health()["status"] == 'connected':
+                try:
+                    warm_layout(self._graph_db)
+                except Exception:
+                    pass  # 预计算失败时由请求在后台重新触发
+            self._stop.wait(self.health_interval)
+
+    def close(self):
+        self._stop.set()
+        if self._graph_db is not None:
+            self._graph_db.close()
+            self._graph_db = None
+
+
+def graph_db_settings(config):
+    """从应用配置读取Neo4j连接与数据源设置(未配置的项使用环境变量), Flask与Quart版本共用"""
+    return dict(
+        uri=config.get('NEO4J_URI', NEO4J_URI),
+        username=config.get('NEO4J_USERNAME', NEO4J_USERNAME),
+        password=config.get('NEO4J_PASSWORD', NEO4J_PASSWORD),
+        max_pool_size=config.get('NEO4J_MAX_POOL_SIZE', NEO4J_MAX_POOL_SIZE),
+        acquisition_timeout=config.get('NEO4J_ACQUISITION_TIMEOUT', NEO4J_ACQUISITION_TIMEOUT),
+        health_interval=config.get('NEO4J_HEALTH_INTERVAL', NEO4J_HEALTH_INTERVAL),
+        source=config.get('GRAPH_SOURCE', GRAPH_SOURCE),
+        snapshot_path=config.get('GRAPH_SNAPSHOT_PATH', GRAPH_SNAPSHOT_PATH),
+    )
+
+
+def init_graph_db(app):
+    """在应用工厂中注册Neo4j连接(不立即创建驱动)"""
+    provider = GraphDBProvider(**graph_db_settings(app.config))
+    app.extensions['neo4j'] = provider
+    return provider
+
+
+def get_graph_provider():
+    return current_app.extensions['neo4j']
+
+
+def get_graph_db():
+    return get_graph_provider().get()
+
 
 @kg_bp.route('/test_connection', methods=["GET"])
 def test_connection():
-    try:
-        if graph_db:
-            database_status="Neo4j数据库状态正常"
+    provider=get_graph_provider()
+    return jsonify({
+        "status":"healthy",
+        "message":"系统运行正常",
+        "database_status":provider.policy.database_status(provider.current_health()["status"])
+    })
+
+
+# 按图谱版本缓存的节点布局坐标与图分析结果
+layout_cache=LayoutCache()
+analytics_cache=AnalyticsCache()
+
+# 相同路由和参数的并发请求共享同一次Neo4j查询与序列化结果
+kg_flight=SingleFlight()
+get_kg_limiter=limiter_from_config(RATE_LIMIT_GET_KG)
+get_kg_lod_limiter=limiter_from_config(RATE_LIMIT_GET_KG_LOD)
+search_limiter=limiter_from_config(RATE_LIMIT_SEARCH)
+neighborhood_limiter=limiter_from_config(RATE_LIMIT_NEIGHBORHOOD)
+# {路由: 限流器}, 用于/metrics中的被拒绝次数
+route_limiters={'get_kg':get_kg_limiter,'get_kg_lod':get_kg_lod_limiter,
+                'search':search_limiter,'neighborhood':neighborhood_limiter}
+
+
+def get_kg_limiter_for(args):
+    """细节层次预取(top=N)与完整图谱使用各自的限流器"""
+    return get_kg_lod_limiter if args.get('top') else get_kg_limiter
+
+
+def client_id():
+    return client_key(request.remote_addr,request.headers.get('X-Forwarded-For'),RATE_LIMIT_TRUST_PROXY)
+
+
+def rate_limited(limiter):
+    """
+    按客户端限流, 超出时返回429及Retry-After
+    limiter为限流器, 或按请求参数选择限流器的函数
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args,**kwargs):
+            selected=limiter(request.args) if callable(limiter) else limiter
+            retry_after=rate_limit_retry_after(selected,client_id())
+            if retry_after is not None:
+                response=jsonify({"error":RATE_LIMITED_MESSAGE})
+                response.status_code=429
+                response.headers['Retry-After']=str(retry_after)
+                return response
+            return view(*args,**kwargs)
+        return wrapper
+    return decorator
+
+
+def request_key(route):
+    """请求合并的key: 路由、排序后的查询参数和协商出的压缩方式"""
+    return (route,
+            tuple(sorted(request.args.items(multi=True))),
+            negotiate_encoding(request.headers.get('Accept-Encoding')))
+
+
+def _flag(args,name):
+    return args.get(name) in ('1','true')
+
+
+def graph_args_error(args):
+    """校验get_kg的查询参数, 有误时返回错误信息"""
+    top=args.get('top')
+    if top is not None and not (top.isdigit() and int(top)>=1):
+        return "top必须为正整数"
+    return None
+
+
+def needs_graph_version(args):
+    return _flag(args,'layout') or _flag(args,'analytics') or bool(args.get('top'))
+
+
+def prepare_graph(graph_data,graph_version,args):
+    """
+    按请求参数处理图谱数据
+    - layout=1: 附加服务端预计算的x/y坐标(基于完整图谱, 不同细节层次下位置一致),
+      完整图谱超过LAYOUT_MAX_NODES个节点时忽略; 当前版本的布局尚未算好时不附加坐标,
+      并在后台线程中计算(前端自行布局), 请求不等待
+    - top=N: 只返回PageRank最高的N个节点及它们之间的连线
+    - analytics=1: 附加degree/pagerank/community字段
+    """
+    top=args.get('top',type=int)
+    if _flag(args,'layout') and len(graph_data["nodes"])<=LAYOUT_MAX_NODES:
+        positions=layout_cache.cached(graph_version,graph_data)
+        if positions is None:
+            layout_cache.warm(graph_version,graph_data)
         else:
-            database_status="Neo4j数据库状态异常"
-        return jsonify({
-            "status":"healthy",
-            "message":"系统运行正常",
-            "database_status":database_status
-        })
-    except Exception as e:
-        print(f"出现异常{str(e)}")
+            graph_data=attach_positions(graph_data,positions)
+    if top or _flag(args,'analytics'):
+        analytics=analytics_cache.get(graph_version,graph_data)
+        if top:
+            graph_data=top_n_subgraph(graph_data,analytics,top)
+        if _flag(args,'analytics'):
+            graph_data=attach_metrics(graph_data,analytics)
+    return graph_data
+
+
+def warm_layout(graph_db):
+    """为当前图谱版本预先计算布局(在后台健康检查线程中调用), 已就绪时只查询图谱版本"""
+    graph_version=graph_db.get_graph_version()
+    if layout_cache.version==graph_version:
+        return
+    graph_data=graph_db.get_knowledge_graph()
+    if len(graph_data["nodes"])<=LAYOUT_MAX_NODES:
+        layout_cache.positions(graph_version,graph_data)
+
+
+def build_graph_body(graph_db,args,accept_encoding):
+    """
+    查询并序列化图谱: format=compact 时使用列式紧凑格式,
+    并按Accept-Encoding协商gzip/brotli压缩
+    Returns:
+        (响应体, Content-Encoding)
+    """
+    graph_data=graph_db.get_knowledge_graph()
+    if needs_graph_version(args):
+        graph_data=prepare_graph(graph_data,graph_db.get_graph_version(),args)
+    if args.get('format')=='compact':
+        graph_data=encode_compact(graph_data)
+    return encode_body(graph_data,accept_encoding)
+
+
+def body_response(body,encoding):
+    response=Response(body,mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding']=encoding
+    response.headers['Vary']='Accept-Encoding'
+    return response
+
+
+def graph_response(response,source):
+    response.headers['X-Graph-Source']=source
+    return response
 
 
 @kg_bp.route('/get_kg',methods=['GET'])
+@rate_limited(get_kg_limiter_for)
 def get_kg():
+    error=graph_args_error(request.args)
+    if error:
+        return jsonify({"error":error}),400
     try:
-        graph_data=graph_db.get_knowledge_graph()
-        return jsonify(graph_data)
+        provider=get_graph_provider()
+        args=request.args
+        accept_encoding=request.headers.get('Accept-Encoding')
+        ((body,encoding),source),_=kg_flight.do(request_key('get_kg'),
+                                                lambda: provider.query(lambda graph_db: build_graph_body(graph_db,args,accept_encoding)))
+        return graph_response(body_response(body,encoding),source)
     except Exception as e:
-        print(f"获取知识图谱失败{str(e)}")
+        current_app.logger.exception("获取知识图谱失败")
+        return jsonify({"error":f"获取知识图谱失败{str(e)}"}),500
 
-@kg_bp.route('/neo4j/status', methods=['GET'])
-def neo4j_status():
+
+@kg_bp.route('/search',methods=['GET'])
+@rate_limited(search_limiter)
+def search():
+    query=request.args.get('q','').strip()
+    if not query:
+        return jsonify({"error":"搜索关键词不能为空"}),400
     try:
-        if graph_db:
-            with graph_db.driver.session() as session:
-                result = session.run("RETURN 1 as test")
-                record = result.single()
-                return jsonify({
-                    "status": "connected",
-                    "uri": NEO4J_URI,
-                    "message": "Neo4j连接正常"
-                })
-        else:
-            return jsonify({
-                "status": "disconnected",
-                "message": "Neo4j未连接，使用模拟数据"
-            })
+        provider=get_graph_provider()
+        (results,source),_=kg_flight.do(('search',query),
+                                        lambda: provider.query(lambda graph_db: graph_db.search_nodes(query)))
+        return graph_response(jsonify({"query":query,"results":results}),source)
+    except Exception as e:
+        current_app.logger.exception("搜索节点失败")
+        return jsonify({"error":f"搜索节点失败{str(e)}"}),500
+
+
+@kg_bp.route('/neighborhood',methods=['GET'])
+@rate_limited(neighborhood_limiter)
+def neighborhood():
+    """节点depth跳以内的子图, 供前端按需展开而不必加载整个图谱"""
+    node_id=request.args.get('id','').strip()
+    if not node_id:
+        return jsonify({"error":"节点id不能为空"}),400
+    depth=min(max(request.args.get('depth',1,type=int),1),NEIGHBORHOOD_MAX_DEPTH)
+    try:
+        provider=get_graph_provider()
+        (subgraph,source),_=kg_flight.do(('neighborhood',node_id,depth),
+                                         lambda: provider.query(lambda graph_db: graph_db.neighborhood(node_id,depth)))
     except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": f"Neo4j连接异常: {str(e)}"
-        })
\ No newline at end of file
+        current_app.logger.exception("获取邻居节点失败")
+        return jsonify({"error":f"获取邻居节点失败{str(e)}"}),500
+    if subgraph is None:
+        return jsonify({"error":f"节点不存在: {node_id}"}),404
+    return graph_response(jsonify(subgraph),source)
+
+
+@kg_bp.route('/neo4j/status', methods=['GET'])
+def neo4j_status():
+    provider=get_graph_provider()
+    response=provider.policy.status(provider.current_health(),provider.uri)
+    response["pool"]=provider.pool_metrics()
+    return jsonify(response)
+
+
+@kg_bp.route('/neo4j/pool', methods=['GET'])
+def neo4j_pool():
+    return jsonify(get_graph_provider().pool_metrics())
@@ -0,0 +1,152 @@
+from flask import Blueprint,Response,current_app,g,jsonify,request
+from werkzeug.exceptions import HTTPException
+from backend.app.api.knowledge_graph import kg_flight,route_limiters
+from backend.app.api.chat import answer_cache
+from backend.app.utils.metrics import REGISTRY,CONTENT_TYPE,SIZE_BUCKETS
+from datetime import datetime
+import cProfile
+import hmac
+import os
+import re
+import tempfile
+import threading
+import time
+
+metrics_bp=Blueprint('metrics',__name__)
+
+HTTP_REQUEST_SECONDS=REGISTRY.histogram('http_request_duration_seconds','HTTP请求耗时',('method','route','status'))
+HTTP_RESPONSE_BYTES=REGISTRY.histogram('http_response_size_bytes','响应体大小(压缩后)',('route',),buckets=SIZE_BUCKETS)
+HTTP_ERRORS=REGISTRY.counter('http_request_errors_total','返回5xx的请求数(含未捕获异常)',('route','status'))
+
+# 按请求剖析: 开启后, 带有PROFILE_HEADER请求头的请求会被cProfile剖析并保存为.prof文件
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', '0') == '1'
+PROFILE_HEADER = os.getenv('PROFILE_HEADER', 'X-Profile')
+# 请求头的值必须与之相同, 防止外部请求随意触发剖析; 未设置时即使PROFILE_ENABLED=1也不剖析
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'kg-profiles'))
+
+# 同一时间只剖析一个请求, 避免多线程下的结果互相干扰
+_profile_lock=threading.Lock()
+
+
+def rule_label(url_rule):
+    """使用路由规则而不是实际路径作为标签, 避免标签数量无限增长"""
+    return url_rule.rule if url_rule is not None else 'unmatched'
+
+
+def route_label():
+    return rule_label(request.url_rule)
+
+
+def profile_requested():
+    if not (PROFILE_ENABLED and PROFILE_TOKEN):
+        return False
+    return hmac.compare_digest(request.headers.get(PROFILE_HEADER,'').encode(),PROFILE_TOKEN.encode())
+
+
+def dump_profile(profiler):
+    """保存剖析结果, 可用 python -m pstats 或 snakeviz 查看"""
+    os.makedirs(PROFILE_DIR,exist_ok=True)
+    endpoint=re.sub(r'[^A-Za-z0-9_.-]','_',request.endpoint or 'unmatched')
+    filename=f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{endpoint}.prof"
+    path=os.path.join(PROFILE_DIR,filename)
+    profiler.dump_stats(path)
+    return path
+
+
+def _stop_profiler():
+    profiler=g.pop('_profiler',None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+    return profiler
+
+
+def before_request():
+    g._request_start=time.perf_counter()
+    if profile_requested() and _profile_lock.acquire(blocking=False):
+        profiler=cProfile.Profile()
+        g._profiler=profiler
+        profiler.enable()
+
+
+def after_request(response):
+    profiler=_stop_profiler()
+    if profiler is not None:
+        response.headers['X-Profile-File']=dump_profile(profiler)
+
+    start=g.pop('_request_start',None)
+    if start is None:
+        return response
+    route=route_label()
+    status=str(response.status_code)
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter()-start,method=request.method,route=route,status=status)
+    if response.content_length is not None:
+        HTTP_RESPONSE_BYTES.observe(response.content_length,route=route)
+    if response.status_code>=500:
+        HTTP_ERRORS.inc(route=route,status=status)
+    return response
+
+
+def teardown_request(exc):
+    # after_request未执行时(如响应生成过程中出错)也要释放剖析器
+    _stop_profiler()
+
+
+def handle_unexpected_error(e):
+    """未捕获的异常记录日志并返回JSON格式的500, 而不是只打印或返回空响应"""
+    if isinstance(e,HTTPException):
+        return e
+    current_app.logger.exception("处理请求时出错")
+    return jsonify({"error":f"服务器内部错误{str(e)}"}),500
+
+
+def service_collector(get_provider,flight,limiters,cache):
+    """
+    抓取时读取连接池、健康状态、请求合并、限流与问答缓存等已有统计
+    Flask与Quart两个版本共用, get_provider返回当前的数据源提供者, limiters为{路由: 限流器}
+    """
+    def collect():
+        provider=get_provider()
+        pool=provider.pool_metrics()
+        yield ('neo4j_up','gauge','最近一次健康检查是否成功(未检查时为-1)',
+               [({},{"connected":1,"error":0}.get(provider.health["status"],-1))])
+        for key,documentation in (('max_size','Neo4j连接池上限'),('in_use','使用中的Neo4j会话数'),
+                                  ('peak_in_use','最多同时使用的Neo4j会话数')):
+            yield (f'neo4j_pool_{key}','gauge',documentation,[({},pool[key])])
+        yield ('neo4j_sessions_total','counter','打开的Neo4j会话数',[({},pool['sessions'])])
+
+        stats=flight.stats()
+        yield ('singleflight_in_flight','gauge','正在执行的合并请求数',[({},stats["in_flight"])])
+        yield ('singleflight_executed_total','counter','实际执行的请求数',[({},stats["executed"])])
+        yield ('singleflight_shared_total','counter','共享了进行中结果的请求数',[({},stats["shared"])])
+
+        rejected=[({"route":route},limiter.rejected) for route,limiter in limiters.items() if limiter is not None]
+        yield ('rate_limit_rejected_total','counter','被限流拒绝的请求数',rejected)
+
+        cache_stats=cache.stats()
+        yield ('answer_cache_size','gauge','问答缓存条目数',[({},cache_stats["size"])])
+        yield ('answer_cache_lookups_total','counter','问答缓存查询次数',
+               [({"result":"hit"},cache_stats["hits"]),
+                ({"result":"near_hit"},cache_stats["near_hits"]),
+                ({"result":"miss"},cache_stats["misses"])])
+    return collect
+
+
+def app_collector(app):
+    return service_collector(lambda: app.extensions['neo4j'],kg_flight,
+                             route_limiters,answer_cache)
+
+
+def init_instrumentation(app):
+    """在应用工厂中注册请求指标、按请求剖析与统一错误处理"""
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+    app.register_error_handler(Exception,handle_unexpected_error)
+    REGISTRY.register_collector('app',app_collector(app))
+
+
+@metrics_bp.route('/metrics',methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(),content_type=CONTENT_TYPE)
@@ -0,0 +1,25 @@
+import re
+
+from quart import Quart
+from quart_cors import cors
+from backend.app.api.async_chat import async_chat_bp
+from backend.app.api.async_knowledge_graph import async_kg_bp
+from backend.app.api.async_metrics import async_metrics_bp, init_async_instrumentation
+
+
+def create_async_app(config=None):
+    """
+    ASGI版本的应用(Quart), 路由、配置项与CORS设置与create_app一致
+    Neo4j和大模型调用均为异步I/O, 慢请求不会占用工作线程
+    """
+    app = Quart(__name__)
+    if config:
+        app.config.update(config)
+    # 与flask_cors的supports_credentials=True一致: 回显请求的Origin并允许携带Cookie
+    app = cors(app, allow_origin=re.compile(r".*"), allow_credentials=True)
+    init_async_instrumentation(app)
+
+    app.register_blueprint(async_chat_bp, url_prefix='/chat')
+    app.register_blueprint(async_kg_bp, url_prefix='/knowledge_graph')
+    app.register_blueprint(async_metrics_bp)
+    return app
@@ -0,0 +1,201 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# 归一化时去掉的标点、句首客套语和句尾语气词(只在首尾去除, 避免误伤"吗啡"等词)
+_PUNCTUATION_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+_LEADING_WORDS = ("请问", "请教", "我想问")
+_TRAILING_WORDS = ("吗", "呢", "吧", "啊")
+# 近似匹配时额外忽略的虚词: 只有去掉这些字词后完全相同的问题才视为同一问题。
+# 不做相似度打分, "儿童/成人"、"需要/不需要"这类只差一两个字的问题含义完全不同
+_FILLER_WORDS = ("一下", "的", "呢", "吧", "啊", "呀")
+
+
+def normalize_question(question: str) -> str:
+    """
+    问题归一化: 全角转半角、小写、去标点空白和常见语气词
+    Args:
+        question: 原始问题
+    Returns:
+        归一化后的问题字符串
+    """
+    text = unicodedata.normalize('NFKC', question or '').lower()
+    text = _PUNCTUATION_RE.sub('', text)
+    for word in _LEADING_WORDS:
+        if text.startswith(word):
+            text = text[len(word):]
+    while text and text.endswith(_TRAILING_WORDS):
+        text = text[:-1]
+    return text
+
+
+def question_skeleton(normalized: str) -> str:
+    """去掉虚词后的问题, 用于近似匹配(输入为normalize_question的结果)"""
+    for word in _FILLER_WORDS:
+        normalized = normalized.replace(word, '')
+    return normalized
+
+
+class _CacheEntry:
+    __slots__ = ('question', 'entities', 'graph_version', 'skeleton', 'answer', 'expires_at')
+
+    def __init__(self, question, entities, graph_version, skeleton, answer, expires_at):
+        self.question = question
+        self.entities = entities
+        self.graph_version = graph_version
+        self.skeleton = skeleton
+        self.answer = answer
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """
+    问答结果缓存
+    键为 (归一化问题, 关联实体集合, 图谱版本); 支持TTL过期、LRU淘汰、
+    近似问题匹配(只忽略标点与虚词的差异), 并统计命中率。
+    图谱版本变化时, 旧版本的缓存全部失效; 版本未知(None, 如Neo4j暂时不可用)时沿用最近一次已知的版本,
+    不视为版本变化, 避免连接抖动清空缓存。
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Tuple, _CacheEntry]" = OrderedDict()
+        # (去虚词问题, 关联实体集合) -> 条目键, 近似匹配为一次字典查找
+        self._skeletons: Dict[Tuple, Tuple] = {}
+        self._graph_version = None
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._near_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _entity_key(entities: Optional[Iterable[str]]) -> frozenset:
+        return frozenset(e for e in (entities or []) if e)
+
+    def _check_version(self, graph_version):
+        """
+        图谱版本变化时清空全部缓存, 返回本次使用的版本; 版本未知时沿用当前版本(调用方需持有锁)
+        """
+        if graph_version is None:
+            return self._graph_version
+        if graph_version != self._graph_version:
+            self._clear()
+            self._graph_version = graph_version
+        return graph_version
+
+    def _clear(self):
+        self._invalidations += len(self._entries)
+        self._entries.clear()
+        self._skeletons.clear()
+
+    def _remove(self, key: Tuple):
+        """删除条目及其近似匹配索引(调用方需持有锁)"""
+        entry = self._entries.pop(key)
+        skeleton_key = (entry.skeleton, entry.entities)
+        if self._skeletons.get(skeleton_key) == key:
+            del self._skeletons[skeleton_key]
+
+    def get(self, question: str, entities: Iterable[str] = None, graph_version=None) -> Optional[str]:
+        """
+        查询缓存
+        Args:
+            question: 用户问题
+            entities: 问题关联的实体ID
+            graph_version: 当前图谱版本, 未知时为None
+        Returns:
+            命中时返回缓存的答案, 否则返回None
+        """
+        normalized, entity_key = normalize_question(question), self._entity_key(entities)
+        now = time.monotonic()
+
+        with self._lock:
+            key = (normalized, entity_key, self._check_version(graph_version))
+
+            entry = self._live_entry(key, now)
+            if entry is not None:
+                self._hits += 1
+                return entry.answer
+
+            # 精确匹配失败, 查找关联实体相同、只差标点与虚词的问题
+            near_key = self._skeletons.get((question_skeleton(normalized), entity_key))
+            entry = self._live_entry(near_key, now) if near_key is not None else None
+            if entry is not None:
+                self._near_hits += 1
+                return entry.answer
+
+            self._misses += 1
+            return None
+
+    def _live_entry(self, key: Tuple, now: float) -> Optional[_CacheEntry]:
+        """未过期的条目(并标记为最近使用); 过期条目直接删除(调用方需持有锁)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            self._expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, question: str, answer: str, entities: Iterable[str] = None,
+            graph_version=None, ttl: float = None):
+        """写入缓存, 超出容量时淘汰最久未使用的条目"""
+        normalized, entity_key = normalize_question(question), self._entity_key(entities)
+        if not normalized:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            graph_version = self._check_version(graph_version)
+            key = (normalized, entity_key, graph_version)
+            entry = _CacheEntry(normalized, entity_key, graph_version,
+                                question_skeleton(normalized), answer, expires_at)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._skeletons[(entry.skeleton, entity_key)] = key
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, graph_version=None):
+        """
+        使缓存失效
+        Args:
+            graph_version: 新的图谱版本; 为None时直接清空全部缓存
+        """
+        with self._lock:
+            if graph_version is None:
+                self._clear()
+                self._graph_version = None
+            else:
+                self._check_version(graph_version)
+
+    def stats(self) -> Dict:
+        """缓存命中率等统计信息"""
+        with self._lock:
+            lookups = self._hits + self._near_hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "graph_version": self._graph_version,
+                "hits": self._hits,
+                "near_hits": self._near_hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits + self._near_hits) / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
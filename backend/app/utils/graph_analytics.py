@@ -0,0 +1,232 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 边表: (节点数, 起点下标, 终点下标, 权重), 同一对节点之间的重复连线已合并
+Edges = Tuple[int, np.ndarray, np.ndarray, np.ndarray]
+
+
+def edge_list(n: int, rows, cols, weights) -> Edges:
+    """
+    构建有向加权边表, 合并同方向的重复连线(权重相加)
+    只依赖NumPy, 不需要scipy
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    key, inverse = np.unique(rows * n + cols, return_inverse=True)
+    merged = np.bincount(inverse, weights=weights, minlength=len(key))
+    return n, key // n, key % n, merged
+
+
+def _adjacency(graph: Dict):
+    """
+    构建有向邻接边表(权重为连线的value)
+    Returns:
+        (节点ID列表, 节点ID->下标, 边表)
+    """
+    node_ids = [node["id"] for node in graph["nodes"]]
+    node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+    rows, cols, weights = [], [], []
+    for link in graph["links"]:
+        source = node_index.get(link["source"])
+        target = node_index.get(link["target"])
+        if source is None or target is None:
+            continue
+        rows.append(source)
+        cols.append(target)
+        weights.append(float(link.get("value") or 1))
+    return node_ids, node_index, edge_list(len(node_ids), rows, cols, weights)
+
+
+def _undirected(edges: Edges) -> Edges:
+    """把每条有向边补上反向边(相当于 A + A^T)"""
+    n, source, target, weight = edges
+    return edge_list(n, np.concatenate([source, target]), np.concatenate([target, source]),
+                     np.concatenate([weight, weight]))
+
+
+def pagerank(edges: Edges, damping: float = 0.85, tol: float = 1e-8, max_iter: int = 100) -> np.ndarray:
+    """
+    加权PageRank(幂迭代), 出度为0的节点把权重均匀分给所有节点
+    Args:
+        edges: 有向加权边表
+    Returns:
+        (n,) 归一化后的PageRank值
+    """
+    n, source, target, weight = edges
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.bincount(source, weights=weight, minlength=n)
+    dangling = out_weight == 0
+    inv_out = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    # 每条边传递的比例: rank_new[target] += damping * share * rank[source]
+    share = weight * inv_out[source]
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        spread = np.bincount(target, weights=share * rank[source], minlength=n)
+        new_rank = damping * (spread + rank[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(new_rank - rank).sum() < tol:
+            rank = new_rank
+            break
+        rank = new_rank
+    return rank / rank.sum()
+
+
+def _independent_groups(owner: np.ndarray, neighbour: np.ndarray, n: int, rng) -> np.ndarray:
+    """
+    把节点分成若干组, 同组节点互不相邻(每轮取随机优先级高于所有未分组邻居的节点)
+    Returns:
+        (n,) 组号
+    """
+    priority = rng.permutation(n)
+    group = np.full(n, -1, dtype=np.int64)
+    current = 0
+    while True:
+        ungrouped = group < 0
+        if not ungrouped.any():
+            return group
+        active = ungrouped[owner] & ungrouped[neighbour]
+        owner, neighbour = owner[active], neighbour[active]
+        best_neighbour = np.full(n, -1, dtype=np.int64)
+        np.maximum.at(best_neighbour, owner, priority[neighbour])
+        group[ungrouped & (priority > best_neighbour)] = current
+        current += 1
+
+
+def label_propagation(edges: Edges, max_iter: int = 30, seed: int = 0) -> np.ndarray:
+    """
+    标签传播社区发现(半同步更新的向量化实现)
+    节点先分成互不相邻的组, 每轮按组依次更新: 同组节点同时取邻居中权重和最大的标签,
+    后面的组能看到前面组的新标签, 因此不会像同步更新那样在二分结构上来回震荡。
+    平局时保留当前标签, 其余平局由固定种子的微小扰动打破, 结果可复现
+    Returns:
+        (n,) 社区编号, 按社区大小从0开始编号
+    """
+    n = edges[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    _, row, col, data = _undirected(edges)
+    off_diagonal = row != col
+    owner, neighbour, weight = row[off_diagonal], col[off_diagonal], data[off_diagonal]
+
+    labels = np.arange(n)
+    if len(owner):
+        rng = np.random.default_rng(seed)
+        # 保留当前标签的加成远小于任何一条边的权重, 扰动又远小于该加成
+        keep_bonus = weight.min() * 1e-3
+        jitter = rng.random(n) * keep_bonus * 1e-3
+
+        group = _independent_groups(owner, neighbour, n, rng)
+        order = np.argsort(group[owner], kind='stable')
+        owner, neighbour, weight = owner[order], neighbour[order], weight[order]
+        bounds = np.searchsorted(group[owner], np.arange(group.max() + 2))
+
+        for _ in range(max_iter):
+            changed = 0
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                if lo == hi:
+                    continue
+                # 按(节点, 邻居标签)分组求权重和, 再取每个节点得分最高的标签
+                key = owner[lo:hi] * n + labels[neighbour[lo:hi]]
+                unique_key, inverse = np.unique(key, return_inverse=True)
+                key_owner, key_label = unique_key // n, unique_key % n
+                score = np.bincount(inverse, weights=weight[lo:hi]) + jitter[key_label]
+                score[key_label == labels[key_owner]] += keep_bonus
+                best = np.lexsort((-score, key_owner))
+                first = np.ones(len(best), dtype=bool)
+                first[1:] = key_owner[best][1:] != key_owner[best][:-1]
+                nodes, new_labels = key_owner[best][first], key_label[best][first]
+                changed += np.count_nonzero(labels[nodes] != new_labels)
+                labels[nodes] = new_labels
+            if changed == 0:
+                break
+
+    # 按社区大小重新编号
+    unique, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+    rank = np.empty(len(unique), dtype=np.int64)
+    rank[order] = np.arange(len(unique))
+    return rank[inverse]
+
+
+class GraphAnalytics:
+    """单个图谱版本的分析结果: 度、PageRank、社区及重要性排序"""
+
+    def __init__(self, graph: Dict):
+        node_ids, node_index, edges = _adjacency(graph)
+        n, source, target, _ = edges
+        self.node_ids = node_ids
+        self.node_index = node_index
+        self.in_degree = np.bincount(target, minlength=n)
+        self.out_degree = np.bincount(source, minlength=n)
+        self.degree = self.in_degree + self.out_degree
+        # 可视化中的重要性与关系方向关系不大(疾病多为出边, 治疗/药物多为入边), 按无向图计算PageRank
+        self.pagerank = pagerank(_undirected(edges))
+        self.community = label_propagation(edges)
+        # 按PageRank降序排列, 相同时按度降序
+        self.ranking = np.lexsort((-self.degree, -self.pagerank))
+
+    def metrics(self, node_id: str) -> Optional[Dict]:
+        i = self.node_index.get(node_id)
+        if i is None:
+            return None
+        return {
+            "degree": int(self.degree[i]),
+            "pagerank": round(float(self.pagerank[i]), 8),
+            "community": int(self.community[i]),
+        }
+
+    def top_nodes(self, limit: int) -> List[str]:
+        return [self.node_ids[i] for i in self.ranking[:limit]]
+
+
+class AnalyticsCache:
+    """按图谱版本缓存分析结果, 版本变化时重新计算"""
+
+    def __init__(self):
+        self._version = None
+        self._node_count = None
+        self._analytics: Optional[GraphAnalytics] = None
+        self._lock = threading.Lock()
+
+    def get(self, graph_version, graph: Dict) -> GraphAnalytics:
+        with self._lock:
+            if (self._analytics is None or graph_version != self._version
+                    or self._node_count != len(graph["nodes"])):
+                self._analytics = GraphAnalytics(graph)
+                self._version = graph_version
+                self._node_count = len(graph["nodes"])
+            return self._analytics
+
+
+def attach_metrics(graph: Dict, analytics: GraphAnalytics) -> Dict:
+    """为节点附加degree/pagerank/community字段(返回新的节点列表)"""
+    nodes = []
+    for node in graph["nodes"]:
+        metrics = analytics.metrics(node["id"])
+        nodes.append(dict(node, **metrics) if metrics else node)
+    return {**graph, "nodes": nodes}
+
+
+def top_n_subgraph(graph: Dict, analytics: GraphAnalytics, limit: int) -> Dict:
+    """
+    细节层次过滤: 只保留最重要的limit个节点及它们之间的连线
+    Returns:
+        过滤后的图谱, 附带lod字段说明完整图谱的规模
+    """
+    keep = set(analytics.top_nodes(limit))
+    nodes = [node for node in graph["nodes"] if node["id"] in keep]
+    links = [link for link in graph["links"] if link["source"] in keep and link["target"] in keep]
+    return {
+        **graph,
+        "nodes": nodes,
+        "links": links,
+        "lod": {
+            "top": limit,
+            "total_nodes": len(graph["nodes"]),
+            "total_links": len(graph["links"]),
+        },
+    }
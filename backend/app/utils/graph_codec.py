@@ -0,0 +1,201 @@
+import gzip
+import json
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖, 未安装时只协商gzip
+    brotli = None
+
+
+COMPACT_FORMAT = "columnar-v1"
+# 小于该大小的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# 节点上可能存在的附加字段, 编码为可选列
+OPTIONAL_NODE_COLUMNS = ("x", "y", "degree", "pagerank", "community")
+
+
+class _Dictionary:
+    """字符串字典编码: 值 -> 下标"""
+
+    def __init__(self):
+        self.values: List = []
+        self._index: Dict = {}
+
+    def encode(self, value) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = len(self.values)
+            self._index[value] = index
+            self.values.append(value)
+        return index
+
+
+def encode_compact(graph: Dict) -> Dict:
+    """
+    把 {"nodes": [...], "links": [...]} 编码为列式紧凑格式
+    - 节点与连线按列存储, 不再重复字段名
+    - group / type / relationshipType / 属性名做字典编码
+    - 连线端点使用节点下标代替字符串ID(端点不存在时为-1)
+    - 连线属性展开为 [键下标, 值, 键下标, 值, ...], 值为null的属性省略
+    - 节点带有布局坐标或分析指标时增加对应的列
+    Args:
+        graph: get_knowledge_graph() 的返回值
+    Returns:
+        可直接JSON序列化的紧凑结构
+    """
+    nodes = graph.get("nodes", [])
+    links = graph.get("links", [])
+
+    groups, types, rel_types, prop_keys = _Dictionary(), _Dictionary(), _Dictionary(), _Dictionary()
+
+    node_ids, labels, node_groups, node_types, node_props = [], [], [], [], []
+    id_index = {}
+    for i, node in enumerate(nodes):
+        node_id = node["id"]
+        id_index[node_id] = i
+        node_ids.append(node_id)
+        # label与id相同时省略
+        labels.append(None if node["label"] == node_id else node["label"])
+        node_groups.append(groups.encode(node["group"]))
+        node_types.append(types.encode(node["type"]))
+        node_props.append(node.get("properties"))
+
+    sources, targets, values, link_types, link_props = [], [], [], [], []
+    for link in links:
+        sources.append(id_index.get(link["source"], -1))
+        targets.append(id_index.get(link["target"], -1))
+        values.append(link["value"])
+        link_types.append(rel_types.encode(link["relationshipType"]))
+        flat = []
+        for key, value in (link.get("properties") or {}).items():
+            if value is not None:
+                flat.append(prop_keys.encode(key))
+                flat.append(value)
+        link_props.append(flat)
+
+    node_columns = {
+        "id": node_ids,
+        "label": labels,
+        "group": node_groups,
+        "type": node_types,
+        "properties": node_props,
+    }
+    # 可选列: 布局坐标(layout=1)与分析指标(analytics=1)
+    for column in OPTIONAL_NODE_COLUMNS:
+        if nodes and column in nodes[0]:
+            node_columns[column] = [node.get(column) for node in nodes]
+
+    compact = {
+        "format": COMPACT_FORMAT,
+        "groups": groups.values,
+        "types": types.values,
+        "relationshipTypes": rel_types.values,
+        "propertyKeys": prop_keys.values,
+        "nodes": node_columns,
+        "links": {
+            "source": sources,
+            "target": targets,
+            "value": values,
+            "relationshipType": link_types,
+            "properties": link_props,
+        },
+    }
+    if "lod" in graph:
+        compact["lod"] = graph["lod"]
+    return compact
+
+
+def decode_compact(data: Dict) -> Dict:
+    """encode_compact 的逆过程(值为null的连线属性不会恢复)"""
+    groups, types = data["groups"], data["types"]
+    rel_types, prop_keys = data["relationshipTypes"], data["propertyKeys"]
+    columns = data["nodes"]
+
+    nodes = []
+    for i, node_id in enumerate(columns["id"]):
+        label = columns["label"][i]
+        node = {
+            "id": node_id,
+            "label": node_id if label is None else label,
+            "group": groups[columns["group"][i]],
+            "type": types[columns["type"][i]],
+            "properties": columns["properties"][i],
+        }
+        for column in OPTIONAL_NODE_COLUMNS:
+            if column in columns:
+                node[column] = columns[column][i]
+        nodes.append(node)
+
+    columns = data["links"]
+    links = []
+    for i, source in enumerate(columns["source"]):
+        target = columns["target"][i]
+        flat = columns["properties"][i]
+        links.append({
+            "source": nodes[source]["id"] if source >= 0 else None,
+            "target": nodes[target]["id"] if target >= 0 else None,
+            "value": columns["value"][i],
+            "relationshipType": rel_types[columns["relationshipType"][i]],
+            "properties": {prop_keys[flat[j]]: flat[j + 1] for j in range(0, len(flat), 2)},
+        })
+
+    graph = {"nodes": nodes, "links": links}
+    if "lod" in data:
+        graph["lod"] = data["lod"]
+    return graph
+
+
+def dumps(data) -> bytes:
+    """紧凑JSON序列化(不转义中文, 无多余空白)"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    encodings = {}
+    for part in (accept_encoding or '').split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """根据Accept-Encoding选择压缩方式, 优先brotli, 其次gzip"""
+    encodings = _accepted_encodings(accept_encoding)
+    if brotli is not None and encodings.get('br', 0) > 0:
+        return 'br'
+    if encodings.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def encode_body(data, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """
+    序列化并按协商结果压缩响应体
+    Returns:
+        (响应体, Content-Encoding), 未压缩时Content-Encoding为None
+    """
+    body = dumps(data)
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_SIZE else None
+    return compress(body, encoding), encoding
@@ -0,0 +1,457 @@
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.app.utils.singleflight import SingleFlight
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import shortest_path
+except ImportError:  # 没有scipy时使用随机初始坐标
+    csr_matrix = None
+
+
+# 理想边长(与前端d3 forceLink的distance一致, 单位为像素)
+IDEAL_EDGE_LENGTH = 80.0
+# 节点数不超过该值时精确计算两两斥力, 否则使用网格近似
+EXACT_REPULSION_LIMIT = 3000
+# 网格近似时每个单元的平均节点数, 以及网格每边的最大单元数
+_NODES_PER_CELL = 8
+_MAX_GRID = 128
+# 远场计算时每个粗块包含的细单元数(每边)
+_COARSE_BLOCK = 8
+# Pivot-MDS初始布局的枢轴节点数
+PIVOT_COUNT = 50
+# 精确斥力分块计算时每块的最大元素数, 控制内存占用
+_CHUNK_ELEMENTS = 2_000_000
+
+
+def _stable_random(node_ids: Sequence[str], scale: float) -> np.ndarray:
+    """按节点ID生成确定性的初始坐标, 同一节点每次刷新得到相同起点"""
+    seeds = np.fromiter((zlib.crc32(str(node_id).encode('utf-8')) for node_id in node_ids),
+                        dtype=np.uint64, count=len(node_ids))
+    # 由种子派生两个[0,1)的伪随机数
+    a = ((seeds * np.uint64(2654435761)) % np.uint64(2 ** 32)).astype(np.float64) / 2 ** 32
+    b = ((seeds * np.uint64(40503) + np.uint64(12345)) % np.uint64(2 ** 32)).astype(np.float64) / 2 ** 32
+    return (np.column_stack([a, b]) - 0.5) * scale
+
+
+def pivot_mds(node_count: int, edges: np.ndarray, pivots: int = PIVOT_COUNT) -> Optional[np.ndarray]:
+    """
+    Pivot-MDS初始布局(Brandes & Pich): 从少量枢轴节点做BFS得到图距离,
+    对距离矩阵做双中心化后取前两个主成分作为坐标, 复杂度为O(枢轴数 * (n + m))
+    Returns:
+        (n, 2) 坐标(尺度未归一化), 没有scipy或没有连线时返回None
+    """
+    if csr_matrix is None or len(edges) == 0 or node_count < 3:
+        return None
+    data = np.ones(len(edges))
+    adjacency = csr_matrix((data, (edges[:, 0], edges[:, 1])), shape=(node_count, node_count))
+
+    # 最大最小距离法选取枢轴, 第一个枢轴为度最大的节点
+    degree = np.bincount(edges.ravel(), minlength=node_count)
+    pivot = int(np.argmax(degree))
+    nearest = np.full(node_count, np.inf)
+    distances = []
+    for _ in range(min(pivots, node_count)):
+        row = shortest_path(adjacency, directed=False, unweighted=True, indices=pivot)
+        distances.append(row)
+        nearest = np.minimum(nearest, row)
+        candidates = np.where(np.isinf(nearest), -1.0, nearest)
+        pivot = int(np.argmax(candidates))
+        if candidates[pivot] <= 0:
+            break
+
+    dist = np.array(distances)
+    finite = np.isfinite(dist)
+    # 不连通的节点视为比最远节点再远一跳
+    dist[~finite] = dist[finite].max() + 1 if finite.any() else 1.0
+    squared = dist ** 2
+    centered = -0.5 * (squared - squared.mean(axis=1, keepdims=True)
+                       - squared.mean(axis=0, keepdims=True) + squared.mean())
+    eigvals, eigvecs = np.linalg.eigh(centered @ centered.T)
+    top = eigvecs[:, np.argsort(eigvals)[::-1][:2]]
+    return centered.T @ top
+
+
+def _exact_repulsion(pos: np.ndarray, k: float, rows: np.ndarray) -> np.ndarray:
+    """rows中每个节点受到的全部节点斥力之和(float32计算)"""
+    x, y = pos[:, 0].astype(np.float32), pos[:, 1].astype(np.float32)
+    disp = np.zeros((len(rows), 2))
+    chunk = max(1, _CHUNK_ELEMENTS // max(len(pos), 1))
+    k2 = np.float32(k * k)
+    for start in range(0, len(rows), chunk):
+        block = rows[start:start + chunk]
+        dx = x[block, None] - x[None, :]
+        dy = y[block, None] - y[None, :]
+        inv = k2 / np.maximum(dx * dx + dy * dy, np.float32(0.01))
+        disp[start:start + chunk, 0] = (dx * inv).sum(axis=1)
+        disp[start:start + chunk, 1] = (dy * inv).sum(axis=1)
+    return disp
+
+
+def _cell_pairs(targets: np.ndarray, bounds: np.ndarray, members: np.ndarray):
+    """
+    targets中每个下标对应一个分组(-1表示不存在), 展开为 (targets下标, 组内成员) 对
+    bounds/members为按分组排序后的成员及各组的起止位置
+    """
+    valid = targets >= 0
+    safe = np.where(valid, targets, 0)
+    counts = np.where(valid, bounds[safe + 1] - bounds[safe], 0)
+    owner = np.repeat(np.arange(len(targets)), counts)
+    first = np.repeat(bounds[safe], counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, members[first + within]
+
+
+def _neighbour_block(xy: np.ndarray, offset_x: int, offset_y: int, size: int) -> np.ndarray:
+    """相邻单元的编号, 越界时为-1"""
+    nx, ny = xy[:, 0] + offset_x, xy[:, 1] + offset_y
+    valid = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+    return np.where(valid, nx * size + ny, -1)
+
+
+def _point_forces(k2, px, py, qx, qy, mass):
+    """点p受到质量为mass的点q的斥力"""
+    dx, dy = px - qx, py - qy
+    inv = k2 * mass / np.maximum(dx * dx + dy * dy, np.float32(0.01))
+    return dx * inv, dy * inv
+
+
+def _far_field(centers: np.ndarray, mass: np.ndarray, cell_xy: np.ndarray, needed: np.ndarray) -> np.ndarray:
+    """
+    两级网格的远场斥力(以单元质心为受力点, 未乘k^2):
+    - 所在粗块及相邻粗块内、但与自身不相邻的细单元, 按细单元的质心计算
+    - 更远的粗块按粗块的质心计算
+    每个单元只与常数个细单元和粗块相互作用, 每次迭代约为O(单元数 * (粗块边长^2 + 粗块数))
+    Args:
+        centers/mass/cell_xy: 非空细单元的质心、节点数和网格坐标
+        needed: 需要计算的细单元(在上述数组中的下标)
+    Returns:
+        (len(needed), 2)
+    """
+    block_xy = cell_xy // _COARSE_BLOCK
+    blocks = int(block_xy.max()) + 1
+    block = block_xy[:, 0] * blocks + block_xy[:, 1]
+    block_mass = np.bincount(block, weights=mass, minlength=blocks * blocks)
+    occupied_blocks = np.flatnonzero(block_mass)
+    block_centers = np.column_stack([
+        np.bincount(block, weights=mass * centers[:, axis], minlength=blocks * blocks)[occupied_blocks]
+        for axis in range(2)
+    ]) / block_mass[occupied_blocks, None]
+    occupied_block_xy = np.column_stack([occupied_blocks // blocks, occupied_blocks % blocks])
+    block_mass = block_mass[occupied_blocks].astype(np.float32)
+
+    members = np.argsort(block, kind='stable')
+    bounds = np.searchsorted(block[members], np.arange(blocks * blocks + 1))
+    x, y = centers[:, 0].astype(np.float32), centers[:, 1].astype(np.float32)
+    bx, by = block_centers[:, 0].astype(np.float32), block_centers[:, 1].astype(np.float32)
+    mass32 = mass.astype(np.float32)
+    one = np.float32(1.0)
+
+    force = np.zeros((len(needed), 2))
+    chunk = max(1, _CHUNK_ELEMENTS // (9 * _COARSE_BLOCK ** 2 + len(occupied_blocks)))
+    for start in range(0, len(needed), chunk):
+        cells = needed[start:start + chunk]
+        rows = np.arange(start, start + len(cells))
+        # 粗块: 与所在粗块不相邻的全部粗块
+        far = ((np.abs(block_xy[cells, None, 0] - occupied_block_xy[None, :, 0]) > 1)
+               | (np.abs(block_xy[cells, None, 1] - occupied_block_xy[None, :, 1]) > 1))
+        fx, fy = _point_forces(one, x[cells, None], y[cells, None], bx[None, :], by[None, :],
+                               block_mass[None, :])
+        force[rows, 0] = np.where(far, fx, 0).sum(axis=1)
+        force[rows, 1] = np.where(far, fy, 0).sum(axis=1)
+        # 细单元: 相邻粗块内与自身不相邻的细单元
+        for offset_x in (-1, 0, 1):
+            for offset_y in (-1, 0, 1):
+                owner, other = _cell_pairs(_neighbour_block(block_xy[cells], offset_x, offset_y, blocks),
+                                           bounds, members)
+                mine = cells[owner]
+                keep = np.abs(cell_xy[mine] - cell_xy[other]).max(axis=1) > 1
+                owner, mine, other = owner[keep], mine[keep], other[keep]
+                fx, fy = _point_forces(one, x[mine], y[mine], x[other], y[other], mass32[other])
+                force[start:start + len(cells), 0] += np.bincount(owner, weights=fx, minlength=len(cells))
+                force[start:start + len(cells), 1] += np.bincount(owner, weights=fy, minlength=len(cells))
+    return force
+
+
+def _grid_repulsion(pos: np.ndarray, k: float, rows: np.ndarray) -> np.ndarray:
+    """
+    网格近似斥力(简化的Barnes-Hut): 同一单元及相邻单元内的节点精确计算,
+    更远的节点按两级网格的单元质心合并计算(见_far_field), 每次迭代约为O(n)
+    """
+    n = len(pos)
+    grid = int(np.clip(np.sqrt(n / _NODES_PER_CELL), 4, _MAX_GRID))
+    # 等频划分: 先按x分成grid列, 每列再按y分成grid行, 每个单元的节点数相同,
+    # 避免节点密集区域的单元过大
+    col = np.empty(n, dtype=np.int64)
+    col[np.argsort(pos[:, 0], kind='stable')] = np.arange(n) * grid // n
+    order = np.lexsort((pos[:, 1], col))
+    col_start = np.searchsorted(col[order], np.arange(grid))
+    col_count = np.bincount(col, minlength=grid)
+    rank = np.arange(n) - col_start[col[order]]
+    row = np.empty(n, dtype=np.int64)
+    row[order] = rank * grid // np.maximum(col_count[col[order]], 1)
+    cell_xy = np.column_stack([col, row])
+    cell = col * grid + row
+
+    mass = np.bincount(cell, minlength=grid * grid).astype(np.float64)
+    occupied = np.flatnonzero(mass)
+    mass = mass[occupied]
+    centers = np.column_stack([
+        np.bincount(cell, weights=pos[:, axis], minlength=grid * grid)[occupied] for axis in range(2)
+    ]) / mass[:, None]
+    occupied_xy = np.column_stack([occupied // grid, occupied % grid])
+
+    # 远场: 单元内所有节点共用所在单元受到的远场斥力; 只计算包含待移动节点的单元
+    needed = np.unique(cell[rows])
+    cell_force = np.zeros((grid * grid, 2))
+    cell_force[needed] = (k * k) * _far_field(centers, mass, occupied_xy, np.searchsorted(occupied, needed))
+    disp = cell_force[cell[rows]]
+
+    # 近场: 同一单元及相邻单元内的节点精确计算
+    members = np.argsort(cell, kind='stable')
+    bounds = np.searchsorted(cell[members], np.arange(grid * grid + 1))
+    for offset_x in (-1, 0, 1):
+        for offset_y in (-1, 0, 1):
+            owner, other = _cell_pairs(_neighbour_block(cell_xy[rows], offset_x, offset_y, grid),
+                                       bounds, members)
+            mine = rows[owner]
+            keep = other != mine
+            owner, mine, other = owner[keep], mine[keep], other[keep]
+            delta = pos[mine] - pos[other]
+            inv = (k * k) / np.maximum(np.einsum('ij,ij->i', delta, delta), 0.01)
+            for axis in range(2):
+                disp[:, axis] += np.bincount(owner, weights=delta[:, axis] * inv, minlength=len(rows))
+    return disp
+
+
+def force_layout(pos: np.ndarray, edges: np.ndarray, iterations: int = 100,
+                 k: float = IDEAL_EDGE_LENGTH, fixed: Optional[np.ndarray] = None,
+                 temperature: Optional[float] = None, gravity: float = 1.0) -> np.ndarray:
+    """
+    向量化的Fruchterman-Reingold力导向布局
+    Args:
+        pos: (n, 2) 初始坐标, 会被原地更新
+        edges: (m, 2) 连线端点的节点下标
+        iterations: 迭代次数
+        k: 理想边长
+        fixed: (n,) 布尔数组, 为True的节点保持不动(增量布局)
+        temperature: 初始最大位移, 默认按图的规模估计
+        gravity: 向原点的线性引力系数, 避免不连通的子图飘散(为1时节点间距约为k)
+    Returns:
+        布局后的坐标
+    """
+    n = len(pos)
+    if n == 0:
+        return pos
+    movable = None if fixed is None else ~fixed
+    if movable is not None and not movable.any():
+        return pos
+
+    use_grid = n > EXACT_REPULSION_LIMIT
+    rows = np.arange(n) if movable is None else np.flatnonzero(movable)
+    src, dst = (edges[:, 0], edges[:, 1]) if len(edges) else (None, None)
+    t = temperature if temperature is not None else k * np.sqrt(n) / 4
+    cooling = (0.02) ** (1.0 / max(iterations, 1))
+
+    for _ in range(iterations):
+        disp = np.zeros_like(pos)
+        disp[rows] = _grid_repulsion(pos, k, rows) if use_grid else _exact_repulsion(pos, k, rows)
+
+        if src is not None:
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt(np.einsum('ij,ij->i', delta, delta)) + 1e-9
+            force = delta * (dist / k)[:, None]
+            for axis in range(2):
+                disp[:, axis] -= np.bincount(src, weights=force[:, axis], minlength=n)
+                disp[:, axis] += np.bincount(dst, weights=force[:, axis], minlength=n)
+
+        disp -= gravity * pos
+
+        length = np.linalg.norm(disp, axis=1, keepdims=True) + 1e-9
+        step = disp / length * np.minimum(length, t)
+        if movable is not None:
+            step[~movable] = 0.0
+        pos += step
+        t *= cooling
+
+    return pos
+
+
+def _edge_array(node_index: Dict[str, int], links: List[Dict]) -> np.ndarray:
+    pairs = [(node_index[link["source"]], node_index[link["target"]])
+             for link in links
+             if link["source"] in node_index and link["target"] in node_index
+             and link["source"] != link["target"]]
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+
+def _default_iterations(n: int, refine: bool = False) -> int:
+    """力导向迭代次数; refine为True时初始布局已由Pivot-MDS给出, 只需少量迭代"""
+    if refine:
+        return 60 if n <= 1000 else 30 if n <= 5000 else 15
+    if n <= 500:
+        return 200
+    if n <= 5000:
+        return 100
+    return 60
+
+
+class LayoutCache:
+    """
+    按图谱版本缓存的节点坐标
+    图谱版本变化时只为新增节点计算位置(已有节点固定不动), 刷新开销小且布局稳定;
+    新增节点超过 full_relayout_ratio 时重新计算完整布局。
+    布局在锁外计算, 同一版本的并发计算合并为一次; 请求中使用 cached/warm,
+    布局未就绪时在后台线程中计算, 不阻塞请求
+    """
+
+    def __init__(self, k: float = IDEAL_EDGE_LENGTH, incremental_iterations: int = 40,
+                 full_relayout_ratio: float = 0.5):
+        self.k = k
+        self.incremental_iterations = incremental_iterations
+        self.full_relayout_ratio = full_relayout_ratio
+        self._version = None
+        self._positions: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._warming: Dict = {}
+
+    @property
+    def version(self):
+        """已缓存布局对应的图谱版本"""
+        return self._version
+
+    def cached(self, graph_version, graph: Dict) -> Optional[Dict[str, Tuple[float, float]]]:
+        """已计算好的坐标, 版本不一致或有节点缺少坐标时返回None(不计算)"""
+        with self._lock:
+            if graph_version == self._version and all(node["id"] in self._positions for node in graph["nodes"]):
+                return self._positions
+        return None
+
+    def positions(self, graph_version, graph: Dict) -> Dict[str, Tuple[float, float]]:
+        """
+        获取图谱所有节点的坐标, 未缓存时在当前线程中计算
+        Args:
+            graph_version: 图谱版本
+            graph: {"nodes": [...], "links": [...]}
+        Returns:
+            节点ID -> (x, y)
+        """
+        positions = self.cached(graph_version, graph)
+        if positions is not None:
+            return positions
+        key = (graph_version, len(graph["nodes"]))
+        positions, _ = self._flight.do(key, lambda: self._build(graph_version, graph))
+        return positions
+
+    def warm(self, graph_version, graph: Dict) -> Optional[threading.Thread]:
+        """
+        在后台线程中计算布局, 同一版本同时只启动一个线程
+        Returns:
+            新启动的线程; 布局已就绪或正在计算时返回None
+        """
+        if self.cached(graph_version, graph) is not None:
+            return None
+        key = (graph_version, len(graph["nodes"]))
+        with self._lock:
+            if key in self._warming:
+                return None
+            thread = threading.Thread(target=self._warm, args=(key, graph_version, graph),
+                                      name='graph-layout', daemon=True)
+            self._warming[key] = thread
+        thread.start()
+        return thread
+
+    def _warm(self, key, graph_version, graph: Dict):
+        try:
+            self.positions(graph_version, graph)
+        finally:
+            with self._lock:
+                self._warming.pop(key, None)
+
+    def _build(self, graph_version, graph: Dict) -> Dict[str, Tuple[float, float]]:
+        node_ids = [node["id"] for node in graph["nodes"]]
+        with self._lock:
+            current = self._positions
+
+        known = [i in current for i in node_ids]
+        new_count = len(node_ids) - sum(known)
+        if not current or new_count > self.full_relayout_ratio * max(len(node_ids), 1):
+            positions = self._full_layout(node_ids, graph["links"])
+        elif new_count or len(current) != len(node_ids):
+            positions = self._incremental_layout(node_ids, known, graph["links"], current)
+        else:
+            positions = current
+
+        with self._lock:
+            self._positions = positions
+            self._version = graph_version
+        return positions
+
+    def _full_layout(self, node_ids: List[str], links: List[Dict]) -> Dict[str, Tuple[float, float]]:
+        node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+        edges = _edge_array(node_index, links)
+        n = len(node_ids)
+
+        initial = pivot_mds(n, edges)
+        if initial is None:
+            pos = _stable_random(node_ids, self.k * np.sqrt(max(n, 1)))
+            pos = force_layout(pos, edges, iterations=_default_iterations(n), k=self.k)
+        else:
+            # 缩放到与引力平衡时相当的范围(半径约k*sqrt(n)), 加少量扰动分开距离向量相同的节点,
+            # 再用力导向细化
+            initial -= initial.mean(axis=0)
+            rms = float(np.sqrt((initial ** 2).sum(axis=1).mean())) or 1.0
+            pos = initial * (self.k * np.sqrt(n / 2) / rms) + _stable_random(node_ids, self.k)
+            pos = force_layout(pos, edges, iterations=_default_iterations(n, refine=True),
+                               k=self.k, temperature=self.k * 3)
+        return self._to_dict(node_ids, pos)
+
+    def _incremental_layout(self, node_ids: List[str], known: List[bool], links: List[Dict],
+                            current: Dict[str, Tuple[float, float]]) -> Dict[str, Tuple[float, float]]:
+        node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+        edges = _edge_array(node_index, links)
+        fixed = np.array(known, dtype=bool)
+
+        known_pos = np.array([current[node_id] for node_id, k in zip(node_ids, known) if k])
+        extent = max(float(np.ptp(known_pos, axis=0).max()), self.k) if len(known_pos) else self.k
+        pos = _stable_random(node_ids, extent)
+        pos[fixed] = known_pos
+
+        # 新节点放在已定位邻居的重心附近(加少量偏移), 没有已定位邻居时随机放在现有布局范围内
+        n = len(node_ids)
+        if len(edges) and not fixed.all():
+            both = np.concatenate([edges, edges[:, ::-1]])
+            anchored = both[fixed[both[:, 1]] & ~fixed[both[:, 0]]]
+            counts = np.bincount(anchored[:, 0], minlength=n)
+            sums = np.column_stack([
+                np.bincount(anchored[:, 0], weights=pos[anchored[:, 1], axis], minlength=n)
+                for axis in range(2)
+            ])
+            has_anchor = counts > 0
+            pos[has_anchor] = (sums[has_anchor] / counts[has_anchor, None]
+                               + _stable_random(np.array(node_ids)[has_anchor], self.k))
+
+        pos = force_layout(pos, edges, iterations=self.incremental_iterations, k=self.k,
+                           fixed=fixed, temperature=self.k * 2)
+        return self._to_dict(node_ids, pos)
+
+    @staticmethod
+    def _to_dict(node_ids: List[str], pos: np.ndarray) -> Dict[str, Tuple[float, float]]:
+        rounded = np.round(pos, 1).tolist()
+        return {node_id: (xy[0], xy[1]) for node_id, xy in zip(node_ids, rounded)}
+
+
+def attach_positions(graph: Dict, positions: Dict[str, Tuple[float, float]]) -> Dict:
+    """把坐标写入节点的x/y字段(返回新的节点列表, 不修改原数据)"""
+    nodes = []
+    for node in graph["nodes"]:
+        xy = positions.get(node["id"])
+        if xy is not None:
+            node = dict(node, x=xy[0], y=xy[1])
+        nodes.append(node)
+    return {**graph, "nodes": nodes}
@@ -0,0 +1,499 @@
+"""
+图谱快照: 紧凑的二进制格式, 通过mmap加载, 在Neo4j不可用或只读副本上提供get_kg/搜索/邻居查询
+
+文件布局(小端):
+    8字节魔数 | uint32 头部长度 | JSON头部 | 8字节对齐的各数据段
+头部记录节点/关系数、创建时间、图谱的构建时间及各数据段的(偏移, 长度, dtype)。数据段:
+    str_blob / str_offsets      去重后的字符串, 每个以\\0结尾
+    node_id / node_name / node_type                 字符串下标(NULL_INDEX表示null), 节点按id排序
+    node_prop                   字符串下标, 节点属性为紧凑JSON(保留数值等类型), null为NULL_INDEX
+    link_source / link_target   节点下标, 关系按source排序
+    link_type / link_props      字符串下标, 关系属性为紧凑JSON
+    out_offsets / in_offsets / in_links             出边与入边的CSR索引, 用于邻居查询
+    search_blob / search_offsets                    小写的搜索文本, 每个节点一段
+所有数组直接映射为numpy视图, 多个worker进程共享同一份页缓存, 加载只需解析头部。
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b'KGSNAP\x00\x01'
+FORMAT_VERSION = 2
+NULL_INDEX = 0xFFFFFFFF
+ALIGNMENT = 8
+
+# 与 NODES_QUERY / LINKS_QUERY 中的CASE一致: 每种实体返回的属性, 每种关系返回的属性键
+NODE_PROPERTY_KEY = {
+    "疾病": "严重程度",
+    "治疗": "紧急程度",
+    "检查": "检查目的",
+    "药物": "用药途径",
+    "生命体征": "正常范围",
+    "并发症": "发生率",
+}
+LINK_PROPERTY_KEYS = {
+    "需要治疗": ("时机", "顺序", "条件"),
+    "需要检查": ("频率", "目的"),
+    "使用药物": ("剂量", "给药方式", "使用时机", "注意事项"),
+    "监测指标": ("监测频率", "目标值"),
+    "引起并发症": ("发生率", "条件"),
+}
+# 与 SEARCH_QUERY 一致: 参与搜索的节点属性
+SEARCH_PROPERTY_KEYS = ("症状描述", "注意事项")
+SEARCH_FIELD_SEPARATOR = '\x01'
+
+
+def _safe_key(key: str) -> str:
+    """与 MedicalKGBuilder 写入Neo4j时的属性名处理一致"""
+    return key.replace(' ', '_').replace('-', '_').replace('/', '_')
+
+
+def search_text(*fields) -> str:
+    """节点参与搜索的文本: 节点名与SEARCH_PROPERTY_KEYS中的属性, 空值不参与"""
+    return SEARCH_FIELD_SEPARATOR.join(str(f) for f in fields if f is not None)
+
+
+def records_from_kg_data(kg_data: Dict) -> Tuple[List[Dict], List[Dict], List[str]]:
+    """
+    把 MedicalKGBuilder.build_knowledge_graph 的结果转换为与Cypher查询返回列一致的记录
+    (只包含这一次构建的数据; 要与Neo4j中累积的图谱一致, 使用dump_neo4j)
+    Returns:
+        (node_records, link_records, search_texts)
+    """
+    node_records, search_texts, node_ids = [], [], set()
+    for entity in kg_data.get("entities", []):
+        properties = {_safe_key(k): v for k, v in (entity.get("properties") or {}).items()}
+        key = NODE_PROPERTY_KEY.get(entity["type"])
+        node_records.append({
+            "id": entity["id"],
+            "name": entity.get("name"),
+            "entityType": entity["type"],
+            "properties": properties.get(key) if key else None,
+        })
+        search_texts.append(search_text(entity.get("name"), *(properties.get(k) for k in SEARCH_PROPERTY_KEYS)))
+        node_ids.add(entity["id"])
+
+    link_records, seen = [], set()
+    for rel in kg_data.get("relationships", []):
+        # 与MERGE语义一致: 端点必须存在, 相同(起点, 终点, 类型)只保留一条
+        key = (rel["from"], rel["to"], rel["type"])
+        if rel["from"] not in node_ids or rel["to"] not in node_ids or key in seen:
+            continue
+        seen.add(key)
+        properties = {_safe_key(k): v for k, v in (rel.get("properties") or {}).items()}
+        link_records.append({
+            "source": rel["from"],
+            "target": rel["to"],
+            "relationshipType": rel["type"],
+            "properties": {k: properties.get(k) for k in LINK_PROPERTY_KEYS.get(rel["type"], ())},
+        })
+    return node_records, link_records, search_texts
+
+
+class _StringTable:
+    def __init__(self):
+        self.values: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def add(self, value) -> int:
+        if value is None:
+            return NULL_INDEX
+        value = str(value)
+        index = self._index.get(value)
+        if index is None:
+            index = len(self.values)
+            self._index[value] = index
+            self.values.append(value)
+        return index
+
+
+def _blob(values: Iterable[str], terminator: bytes) -> Tuple[bytes, np.ndarray]:
+    """拼接字符串, 返回(字节串, 各字符串起始偏移, 长度为n+1)"""
+    encoded = [value.encode('utf-8') + terminator for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    if encoded:
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return b''.join(encoded), offsets
+
+
+def _offset_array(offsets: np.ndarray) -> np.ndarray:
+    return offsets.astype(np.uint32 if offsets[-1] < 2 ** 32 else np.uint64)
+
+
+def _compact_json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def write_snapshot(path: str, node_records: List[Dict], link_records: List[Dict],
+                   search_texts: Optional[List[str]] = None, graph_updated_at: Optional[str] = None) -> Dict:
+    """
+    写入快照文件(先写临时文件再原子替换, 正在读取旧快照的进程不受影响)
+    Args:
+        node_records / link_records: 与 NODES_QUERY / LINKS_QUERY 返回列一致的记录
+        search_texts: 每个节点参与搜索的文本, 默认为节点名
+        graph_updated_at: 图谱的构建时间(GraphMeta.updated_at), 使快照版本与Neo4j的图谱版本一致
+    Returns:
+        快照头部
+    """
+    if search_texts is None:
+        search_texts = [record["name"] or "" for record in node_records]
+    order = sorted(range(len(node_records)), key=lambda i: node_records[i]["id"])
+    nodes = [node_records[i] for i in order]
+    texts = [search_texts[i] for i in order]
+    node_index = {record["id"]: i for i, record in enumerate(nodes)}
+
+    links = [link for link in link_records
+             if link["source"] in node_index and link["target"] in node_index]
+    links.sort(key=lambda link: node_index[link["source"]])
+
+    strings = _StringTable()
+    node_id = np.array([strings.add(r["id"]) for r in nodes], dtype=np.uint32)
+    node_name = np.array([strings.add(r["name"]) for r in nodes], dtype=np.uint32)
+    node_type = np.array([strings.add(r["entityType"]) for r in nodes], dtype=np.uint32)
+    node_prop = np.array([strings.add(None if r["properties"] is None else _compact_json(r["properties"]))
+                          for r in nodes], dtype=np.uint32)
+
+    link_source = np.array([node_index[link["source"]] for link in links], dtype=np.uint32)
+    link_target = np.array([node_index[link["target"]] for link in links], dtype=np.uint32)
+    link_type = np.array([strings.add(link["relationshipType"]) for link in links], dtype=np.uint32)
+    link_props = np.array([strings.add(_compact_json(link.get("properties") or {})) for link in links],
+                          dtype=np.uint32)
+
+    n = len(nodes)
+    out_offsets = np.zeros(n + 1, dtype=np.uint32)
+    np.cumsum(np.bincount(link_source, minlength=n), out=out_offsets[1:])
+    in_links = np.argsort(link_target, kind='stable').astype(np.uint32)
+    in_offsets = np.zeros(n + 1, dtype=np.uint32)
+    np.cumsum(np.bincount(link_target, minlength=n), out=in_offsets[1:])
+
+    str_blob, str_offsets = _blob(strings.values, b'\x00')
+    search_blob, search_offsets = _blob((text.lower() for text in texts), b'\n')
+
+    sections = {
+        "str_blob": np.frombuffer(str_blob, dtype=np.uint8),
+        "str_offsets": _offset_array(str_offsets),
+        "node_id": node_id,
+        "node_name": node_name,
+        "node_type": node_type,
+        "node_prop": node_prop,
+        "link_source": link_source,
+        "link_target": link_target,
+        "link_type": link_type,
+        "link_props": link_props,
+        "out_offsets": out_offsets,
+        "in_offsets": in_offsets,
+        "in_links": in_links,
+        "search_blob": np.frombuffer(search_blob, dtype=np.uint8),
+        "search_offsets": _offset_array(search_offsets),
+    }
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "nodes": n,
+        "links": len(links),
+        "strings": len(strings.values),
+        "created_at": datetime.utcnow().isoformat(),
+        "graph_updated_at": graph_updated_at,
+        "sections": {},
+    }
+    # 头部长度取决于各段偏移, 先按占位长度计算布局, 再写入真实偏移
+    layout = []
+    header_bytes = json.dumps(header).encode('utf-8')
+    for _ in range(2):
+        offset = _align(len(MAGIC) + 4 + len(header_bytes) + 64 * len(sections))
+        header["sections"] = {}
+        layout = []
+        for name, array in sections.items():
+            header["sections"][name] = [offset, int(array.size), array.dtype.str]
+            layout.append((offset, array))
+            offset = _align(offset + array.nbytes)
+        header_bytes = json.dumps(header).encode('utf-8')
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for offset, array in layout:
+                assert f.tell() <= offset, "快照头部超出预留空间"
+                f.write(b'\x00' * (offset - f.tell()))
+                f.write(array.tobytes())
+            # 补齐到对齐边界, 末尾的空数据段偏移也不会超出文件长度
+            f.write(b'\x00' * (_align(f.tell()) - f.tell()))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return header
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class GraphSnapshot:
+    """只读快照, 查询结果与Cypher查询的返回列一致"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"不是图谱快照文件: {path}")
+        (header_len,) = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self._mmap[start:start + header_len])
+        if self.header["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"不支持的快照版本: {self.header['format_version']}")
+
+        for name, (offset, size, dtype) in self.header["sections"].items():
+            setattr(self, '_' + name, np.frombuffer(self._mmap, dtype=np.dtype(dtype), count=size, offset=offset))
+        self.node_count = self.header["nodes"]
+        self.link_count = self.header["links"]
+        self._link_props_cache: Dict[int, Dict] = {}
+        self._node_props_cache: Dict[int, object] = {}
+
+    @property
+    def version(self) -> str:
+        """
+        与Neo4j的图谱版本(graph_version: 节点数-关系数-构建时间)格式一致,
+        从Neo4j导出的快照与导出时的Neo4j版本相同, 切换数据源时布局缓存与问答缓存仍可复用
+        """
+        version = f"{self.node_count}-{self.link_count}"
+        updated_at = self.header.get("graph_updated_at")
+        return f"{version}-{updated_at}" if updated_at else version
+
+    def close(self):
+        # 仍有numpy视图引用时无法关闭mmap, 交给垃圾回收
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    # 字符串
+    def _string(self, index) -> Optional[str]:
+        index = int(index)
+        if index == NULL_INDEX:
+            return None
+        start, end = int(self._str_offsets[index]), int(self._str_offsets[index + 1]) - 1
+        return self._mmap[self._str_blob_offset + start:self._str_blob_offset + end].decode('utf-8')
+
+    @property
+    def _str_blob_offset(self) -> int:
+        return self.header["sections"]["str_blob"][0]
+
+    def _all_strings(self) -> List[str]:
+        """一次性解码全部字符串(C层面的split, 比逐个解码快得多)"""
+        return self._str_blob.tobytes().decode('utf-8').split('\x00')[:-1]
+
+    # 记录
+    def _node_record(self, i, strings=None) -> Dict:
+        get = strings.__getitem__ if strings is not None else self._string
+        prop = int(self._node_prop[i])
+        if prop == NULL_INDEX:
+            value = None
+        elif prop in self._node_props_cache:
+            value = self._node_props_cache[prop]
+        else:
+            value = self._node_props_cache[prop] = json.loads(get(prop))
+        return {
+            "id": get(self._node_id[i]),
+            "name": get(self._node_name[i]),
+            "entityType": get(self._node_type[i]),
+            # 属性值为字符串或数值时直接共享缓存; 列表等可变值复制一份
+            "properties": value if not isinstance(value, (dict, list)) else json.loads(get(prop)),
+        }
+
+    def _link_record(self, j, strings=None) -> Dict:
+        get = strings.__getitem__ if strings is not None else self._string
+        props_index = int(self._link_props[j])
+        props = self._link_props_cache.get(props_index)
+        if props is None:
+            props = self._link_props_cache[props_index] = json.loads(get(props_index))
+        return {
+            "source": get(self._node_id[self._link_source[j]]),
+            "target": get(self._node_id[self._link_target[j]]),
+            "relationshipType": get(self._link_type[j]),
+            "properties": dict(props),
+        }
+
+    def node_records(self) -> List[Dict]:
+        strings = self._all_strings()
+        return [self._node_record(i, strings) for i in range(self.node_count)]
+
+    def link_records(self) -> List[Dict]:
+        strings = self._all_strings()
+        return [self._link_record(j, strings) for j in range(self.link_count)]
+
+    def find_node(self, node_id: str) -> Optional[int]:
+        """按id二分查找节点下标(节点按id排序)"""
+        lo, hi = 0, self.node_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._string(self._node_id[mid])
+            if value < node_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.node_count and self._string(self._node_id[lo]) == node_id:
+            return lo
+        return None
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """节点名/症状描述/注意事项包含query(不区分大小写)的节点"""
+        term = query.lower().encode('utf-8')
+        if not term or b'\n' in term:
+            return []
+        base = self.header["sections"]["search_blob"][0]
+        end = base + int(self._search_offsets[-1])
+        results, position = [], base
+        while len(results) < limit:
+            found = self._mmap.find(term, position, end)
+            if found == -1:
+                break
+            i = int(np.searchsorted(self._search_offsets, found - base, side='right')) - 1
+            results.append(self._node_record(i))
+            # 跳到下一个节点的搜索文本, 每个节点最多返回一次
+            position = base + int(self._search_offsets[i + 1])
+        return results
+
+    def neighborhood(self, node_id: str, depth: int = 1, limit: int = 500) -> Optional[Tuple[List[Dict], List[Dict]]]:
+        """
+        以node_id为中心, depth跳以内的关系(不区分方向)及其端点
+        Returns:
+            (node_records, link_records), 节点不存在时返回None; 关系数达到limit时截断
+        """
+        center = self.find_node(node_id)
+        if center is None:
+            return None
+        visited, frontier, links = {center}, [center], []
+        seen_links = set()
+        for _ in range(depth):
+            next_frontier = []
+            for i in frontier:
+                incident = np.concatenate([
+                    np.arange(self._out_offsets[i], self._out_offsets[i + 1], dtype=np.int64),
+                    self._in_links[self._in_offsets[i]:self._in_offsets[i + 1]].astype(np.int64),
+                ])
+                for j in incident.tolist():
+                    if j in seen_links:
+                        continue
+                    seen_links.add(j)
+                    links.append(j)
+                    for end in (int(self._link_source[j]), int(self._link_target[j])):
+                        if end not in visited:
+                            visited.add(end)
+                            next_frontier.append(end)
+                    if len(links) >= limit:
+                        break
+                if len(links) >= limit:
+                    break
+            frontier = next_frontier
+            if not frontier or len(links) >= limit:
+                break
+        return ([self._node_record(i) for i in sorted(visited)],
+                [self._link_record(j) for j in sorted(links)])
+
+
+class SnapshotStore:
+    """
+    按需加载快照; 文件被替换(修改时间或inode变化)后自动重新加载
+    检查间隔内直接复用已加载的快照, 避免每次请求都stat文件
+    """
+
+    def __init__(self, path: Optional[str], check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: Optional[GraphSnapshot] = None
+        self._stat = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.path)
+
+    def get(self) -> Optional[GraphSnapshot]:
+        """当前快照; 未配置或文件不存在时返回None"""
+        if not self.path:
+            return None
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                self._snapshot, self._stat = None, None
+                return None
+            key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if self._snapshot is None or key != self._stat:
+                self._snapshot = GraphSnapshot(self.path)
+                self._stat = key
+            return self._snapshot
+
+    def info(self) -> Optional[Dict]:
+        snapshot = self.get()
+        if snapshot is None:
+            return None
+        return {
+            "path": self.path,
+            "nodes": snapshot.node_count,
+            "links": snapshot.link_count,
+            "created_at": snapshot.header["created_at"],
+        }
+
+
+def dump_neo4j(path: str, uri: str, username: str, password: str) -> Dict:
+    """
+    从Neo4j导出完整图谱为快照: 包括之前各次构建MERGE写入的数据, 搜索文本包含症状描述与注意事项,
+    快照版本与Neo4j的图谱版本一致
+    """
+    from backend.app.api.knowledge_graph import Neo4jKnowledgeGraph
+    graph_db = Neo4jKnowledgeGraph(uri, username, password)
+    try:
+        return write_snapshot(path, *graph_db.export_records())
+    finally:
+        graph_db.close()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="图谱快照工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    from_json = sub.add_parser('from-json', help="由构建脚本输出的knowledge_graph.json生成快照(只含该次构建的数据)")
+    from_json.add_argument('source')
+    from_json.add_argument('output')
+    dump = sub.add_parser('dump-neo4j', help="从Neo4j导出完整图谱为快照(用于只读副本)")
+    dump.add_argument('output')
+    info = sub.add_parser('info', help="查看快照信息")
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'from-json':
+        with open(args.source, encoding='utf-8') as f:
+            header = write_snapshot(args.output, *records_from_kg_data(json.load(f)))
+    elif args.command == 'dump-neo4j':
+        from backend.app.api.knowledge_graph import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+        header = dump_neo4j(args.output, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD)
+    else:
+        header = GraphSnapshot(args.path).header
+    header = {k: v for k, v in header.items() if k != 'sections'}
+    print(json.dumps(header, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
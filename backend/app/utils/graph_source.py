@@ -0,0 +1,156 @@
+"""
+Flask与Quart两个版本的图谱服务共用的逻辑: 数据源选择与回退、健康状态、
+连接池统计与按客户端限流; 不依赖具体的Web框架, 两个版本只负责同步/异步调用
+"""
+import math
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+
+# 查询Neo4j时出现这些异常, auto模式下改用快照
+FALLBACK_ERRORS = (ServiceUnavailable, SessionExpired, TimeoutError)
+RATE_LIMITED_MESSAGE = "请求过于频繁，请稍后再试"
+SNAPSHOT_STATUS = "使用图谱快照(只读)"
+SNAPSHOT_MISSING = "图谱快照不可用"
+
+
+def client_key(remote_addr: Optional[str], forwarded_for: Optional[str], trust_proxy: bool) -> str:
+    """限流使用的客户端标识; 信任反向代理时取X-Forwarded-For的第一个地址"""
+    if trust_proxy and forwarded_for:
+        return forwarded_for.split(',')[0].strip()
+    return remote_addr or 'unknown'
+
+
+def rate_limit_retry_after(limiter, client: str) -> Optional[int]:
+    """
+    为客户端消耗一个令牌
+    Returns:
+        允许时返回None, 被限流时返回Retry-After的秒数
+    """
+    if limiter is None:
+        return None
+    allowed, retry_after = limiter.acquire(client)
+    return None if allowed else math.ceil(retry_after)
+
+
+def health_result(latency_ms: Optional[float] = None, error: Optional[Exception] = None) -> Dict:
+    """一次健康检查的结果"""
+    if error is not None:
+        result = {"status": "error", "message": f"Neo4j连接异常: {str(error)}"}
+    else:
+        result = {"status": "connected", "message": "Neo4j连接正常", "latency_ms": round(latency_ms, 2)}
+    result["checked_at"] = datetime.utcnow().isoformat()
+    return result
+
+
+class GraphSourcePolicy:
+    """
+    数据源选择规则
+    - neo4j: 只使用Neo4j
+    - snapshot: 只使用快照, 不连接Neo4j
+    - auto: Neo4j健康检查失败或查询时连接不可用, 且存在快照时改用快照
+    wrap将GraphSnapshot包装为数据源(同步或异步接口)
+    """
+
+    def __init__(self, source: str, snapshots, wrap: Callable):
+        self.source = source
+        self.snapshots = snapshots
+        self._wrap = wrap
+
+    @property
+    def uses_neo4j(self) -> bool:
+        return self.source != 'snapshot'
+
+    def snapshot_source(self):
+        """快照数据源, 未配置或文件不存在时返回None"""
+        snapshot = self.snapshots.get()
+        return self._wrap(snapshot) if snapshot is not None else None
+
+    def preferred(self, health_status: str):
+        """
+        查询前选择数据源
+        Returns:
+            应直接使用的快照数据源, 为None时先查询Neo4j
+        """
+        if self.source == 'snapshot':
+            snapshot = self.snapshot_source()
+            if snapshot is None:
+                raise RuntimeError(f"{SNAPSHOT_MISSING}: {self.snapshots.path or '未设置GRAPH_SNAPSHOT_PATH'}")
+            return snapshot
+        if self.source == 'auto' and health_status == "error":
+            return self.snapshot_source()
+        return None
+
+    def fallback(self, error: Exception):
+        """Neo4j查询失败后改用的快照数据源, 不能回退时返回None"""
+        if self.source != 'auto' or not isinstance(error, FALLBACK_ERRORS):
+            return None
+        return self.snapshot_source()
+
+    def unavailable(self, health_status: str) -> bool:
+        """Neo4j异常且没有快照可用"""
+        return self.uses_neo4j and health_status == "error" and self.snapshots.get() is None
+
+    def database_status(self, health_status: str) -> str:
+        """/test_connection 返回的数据库状态"""
+        if self.source == 'snapshot':
+            return SNAPSHOT_STATUS if self.snapshots.get() is not None else SNAPSHOT_MISSING
+        return {
+            "connected": "Neo4j数据库状态正常",
+            "unknown": "Neo4j数据库状态检查中",
+        }.get(health_status, "Neo4j数据库状态异常")
+
+    def status(self, health: Dict, uri: str) -> Dict:
+        """/neo4j/status 返回的状态: 健康检查结果附加数据源与快照信息"""
+        result = dict(health)
+        result["uri"] = uri
+        result["graph_source"] = self.source
+        snapshot = self.snapshots.info()
+        result["snapshot"] = snapshot
+        if self.source == 'snapshot':
+            result["message"] = SNAPSHOT_STATUS if snapshot else SNAPSHOT_MISSING
+        elif health["status"] == "error" and snapshot and self.source == 'auto':
+            result["message"] = f"{health['message']}, 使用快照数据"
+        return result
+
+
+class PoolStats:
+    """
+    Neo4j会话占用统计, 同步与异步驱动均可使用
+    连接数上限与获取连接的超时由驱动自身的连接池负责(max_connection_pool_size /
+    connection_acquisition_timeout), 这里只计数, 不再额外限制; 驱动不公开空闲连接数与等待时间, 因此不导出这两项
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._sessions = 0
+
+    def acquired(self):
+        with self._lock:
+            self._sessions += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+    def released(self):
+        with self._lock:
+            self._in_use -= 1
+
+    def metrics(self) -> Dict:
+        """会话指标: 连接池上限、当前与历史最多同时使用的会话数、累计会话数"""
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "sessions": self._sessions,
+            }
+
+
+def idle_pool_metrics(max_size: int) -> Dict:
+    """驱动尚未创建时的连接池指标"""
+    return {"max_size": max_size, "in_use": 0, "peak_in_use": 0, "sessions": 0}
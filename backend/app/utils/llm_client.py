@@ -0,0 +1,103 @@
+import asyncio
+import os
+
+import httpx
+
+
+DEEPSEEK_API_URL = os.getenv('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1/chat/completions')
+DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
+DEEPSEEK_MODEL = os.getenv('DEEPSEEK_MODEL', 'deepseek-chat')
+# 同时进行的大模型调用上限, 防止慢请求占满全部连接
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '60'))
+
+
+def _request(api_key, model, messages, max_tokens, temperature):
+    """chat completions请求的请求头与请求体"""
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    return headers, payload
+
+
+def _content(response):
+    response.raise_for_status()
+    return response.json()['choices'][0]['message']['content']
+
+
+class LLMClient:
+    """
+    同步的大模型客户端, 供Flask(wsgi)版本使用; 接口与AsyncLLMClient一致,
+    调用期间占用当前工作线程, 并发调用数受worker线程数限制
+    """
+
+    def __init__(self, api_url=DEEPSEEK_API_URL, api_key=DEEPSEEK_API_KEY, model=DEEPSEEK_MODEL,
+                 max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self._client = httpx.Client(
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=max_concurrency,
+                                max_keepalive_connections=max_concurrency),
+        )
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    def close(self):
+        self._client.close()
+
+    def chat(self, messages, max_tokens=1000, temperature=0):
+        """调用chat completions接口, 返回模型返回的文本"""
+        headers, payload = _request(self.api_key, self.model, messages, max_tokens, temperature)
+        return _content(self._client.post(self.api_url, headers=headers, json=payload))
+
+
+class AsyncLLMClient:
+    """
+    基于httpx的异步大模型客户端(OpenAI兼容的chat completions接口)
+    复用同一个连接池, 并用信号量限制并发调用数
+    """
+
+    def __init__(self, api_url=DEEPSEEK_API_URL, api_key=DEEPSEEK_API_KEY, model=DEEPSEEK_MODEL,
+                 max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=max_concurrency,
+                                max_keepalive_connections=max_concurrency),
+        )
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def chat(self, messages, max_tokens=1000, temperature=0):
+        """
+        调用chat completions接口
+        Args:
+            messages: 对话消息列表
+            max_tokens: 最大生成长度
+            temperature: 采样温度
+        Returns:
+            模型返回的文本
+        """
+        headers, payload = _request(self.api_key, self.model, messages, max_tokens, temperature)
+        async with self._semaphore:
+            response = await self._client.post(self.api_url, headers=headers, json=payload)
+        return _content(response)
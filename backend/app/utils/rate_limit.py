@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class RateLimiter:
+    """
+    按客户端的令牌桶限流
+    每个客户端最多连续发起capacity个请求, 之后每秒恢复refill_rate个令牌
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, max_clients: int = 10000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_clients = max_clients
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def acquire(self, client: str) -> Tuple[bool, Optional[float]]:
+        """
+        尝试为客户端消耗一个令牌
+        Returns:
+            (是否允许, 被拒绝时建议的重试等待秒数)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+            if tokens >= 1:
+                self._buckets[client] = (tokens - 1, now)
+                allowed, retry_after = True, None
+            else:
+                self._buckets[client] = (tokens, now)
+                self.rejected += 1
+                allowed, retry_after = False, (1 - tokens) / self.refill_rate
+
+            if len(self._buckets) > self.max_clients:
+                self._prune(now)
+            return allowed, retry_after
+
+    def _prune(self, now: float):
+        """清理令牌已经恢复满的客户端(调用方需持有锁)"""
+        full_after = self.capacity / self.refill_rate
+        stale = [client for client, (_, updated) in self._buckets.items() if now - updated >= full_after]
+        for client in stale:
+            del self._buckets[client]
+
+
+def parse_rate(value: str) -> Tuple[float, float]:
+    """
+    解析限流配置, 格式为 "次数/秒数", 如 "30/60" 表示每60秒30次(突发上限也为30)
+    Returns:
+        (capacity, refill_rate)
+    Raises:
+        ValueError: 格式错误, 或次数、秒数不是正数(要关闭限流应设为空字符串)
+    """
+    count, _, period = value.partition('/')
+    try:
+        count = float(count)
+        period = float(period or 1)
+    except ValueError:
+        raise ValueError(f"限流配置格式应为\"次数/秒数\": {value!r}") from None
+    if count <= 0 or period <= 0:
+        raise ValueError(f"限流配置的次数与秒数必须为正数(关闭限流请设为空字符串): {value!r}")
+    return count, count / period
+
+
+def limiter_from_config(value: str) -> Optional[RateLimiter]:
+    """按限流配置创建限流器, 配置为空字符串时不限流(返回None)"""
+    return RateLimiter(*parse_rate(value)) if value else None
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    请求合并(single-flight): 相同key的并发调用只执行一次, 其余调用等待并共享结果
+    只合并正在执行的调用, 执行结束后不缓存结果
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        执行fn或等待相同key的进行中调用
+        Returns:
+            (结果, 是否为共享结果); fn抛出的异常会传递给所有等待者
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "executed": self.executed, "shared": self.shared}
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight的asyncio版本
+    fn在独立的任务中执行, 任务归属于合并调用而不是发起它的请求: 任何一个调用方(包括第一个)
+    被取消时, 其他调用方仍能拿到结果
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        执行fn或等待相同key的进行中调用
+        Returns:
+            (结果, 是否为共享结果); fn抛出的异常会传递给所有等待者
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.shared += 1
+            shared = True
+        else:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self.executed += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+            shared = False
+        # shield: 调用方被取消时只停止等待, 不取消正在执行的任务
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有调用方都已取消时, 避免"exception was never retrieved"警告
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._calls), "executed": self.executed, "shared": self.shared}
@@ -0,0 +1,292 @@
+"""
+后端压测: 使用内存中的假Neo4j驱动与合成图谱, 测量各接口在并发下的延迟分位数、吞吐量和峰值内存
+
+    python -m backend.benchmarks.bench_backend --concurrency 16 --output bench.json   # 1千~50万节点
+    python -m backend.benchmarks.bench_backend --sizes 1000 10000 --baseline bench.json
+
+每个图谱规模启动一个独立的服务子进程(本地端口上的多线程WSGI服务), 压测端在当前进程中用httpx并发请求,
+两者不共享进程与GIL。服务进程保持默认配置(后台健康检查开启), 只关闭按客户端限流。
+每个场景开始前重置服务进程的峰值内存(Linux的/proc/<pid>/clear_refs), 场景结束后读取VmHWM,
+因此peak_rss_mb是该场景期间服务进程的峰值; 其他平台上不输出该项。
+吞吐量与延迟分位数只统计成功的请求; 任一场景的失败率超过 --max-error-rate 时, 输出结果后以非0状态退出。
+chat 场景每个请求使用不同的问题(问答缓存未命中, 测量实体检索与回答生成), chat_cached 场景重复少量问题,
+测量问答缓存命中时的开销。
+结果为JSON, 使用 --baseline 与之前的结果文件对比(例如不同commit)。
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import httpx
+
+from backend.benchmarks.bench_concurrency import percentile
+
+# 场景: (方法, 路径, 请求体生成函数)
+SEARCH_TERMS = ["心", "肾上腺素", "休克", "CT", "血", "复苏", "衰竭", "不存在的词"]
+CHAT_QUESTIONS = [f"{disease}的急救处理流程是什么" for disease in
+                  ["心脏骤停", "急性心肌梗死", "脑卒中", "休克", "急性呼吸衰竭", "消化道出血", "严重创伤"]]
+# chat场景的问题序号, 所有虚拟用户共用, 保证问题不重复
+_chat_ids = itertools.count()
+
+SCENARIOS = {
+    "get_kg": ("GET", lambda i: "/knowledge_graph/get_kg", None),
+    "get_kg_compact": ("GET", lambda i: "/knowledge_graph/get_kg?format=compact", None),
+    "get_kg_top": ("GET", lambda i: "/knowledge_graph/get_kg?format=compact&top=300", None),
+    "search": ("GET", lambda i: f"/knowledge_graph/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}", None),
+    "status": ("GET", lambda i: "/knowledge_graph/neo4j/status", None),
+    "chat": ("POST", lambda i: "/chat/answer_questions",
+             lambda i: {"message": f"{CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)]}(问题{next(_chat_ids)})"}),
+    "chat_cached": ("POST", lambda i: "/chat/answer_questions",
+                    lambda i: {"message": CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)]}),
+}
+
+
+def _proc_status_mb(pid, field):
+    """/proc/<pid>/status中的内存项(MB), 非Linux平台返回None"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def reset_peak_rss(pid):
+    """将进程的峰值内存(VmHWM)重置为当前常驻内存, 成功时返回True"""
+    try:
+        with open(f"/proc/{pid}/clear_refs", 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def serve(num_nodes, avg_degree, latency):
+    """服务子进程: 使用假驱动启动多线程WSGI服务, 就绪后在stdout输出一行JSON(端口与图谱规模)"""
+    # 压测客户端只有一个IP, 关闭限流; 环境变量需在导入应用之前设置
+    for name in ('RATE_LIMIT_GET_KG', 'RATE_LIMIT_GET_KG_LOD', 'RATE_LIMIT_SEARCH', 'RATE_LIMIT_NEIGHBORHOOD'):
+        os.environ[name] = ''
+    from werkzeug.serving import make_server
+    from backend.app import create_app
+    from backend.benchmarks.fake_neo4j import FakeDriver, use_fake_driver
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    start = time.perf_counter()
+    driver = FakeDriver.synthetic(num_nodes, avg_degree, latency=latency)
+    setup_s = time.perf_counter() - start
+    with use_fake_driver(driver):
+        server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+        print(json.dumps({"port": server.server_port, "nodes": len(driver.node_records),
+                          "links": len(driver.link_records), "setup_s": round(setup_s, 3)}), flush=True)
+        server.serve_forever()
+
+
+@contextmanager
+def server_process(num_nodes, avg_degree, latency):
+    """
+    启动服务子进程
+    Yields:
+        (pid, 服务信息)
+    """
+    proc = subprocess.Popen([sys.executable, '-m', 'backend.benchmarks.bench_backend', '--serve',
+                             '--sizes', str(num_nodes), '--degree', str(avg_degree), '--latency', str(latency)],
+                            stdout=subprocess.PIPE, text=True)
+    try:
+        line = proc.stdout.readline()
+        if not line:
+            raise SystemExit(f"规模 {num_nodes} 的服务进程启动失败")
+        yield proc.pid, json.loads(line)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+async def _worker(url, scenario, deadline, offset, latencies, errors):
+    method, path, body = SCENARIOS[scenario]
+    i = offset
+    # 每个虚拟用户使用独立的连接, 避免共享连接池的调度开销使压测端成为瓶颈
+    async with httpx.AsyncClient(base_url=url, timeout=300, limits=httpx.Limits(max_connections=1)) as client:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            i += 1
+            try:
+                response = await client.request(method, path(i - 1), json=body(i - 1) if body else None)
+                # 读取完整响应体(含解压), 与浏览器端的开销一致
+                await response.aread()
+            except httpx.HTTPError as e:
+                errors.append(type(e).__name__)
+                continue
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+            else:
+                latencies.append(time.perf_counter() - start)
+
+
+async def run_scenario(url, scenario, concurrency, duration):
+    """压测一个场景; 吞吐量与延迟只统计成功的请求"""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*[_worker(url, scenario, deadline, n * 997, latencies, errors)
+                           for n in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    total = len(latencies) + len(errors)
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / total, 4) if total else 1.0,
+        "error_codes": sorted({str(error) for error in errors}),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+
+def run_size(num_nodes, avg_degree, scenarios, concurrency, duration, warmup, latency):
+    """启动一个规模的服务子进程, 依次压测各场景并记录每个场景期间服务进程的峰值内存"""
+    with server_process(num_nodes, avg_degree, latency) as (pid, info):
+        url = f"http://127.0.0.1:{info['port']}"
+        rss_idle = _proc_status_mb(pid, 'VmRSS')
+        results = {}
+        for scenario in scenarios:
+            if warmup:
+                asyncio.run(run_scenario(url, scenario, 1, warmup))
+            peak_reset = reset_peak_rss(pid)
+            rss_start = _proc_status_mb(pid, 'VmRSS')
+            result = asyncio.run(run_scenario(url, scenario, concurrency, duration))
+            # 已分配的内存通常不会归还系统, 场景的额外开销看峰值与开始时常驻内存之差
+            result["rss_start_mb"] = rss_start
+            result["peak_rss_mb"] = _proc_status_mb(pid, 'VmHWM') if peak_reset else None
+            results[scenario] = result
+
+    peaks = [r["peak_rss_mb"] for r in results.values() if r["peak_rss_mb"] is not None]
+    return {
+        "nodes": info["nodes"],
+        "links": info["links"],
+        "setup_s": info["setup_s"],
+        "rss_idle_mb": rss_idle,
+        "peak_rss_mb": max(peaks) if peaks else None,
+        "scenarios": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    与基线结果对比, 按(规模, 场景)匹配
+    Returns:
+        {规模: {场景: {"throughput": 相对变化, "p95": 相对变化}}}, 正值表示吞吐提升或延迟增加
+    """
+    def relative(new, old):
+        return round((new - old) / old, 4) if old else None
+
+    base = {row["nodes"]: row for row in baseline.get("results", [])}
+    diff = {}
+    for row in results:
+        old_row = base.get(row["nodes"])
+        if old_row is None:
+            continue
+        entry = {}
+        for scenario, new in row["scenarios"].items():
+            old = old_row["scenarios"].get(scenario)
+            if old:
+                entry[scenario] = {
+                    "throughput": relative(new["throughput_rps"], old["throughput_rps"]),
+                    "p95": relative(new["latency_ms"]["p95"], old["latency_ms"]["p95"]),
+                }
+                if new.get("peak_rss_mb") and old.get("peak_rss_mb"):
+                    entry[scenario]["peak_rss_mb"] = relative(new["peak_rss_mb"], old["peak_rss_mb"])
+        if row["peak_rss_mb"] and old_row.get("peak_rss_mb"):
+            entry["peak_rss_mb"] = relative(row["peak_rss_mb"], old_row["peak_rss_mb"])
+        diff[str(row["nodes"])] = entry
+    return diff
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="后端接口压测(内存假Neo4j)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 500000],
+                        help="合成图谱的节点数, 可指定多个")
+    parser.add_argument('--degree', type=float, default=3.0, help="平均出边数")
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help="每个场景的压测时长(秒)")
+    parser.add_argument('--warmup', type=float, default=1.0, help="每个场景正式压测前的单并发预热时长(秒)")
+    parser.add_argument('--latency', type=float, default=0.0, help="假驱动每次查询的模拟耗时(秒)")
+    parser.add_argument('--output', help="结果写入JSON文件")
+    parser.add_argument('--baseline', help="与之前的结果JSON对比")
+    parser.add_argument('--max-error-rate', type=float, default=0.01,
+                        help="单个场景允许的失败率, 超过时以非0状态退出")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        # 服务子进程模式
+        serve(args.sizes[0], args.degree, args.latency)
+        return
+
+    rows = []
+    failed = []
+    for size in args.sizes:
+        row = run_size(size, args.degree, args.scenarios, args.concurrency,
+                       args.duration, args.warmup, args.latency)
+        rows.append(row)
+        summary = ", ".join(f"{name} p95={r['latency_ms']['p95']}ms {r['throughput_rps']}rps rss={r['peak_rss_mb']}MB"
+                            for name, r in row["scenarios"].items())
+        print(f"[{row['nodes']} 节点] {summary}", file=sys.stderr)
+        failed += [f"{row['nodes']}/{name}: 失败率{r['error_rate']:.1%} {r['error_codes']}"
+                   for name, r in row["scenarios"].items() if r["error_rate"] > args.max_error_rate]
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "degree": args.degree,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "driver_latency_s": args.latency,
+        },
+        "results": rows,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report["baseline"] = {"file": args.baseline, "diff": compare(rows, json.load(f))}
+
+    report["failed"] = failed
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    if failed:
+        raise SystemExit("以下场景的失败率超过 --max-error-rate, 结果不可信:\n" + "\n".join(failed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+并发吞吐基准测试: 对比改造前的开发服务器(dev)与 wsgi(gunicorn+Flask)、asgi(uvicorn+Quart) 两种服务模式
+
+对已启动的服务压测:
+    python -m backend.benchmarks.bench_concurrency --url http://localhost:5000 --concurrency 64
+
+自动依次以三种方式启动服务并对比, 吞吐提升以dev为基准; --fake-nodes 使用内存中的假Neo4j驱动(无需数据库),
+为0时连接真实Neo4j:
+    python -m backend.benchmarks.bench_concurrency --compare --fake-nodes 2000 --workers 2 --concurrency 64 \
+        --slow-concurrency 16 --llm-delay 2
+
+--slow-concurrency 会在压测期间保持若干个并发的问答请求, 用于观察慢请求对
+get_kg / test_connection 等接口吞吐的影响。--compare 时问答请求由 fake_llm_server 回答(每次等待 --llm-delay 秒),
+各服务均以 CHAT_USE_LLM=1 启动并指向该服务, 慢请求会像真实的大模型调用一样占用worker。
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+
+DEFAULT_ROUTES = ['/knowledge_graph/test_connection', '/knowledge_graph/get_kg']
+SLOW_ROUTE = '/chat/answer_questions'
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def _client(url):
+    """每个虚拟用户使用独立的客户端与连接; 共享连接池在高并发下的调度开销会让压测端先于服务端成为瓶颈"""
+    return httpx.AsyncClient(base_url=url, timeout=120, limits=httpx.Limits(max_connections=1))
+
+
+async def _worker(url, routes, deadline, latencies, errors):
+    i = 0
+    async with _client(url) as client:
+        while time.perf_counter() < deadline:
+            route = routes[i % len(routes)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                response = await client.get(route)
+            except httpx.HTTPError as e:
+                errors.append(type(e).__name__)
+                continue
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+            else:
+                # 吞吐量与延迟只统计成功的请求, 快速失败的请求不会抬高吞吐
+                latencies.append(time.perf_counter() - start)
+
+
+async def _slow_worker(url, deadline, counter, worker):
+    i = 0
+    async with _client(url) as client:
+        while time.perf_counter() < deadline:
+            i += 1
+            try:
+                # 每个问题都不同, 不会命中问答缓存
+                response = await client.post(SLOW_ROUTE, json={"message": f"基准测试问题{os.getpid()}-{worker}-{i}"})
+            except httpx.HTTPError:
+                continue
+            if response.status_code < 400:
+                counter.append(1)
+
+
+async def _load(url, routes, concurrency, duration, slow_concurrency):
+    latencies, errors, slow_done = [], [], []
+    deadline = time.perf_counter() + duration
+    tasks = [_worker(url, routes, deadline, latencies, errors) for _ in range(concurrency)]
+    tasks += [_slow_worker(url, deadline, slow_done, k) for k in range(slow_concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return latencies, errors, len(slow_done), time.perf_counter() - start
+
+
+def _load_process(url, routes, concurrency, duration, slow_concurrency):
+    return asyncio.run(_load(url, routes, concurrency, duration, slow_concurrency))
+
+
+def run_load(url, routes, concurrency, duration, slow_concurrency=0, processes=1):
+    """
+    以固定并发压测一组路由; processes>1时并发数均分到多个压测进程, 避免单个压测进程的CPU成为瓶颈
+    Returns:
+        包含吞吐量和延迟分位数的字典(只统计成功的请求, 失败数见errors)
+    """
+    if processes <= 1:
+        parts = [_load_process(url, routes, concurrency, duration, slow_concurrency)]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            futures = [pool.submit(_load_process, url, routes,
+                                   concurrency // processes + (k < concurrency % processes), duration,
+                                   slow_concurrency // processes + (k < slow_concurrency % processes))
+                       for k in range(processes)]
+            parts = [future.result() for future in futures]
+
+    latencies = [value for part in parts for value in part[0]]
+    errors = sum(len(part[1]) for part in parts)
+    elapsed = max(part[3] for part in parts)
+    return {
+        "url": url,
+        "routes": routes,
+        "concurrency": concurrency,
+        "slow_concurrency": slow_concurrency,
+        "client_processes": processes,
+        "duration_s": round(elapsed, 3),
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+        },
+        "slow_requests_completed": sum(part[2] for part in parts),
+    }
+
+
+def _wait_ready(url, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url + DEFAULT_ROUTES[0], timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"服务未能在{timeout}秒内启动: {url}")
+
+
+def _wait_port(port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"端口{port}未能在{timeout}秒内就绪")
+
+
+COMPARE_MODES = ['dev', 'wsgi', 'asgi']
+
+
+def compare_modes(args):
+    """
+    依次以dev、wsgi和asgi方式启动服务, 使用相同负载压测; speedup为相对dev的吞吐倍数
+    问答请求由同一个假LLM服务回答, 每次等待args.llm_delay秒
+    """
+    results = {"fake_nodes": args.fake_nodes, "fake_latency_s": args.fake_latency, "workers": args.workers,
+               "threads": args.threads, "llm_delay_s": args.llm_delay}
+    llm_port = args.port + len(COMPARE_MODES)
+    llm = subprocess.Popen([sys.executable, '-m', 'backend.benchmarks.fake_llm_server',
+                            '--port', str(llm_port), '--delay', str(args.llm_delay)],
+                           stdout=subprocess.DEVNULL)
+    try:
+        _wait_port(llm_port)
+        for offset, mode in enumerate(COMPARE_MODES):
+            port = args.port + offset
+            url = f"http://127.0.0.1:{port}"
+            # 压测客户端只有一个IP, 关闭按客户端限流, 否则get_kg的大部分请求会返回429
+            env = dict(os.environ, RATE_LIMIT_GET_KG='', RATE_LIMIT_GET_KG_LOD='', RATE_LIMIT_SEARCH='',
+                       RATE_LIMIT_NEIGHBORHOOD='', CHAT_USE_LLM='1', DEEPSEEK_API_KEY='bench',
+                       DEEPSEEK_API_URL=f"http://127.0.0.1:{llm_port}/v1/chat/completions")
+            proc = subprocess.Popen([sys.executable, '-m', 'backend.benchmarks.bench_server', '--mode', mode,
+                                     '--fake-nodes', str(args.fake_nodes), '--fake-latency', str(args.fake_latency),
+                                     '--host', '127.0.0.1', '--port', str(port),
+                                     '--workers', str(args.workers), '--threads', str(args.threads)], env=env)
+            try:
+                _wait_ready(url)
+                results[mode] = run_load(url, args.routes, args.concurrency, args.duration,
+                                         args.slow_concurrency, args.client_processes)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+    finally:
+        llm.terminate()
+        llm.wait(timeout=30)
+
+    before = results['dev']['throughput_rps']
+    results['speedup'] = {mode: round(results[mode]['throughput_rps'] / before, 2) if before else None
+                          for mode in COMPARE_MODES[1:]}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="并发吞吐基准测试")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--routes', nargs='+', default=DEFAULT_ROUTES)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--slow-concurrency', type=int, default=0, help="并发的问答(慢)请求数")
+    parser.add_argument('--duration', type=float, default=20.0, help="每轮压测时长(秒)")
+    parser.add_argument('--compare', action='store_true', help="自动启动dev、wsgi和asgi三种方式对比")
+    parser.add_argument('--fake-nodes', type=int, default=0, help="--compare时使用假Neo4j驱动及该规模的合成图谱")
+    parser.add_argument('--fake-latency', type=float, default=0.005, help="假驱动每次查询的等待秒数")
+    parser.add_argument('--llm-delay', type=float, default=2.0, help="--compare时假LLM每次回答的等待秒数")
+    parser.add_argument('--port', type=int, default=5100, help="--compare时使用的起始端口(之后的端口依次用于各模式与假LLM)")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help="--compare时wsgi模式每个进程的线程数")
+    parser.add_argument('--client-processes', type=int, default=1, help="压测进程数")
+    parser.add_argument('--output', help="结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        results = compare_modes(args)
+    else:
+        results = run_load(args.url, args.routes, args.concurrency, args.duration,
+                           args.slow_concurrency, args.client_processes)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+知识抽取(入库)基准: 使用本地假LLM服务与记录写入的假Neo4j驱动运行 MedicalKGBuilder.build_knowledge_graph
+
+    python -m backend.benchmarks.bench_ingestion --synthetic-chars 50000 --delay 0.2 --truncate-rate 0.1
+    python -m backend.benchmarks.bench_ingestion --docx model/words/需要紧急救治的急危重伤病标准.docx --output ingest.json
+
+报告分块吞吐(chunks/s)、LLM调用次数与延迟、JSON解析修复率以及Neo4j写入速率。
+假LLM的输出由输入文本确定, 相同参数的多次运行结果可直接对比。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from datetime import datetime
+from unittest import mock
+
+from backend.benchmarks.bench_backend import git_commit
+from backend.benchmarks.bench_concurrency import percentile
+from backend.benchmarks.fake_llm_server import FakeLLM, FakeLLMServer
+from backend.benchmarks.fake_neo4j import RecordingDriver
+from backend.benchmarks.synthetic_graph import NAME_STEMS
+
+SENTENCE_TEMPLATES = [
+    "{疾病}患者应{紧急}进行{治疗}，同时完善{检查}。",
+    "{疾病}常伴有{并发症}，需持续监测{生命体征}。",
+    "{治疗}后给予{药物}静脉推注，注意监测{生命体征}变化。",
+    "怀疑{疾病}时首选{检查}明确诊断，必要时使用{药物}。",
+    "{疾病}未及时治疗可引起{并发症}，应尽快行{治疗}。",
+]
+
+
+def synthetic_text(num_chars, seed=42):
+    """由医学名词模板拼成的合成文档, 每段4句"""
+    rng = random.Random(seed)
+    paragraphs, length = [], 0
+    while length < num_chars:
+        sentences = []
+        for _ in range(4):
+            template = rng.choice(SENTENCE_TEMPLATES)
+            sentences.append(template.format(
+                紧急=rng.choice(["立即", "尽快"]),
+                **{entity_type: rng.choice(stems) for entity_type, stems in NAME_STEMS.items()}))
+        paragraph = ''.join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 1
+    return paragraphs
+
+
+def write_synthetic_docx(path, num_chars, seed=42):
+    """生成合成DOCX: 正文段落加一个带合并表头单元格的表格"""
+    from docx import Document
+
+    document = Document()
+    document.add_heading("急危重症处置标准(合成)", level=1)
+    for paragraph in synthetic_text(num_chars, seed):
+        document.add_paragraph(paragraph)
+
+    rng = random.Random(seed)
+    table = document.add_table(rows=2, cols=3)
+    table.cell(0, 0).merge(table.cell(0, 2)).text = "常见急危重症及首选处置"
+    for i, header in enumerate(["疾病", "首选治疗", "常用药物"]):
+        table.cell(1, i).text = header
+    for disease in NAME_STEMS["疾病"]:
+        row = table.add_row().cells
+        row[0].text = disease
+        row[1].text = rng.choice(NAME_STEMS["治疗"])
+        row[2].text = rng.choice(NAME_STEMS["药物"])
+    document.save(path)
+    return path
+
+
+def instrument(builder):
+    """包装builder的方法以统计分块数、LLM调用、JSON修复与写入耗时"""
+    stats = {
+        "chunks": 0,
+        "llm_latencies": [],
+        "repair_attempts": 0,
+        "repaired": 0,
+        "repair_failed": 0,
+        "extract_s": 0.0,
+        "write_s": 0.0,
+    }
+
+    def wrap(name, before=None, after=None):
+        original = getattr(builder, name)
+
+        def wrapper(*args, **kwargs):
+            if before:
+                before(*args)
+            start = time.perf_counter()
+            try:
+                result = original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+            return after(result, elapsed) if after else result
+        setattr(builder, name, wrapper)
+        return wrapper
+
+    def count_chunk(*args):
+        stats["chunks"] += 1
+
+    def record_call(result, elapsed):
+        stats["llm_latencies"].append(elapsed)
+        return result
+
+    def record_repair(fixed, elapsed):
+        stats["repair_attempts"] += 1
+        try:
+            json.loads(fixed)
+            stats["repaired"] += 1
+        except ValueError:
+            stats["repair_failed"] += 1
+        return fixed
+
+    def add_time(key):
+        def after(result, elapsed):
+            stats[key] += elapsed
+            return result
+        return after
+
+    wrap("_extract_from_chunk", before=count_chunk)
+    wrap("_call_deepseek", after=record_call)
+    wrap("_fix_truncated_json", after=record_repair)
+    wrap("extract_knowledge_from_text", after=add_time("extract_s"))
+    wrap("create_entities", after=add_time("write_s"))
+    wrap("create_relationships", after=add_time("write_s"))
+    return stats
+
+
+def run(texts, chunk_size, llm, neo4j_latency=0.0, verbose=False):
+    from model.handleData import MedicalKGBuilder
+
+    driver = RecordingDriver(latency=neo4j_latency)
+    with FakeLLMServer(llm) as server, \
+            mock.patch('model.handleData.GraphDatabase.driver', lambda *args, **kwargs: driver):
+        builder = MedicalKGBuilder("bolt://fake", "neo4j", "fake", deepseek_api_key="fake",
+                                   deepseek_api_url=server.url)
+        stats = instrument(builder)
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        entities = relationships = 0
+        start = time.perf_counter()
+        with output:
+            for text in texts:
+                kg_data = builder.build_knowledge_graph(text, chunk_size=chunk_size)
+                entities += len(kg_data["entities"])
+                relationships += len(kg_data["relationships"])
+        elapsed = time.perf_counter() - start
+        builder.close()
+
+    latencies = stats["llm_latencies"]
+    llm_calls = len(latencies)
+    return {
+        "documents": len(texts),
+        "characters": sum(len(text) for text in texts),
+        "chunk_size": chunk_size,
+        "elapsed_s": round(elapsed, 3),
+        "chunks": stats["chunks"],
+        "chunks_per_s": round(stats["chunks"] / stats["extract_s"], 2) if stats["extract_s"] else 0.0,
+        "llm": {
+            "calls": llm_calls,
+            "calls_per_chunk": round(llm_calls / stats["chunks"], 2) if stats["chunks"] else 0.0,
+            "total_s": round(sum(latencies), 3),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 2),
+                "p95": round(percentile(latencies, 95) * 1000, 2),
+                "p99": round(percentile(latencies, 99) * 1000, 2),
+            },
+            "server": dict(llm.stats),
+        },
+        "parse": {
+            "repair_attempts": stats["repair_attempts"],
+            "repaired": stats["repaired"],
+            "repair_failed": stats["repair_failed"],
+            # 需要修复的响应占全部LLM响应的比例, 以及修复成功的比例
+            "repair_rate": round(stats["repair_attempts"] / llm_calls, 4) if llm_calls else 0.0,
+            "repair_success_rate": (round(stats["repaired"] / stats["repair_attempts"], 4)
+                                    if stats["repair_attempts"] else None),
+        },
+        "neo4j": {
+            "writes": driver.writes,
+            "write_s": round(stats["write_s"], 3),
+            "writes_per_s": round(driver.writes / stats["write_s"], 2) if stats["write_s"] else 0.0,
+            "nodes": len(driver.node_ids),
+            "relationships": len(driver.relationships),
+        },
+        "extracted": {"entities": entities, "relationships": relationships},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="知识抽取基准(假LLM + 假Neo4j)")
+    parser.add_argument('--docx', nargs='*', default=[], help="真实DOCX文件")
+    parser.add_argument('--synthetic-chars', type=int, default=0,
+                        help="生成指定字数的合成DOCX(未指定--docx时默认30000)")
+    parser.add_argument('--chunk-size', type=int, default=1500)
+    parser.add_argument('--delay', type=float, default=0.0, help="假LLM的基础响应延迟(秒)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="假LLM的额外延迟上限(秒)")
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help="返回截断JSON的比例")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="返回格式错误JSON的比例")
+    parser.add_argument('--neo4j-latency', type=float, default=0.0, help="每条写入语句的模拟耗时(秒)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="显示构建过程的输出")
+    parser.add_argument('--output', help="结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    from model.utils.readDocx import readDocx
+
+    paths = list(args.docx)
+    synthetic_chars = args.synthetic_chars or (0 if paths else 30000)
+    with tempfile.TemporaryDirectory() as tmp:
+        if synthetic_chars:
+            paths.append(write_synthetic_docx(os.path.join(tmp, "synthetic.docx"), synthetic_chars))
+        # 首次读取为完整解析, 再次读取应命中解析缓存
+        cache_dir = os.path.join(tmp, "docx_cache")
+        start = time.perf_counter()
+        texts = [readDocx(path, cache_dir) for path in paths]
+        read_s = time.perf_counter() - start
+        start = time.perf_counter()
+        for path in paths:
+            readDocx(path, cache_dir)
+        cached_read_s = time.perf_counter() - start
+
+    llm = FakeLLM(args.delay, args.jitter, args.truncate_rate, args.malformed_rate, seed=args.seed)
+    result = run(texts, args.chunk_size, llm, args.neo4j_latency, args.verbose)
+    result["read_docx_s"] = round(read_s, 3)
+    result["read_docx_cached_s"] = round(cached_read_s, 4)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "inputs": [os.path.basename(path) for path in args.docx] + (
+                [f"synthetic:{synthetic_chars}"] if synthetic_chars else []),
+            "llm_delay_s": args.delay,
+            "llm_jitter_s": args.jitter,
+            "truncate_rate": args.truncate_rate,
+            "malformed_rate": args.malformed_rate,
+            "neo4j_latency_s": args.neo4j_latency,
+            "seed": args.seed,
+        },
+        "result": result,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
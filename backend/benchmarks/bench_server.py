@@ -0,0 +1,67 @@
+"""
+并发基准使用的服务启动器: 以 dev / wsgi / asgi 三种方式启动后端, 可选使用内存中的假Neo4j驱动
+
+    python -m backend.benchmarks.bench_server --mode dev --port 5100 --fake-nodes 2000
+    python -m backend.benchmarks.bench_server --mode asgi --port 5101 --workers 2 --fake-nodes 2000
+
+dev为改造前的启动方式(backend/app.py 的 Flask 开发服务器, 单进程多线程; 关闭调试器与自动重载,
+避免其额外开销计入结果), wsgi/asgi 与 backend.serve 相同。
+设置 --fake-nodes 时各worker进程在创建应用前替换Neo4j驱动, 假驱动的每次查询等待 --fake-latency 秒,
+同步驱动阻塞线程, 异步驱动只让出事件循环, 与真实驱动等待网络时的行为一致。
+"""
+import argparse
+import os
+
+from backend import serve
+
+# 由启动器通过环境变量传给gunicorn/uvicorn的worker进程
+FAKE_NODES_ENV = 'BENCH_FAKE_NEO4J_NODES'
+FAKE_LATENCY_ENV = 'BENCH_FAKE_NEO4J_LATENCY'
+
+_fake_driver = None
+
+
+def _install_fake_driver():
+    """在当前进程内使用假驱动(进程内只安装一次, 直到进程退出)"""
+    global _fake_driver
+    num_nodes = int(os.getenv(FAKE_NODES_ENV, '0'))
+    if not num_nodes or _fake_driver is not None:
+        return
+    from backend.benchmarks.fake_neo4j import FakeDriver, use_fake_driver
+    _fake_driver = use_fake_driver(FakeDriver.synthetic(num_nodes, latency=float(os.getenv(FAKE_LATENCY_ENV, '0'))))
+    _fake_driver.__enter__()
+
+
+def create_app():
+    _install_fake_driver()
+    from backend.app import create_app as create_flask_app
+    return create_flask_app()
+
+
+def create_async_app():
+    _install_fake_driver()
+    from backend.app.async_app import create_async_app as create_quart_app
+    return create_quart_app()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="启动基准测试用的后端服务")
+    parser.add_argument('--mode', choices=['dev', 'wsgi', 'asgi'], required=True)
+    parser.add_argument('--fake-nodes', type=int, default=0, help="使用假Neo4j驱动及该规模的合成图谱, 为0时连接真实Neo4j")
+    parser.add_argument('--fake-latency', type=float, default=0.005, help="假驱动每次查询的等待秒数")
+    args, rest = parser.parse_known_args(argv)
+    os.environ[FAKE_NODES_ENV] = str(args.fake_nodes)
+    os.environ[FAKE_LATENCY_ENV] = str(args.fake_latency)
+
+    server_args = serve.parse_args(['--mode', 'wsgi' if args.mode == 'dev' else args.mode] + rest)
+    if args.mode == 'dev':
+        create_app().run(host=server_args.host, port=server_args.port, threaded=True,
+                         debug=False, use_reloader=False)
+    elif args.mode == 'wsgi':
+        serve.run_wsgi(server_args, app='backend.benchmarks.bench_server:create_app()')
+    else:
+        serve.run_asgi(server_args, factory='backend.benchmarks.bench_server:create_async_app')
+
+
+if __name__ == '__main__':
+    main()
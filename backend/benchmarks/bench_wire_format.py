@@ -0,0 +1,73 @@
+"""
+get_kg 响应格式基准: 对比原始JSON与列式紧凑格式的体积和编码耗时
+
+    python -m backend.benchmarks.bench_wire_format --nodes 20000 --degree 3
+"""
+import argparse
+import gzip
+import json
+import time
+
+from backend.app.utils import graph_codec
+from backend.benchmarks.synthetic_graph import generate_graph
+
+
+def _timed(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def run(num_nodes, avg_degree, repeat=3):
+    graph = generate_graph(num_nodes, avg_degree)
+
+    variants = {
+        # 原接口: jsonify 默认转义中文
+        "json": lambda: json.dumps(graph, separators=(',', ':')).encode('utf-8'),
+        "json_utf8": lambda: graph_codec.dumps(graph),
+        "compact": lambda: graph_codec.dumps(graph_codec.encode_compact(graph)),
+    }
+
+    results = {"nodes": len(graph["nodes"]), "links": len(graph["links"]), "formats": {}}
+    for name, encode in variants.items():
+        body, encode_ms = _timed(encode, repeat)
+        row = {"bytes": len(body), "encode_ms": round(encode_ms, 2)}
+
+        gz, gzip_ms = _timed(lambda: gzip.compress(body, compresslevel=graph_codec.GZIP_LEVEL), repeat)
+        row["gzip_bytes"] = len(gz)
+        row["gzip_ms"] = round(gzip_ms, 2)
+        if graph_codec.brotli is not None:
+            br, br_ms = _timed(lambda: graph_codec.brotli.compress(body, quality=graph_codec.BROTLI_QUALITY), repeat)
+            row["br_bytes"] = len(br)
+            row["br_ms"] = round(br_ms, 2)
+
+        _, decode_ms = _timed(lambda: json.loads(body), repeat)
+        row["parse_ms"] = round(decode_ms, 2)
+        results["formats"][name] = row
+
+    base = results["formats"]["json"]
+    compact = results["formats"]["compact"]
+    results["savings"] = {
+        "bytes_ratio": round(base["bytes"] / compact["bytes"], 2),
+        "gzip_bytes_ratio": round(base["gzip_bytes"] / compact["gzip_bytes"], 2),
+        "encode_speedup": round(base["encode_ms"] / compact["encode_ms"], 2),
+        "parse_speedup": round(base["parse_ms"] / compact["parse_ms"], 2),
+    }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="get_kg 响应格式基准")
+    parser.add_argument('--nodes', type=int, default=20000)
+    parser.add_argument('--degree', type=float, default=3.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.nodes, args.degree, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
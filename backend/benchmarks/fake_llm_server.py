@@ -0,0 +1,291 @@
+"""
+本地的假chat completions服务(OpenAI/DeepSeek兼容), 用于不消耗API额度地测试知识抽取流程
+
+根据提示词中的文档内容确定性地生成实体/关系JSON: 相同的输入总是得到相同的输出。
+可配置响应延迟, 并按比例返回被截断或格式错误的JSON, 用于测量解析修复的开销与成功率。
+
+    python -m backend.benchmarks.fake_llm_server --port 8001 --delay 0.5 --truncate-rate 0.1
+    DEEPSEEK_API_URL=http://127.0.0.1:8001/v1/chat/completions python model/handleData.py
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.benchmarks.synthetic_graph import ID_PREFIX, NAME_STEMS, NODE_PROPERTY_VALUES, RELATIONSHIPS
+
+# 实体属性名, 与抽取提示词中的要求一致
+ENTITY_PROPERTY = {
+    "疾病": "严重程度",
+    "治疗": "紧急程度",
+    "检查": "检查目的",
+    "药物": "用药途径",
+    "生命体征": "正常范围",
+    "并发症": "发生率",
+}
+PREFIX_TYPE = {prefix: entity_type for entity_type, prefix in ID_PREFIX.items()}
+MAX_ENTITIES = 25
+MAX_RELATIONSHIPS = 40
+
+
+def _digest(*parts) -> int:
+    """确定性哈希(不受PYTHONHASHSEED影响)"""
+    text = '\x1f'.join(str(part) for part in parts)
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _fraction(*parts) -> float:
+    return _digest(*parts) / 2 ** 64
+
+
+def _pick(values, *parts):
+    return values[_digest(*parts) % len(values)]
+
+
+def _document(prompt: str) -> str:
+    index = prompt.rfind('文档:')
+    return prompt[index + 3:].strip() if index != -1 else prompt
+
+
+def extract_entities(document: str):
+    """按出现顺序找出文档中的已知医学名词; 找不到时把短句当作疾病名, 保证真实文档也有输出"""
+    found = []
+    for entity_type, stems in NAME_STEMS.items():
+        for stem in stems:
+            position = document.find(stem)
+            if position != -1:
+                found.append((position, entity_type, stem))
+    found.sort()
+
+    if not found:
+        phrases = [p for p in re.split(r'[\s，。；：、,.;:()（）]+', document) if 2 <= len(p) <= 10]
+        found = [(i, "疾病", phrase) for i, phrase in enumerate(dict.fromkeys(phrases))]
+
+    entities, counters, seen = [], {}, set()
+    for _, entity_type, name in found:
+        if (entity_type, name) in seen:
+            continue
+        seen.add((entity_type, name))
+        prefix = ID_PREFIX[entity_type]
+        counters[prefix] = counters.get(prefix, 0) + 1
+        entities.append({
+            "id": f"{prefix}{counters[prefix]}",
+            "type": entity_type,
+            "name": name,
+            "properties": {ENTITY_PROPERTY[entity_type]: _pick(NODE_PROPERTY_VALUES[entity_type], name)},
+        })
+        if len(entities) >= MAX_ENTITIES:
+            break
+    return entities
+
+
+def extract_relationships(prompt: str, document: str):
+    """疾病(及部分治疗)连向其他类型的实体, 是否相连由实体对的哈希决定"""
+    match = re.search(r'实体列表:\s*(.*)', prompt)
+    entities = re.findall(r'([a-z]+\d+)\(([^)]*)\)', match.group(1)) if match else []
+    by_type = {}
+    for entity_id, name in entities:
+        entity_type = PREFIX_TYPE.get(re.match(r'[a-z]+', entity_id).group())
+        if entity_type:
+            by_type.setdefault(entity_type, []).append((entity_id, name))
+
+    sources = by_type.get("疾病", []) + by_type.get("治疗", [])
+    relationships = []
+    for source_id, source_name in sources:
+        for target_type, (rel_type, options) in RELATIONSHIPS.items():
+            if source_id.startswith('t') and target_type not in ("药物", "检查"):
+                continue
+            for target_id, target_name in by_type.get(target_type, []):
+                if _fraction(document[:200], source_id, target_id) > 0.5:
+                    continue
+                properties = {key: _pick(values, source_name, target_name, key)
+                              for key, values in options.items()}
+                relationships.append({
+                    "from": source_id,
+                    "to": target_id,
+                    "type": rel_type,
+                    "properties": {k: v for k, v in properties.items() if v is not None},
+                })
+                if len(relationships) >= MAX_RELATIONSHIPS:
+                    return relationships
+    return relationships
+
+
+def render(items) -> str:
+    """按模型常见的输出样式序列化: 每个对象一行"""
+    lines = [json.dumps(item, ensure_ascii=False) for item in items]
+    return "[\n  " + ",\n  ".join(lines) + "\n]" if lines else "[]"
+
+
+def malform(content: str) -> str:
+    """模拟常见的格式问题: 前后附带说明文字和代码块标记, 且数组最后多一个逗号"""
+    broken = re.sub(r'\}\s*\]\s*$', '},\n]', content)
+    return f"以下是提取结果:\n```json\n{broken}\n```\n如需更多信息请告诉我。"
+
+
+class FakeLLM:
+    """
+    Args:
+        delay: 每次响应的基础延迟(秒)
+        jitter: 在基础延迟上增加的 [0, jitter) 秒随机延迟(由输入确定)
+        truncate_rate: 返回在中途截断的JSON的比例
+        malformed_rate: 返回格式错误JSON的比例
+        chars_per_token: 估算输出token数时每个token对应的字符数, 超过max_tokens的输出会被截断
+        seed: 改变故障注入的选择
+    """
+
+    def __init__(self, delay=0.0, jitter=0.0, truncate_rate=0.0, malformed_rate=0.0,
+                 chars_per_token=3.0, seed=0):
+        self.delay = delay
+        self.jitter = jitter
+        self.truncate_rate = truncate_rate
+        self.malformed_rate = malformed_rate
+        self.chars_per_token = chars_per_token
+        self.seed = seed
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "truncated": 0, "malformed": 0, "length_limited": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def complete(self, payload):
+        """
+        生成chat completions响应
+        Returns:
+            (响应字典, 应等待的秒数)
+        """
+        self._count("requests")
+        prompt = payload["messages"][-1]["content"]
+        document = _document(prompt)
+        if '实体列表' in prompt:
+            content = render(extract_relationships(prompt, document))
+        else:
+            content = render(extract_entities(document))
+
+        finish_reason = "stop"
+        max_chars = int(payload.get("max_tokens", 4096) * self.chars_per_token)
+        roll = _fraction(self.seed, prompt)
+        if len(content) > max_chars:
+            content = content[:max_chars]
+            finish_reason = "length"
+            self._count("length_limited")
+        elif roll < self.truncate_rate:
+            content = content[:max(1, int(len(content) * (0.4 + 0.5 * _fraction(prompt, 'cut'))))]
+            finish_reason = "length"
+            self._count("truncated")
+        elif roll < self.truncate_rate + self.malformed_rate:
+            content = malform(content)
+            self._count("malformed")
+
+        completion_tokens = int(len(content) / self.chars_per_token) + 1
+        prompt_tokens = int(sum(len(m["content"]) for m in payload["messages"]) / self.chars_per_token) + 1
+        response = {
+            "id": f"chatcmpl-{_digest(prompt):016x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+        return response, self.delay + self.jitter * _fraction(prompt, 'delay')
+
+
+def _handler(llm):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                response, wait = llm.complete(payload)
+            except (ValueError, KeyError, IndexError) as e:
+                self._send(400, {"error": {"message": f"invalid request: {e}"}})
+                return
+            if wait:
+                time.sleep(wait)
+            self._send(200, response)
+
+    return Handler
+
+
+class FakeLLMServer:
+    """在后台线程中运行的假chat completions服务"""
+
+    def __init__(self, llm=None, host='127.0.0.1', port=0):
+        self.llm = llm or FakeLLM()
+        self._server = ThreadingHTTPServer((host, port), _handler(self.llm))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="假chat completions服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--delay', type=float, default=0.0, help="基础响应延迟(秒)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="额外的随机延迟上限(秒)")
+    parser.add_argument('--truncate-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    llm = FakeLLM(args.delay, args.jitter, args.truncate_rate, args.malformed_rate, seed=args.seed)
+    server = FakeLLMServer(llm, args.host, args.port)
+    print(f"假LLM服务已启动: {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+        print(json.dumps(llm.stats, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
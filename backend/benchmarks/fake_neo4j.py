@@ -0,0 +1,235 @@
+"""
+内存中的Neo4j替身, 用于在没有数据库的环境下压测后端与知识抽取流程
+
+FakeDriver 实现了 Neo4jKnowledgeGraph 用到的驱动接口(driver.session() / session.run() / driver.close()),
+按查询语句返回 synthetic_graph 生成的记录。搜索为对节点名的线性扫描, 只反映后端自身的开销,
+不代表真实Neo4j的查询耗时; 可用 latency 参数模拟网络往返与数据库耗时。
+AsyncFakeDriver 以异步接口包装同一个 FakeDriver, 供 ASGI(Quart) 版本使用。
+RecordingDriver 接受任意写入语句, 只统计写入次数, 用于 MedicalKGBuilder 的基准测试。
+
+    with use_fake_driver(FakeDriver.synthetic(10000)):
+        app = create_app()            # 或 create_async_app()
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from backend.app.api import knowledge_graph, async_knowledge_graph
+from backend.app.api.knowledge_graph import (
+    NODES_QUERY, LINKS_QUERY, SEARCH_QUERY, NODE_COUNT_QUERY, REL_COUNT_QUERY, GRAPH_META_QUERY,
+    SEARCH_TEXT_QUERY, NEIGHBORHOOD_NODES_QUERY, neighborhood_links_query,
+)
+from backend.benchmarks.synthetic_graph import generate_records
+
+SEARCH_LIMIT = 20
+
+
+class FakeResult:
+    def __init__(self, records):
+        self._records = records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def single(self):
+        return self._records[0] if self._records else None
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwargs):
+        params = dict(parameters or {}, **kwargs)
+        return FakeResult(self._driver.execute(query, params))
+
+
+class FakeDriver:
+    """
+    Args:
+        node_records / link_records: 与 NODES_QUERY / LINKS_QUERY 返回列一致的记录
+        latency: 每次查询额外等待的秒数
+    """
+
+    def __init__(self, node_records, link_records, latency=0.0):
+        self.node_records = node_records
+        self.link_records = link_records
+        self.latency = latency
+        self.queries = 0
+        # 搜索时按小写名称匹配, 预先计算避免每次查询重复转换
+        self._search_index = [((record["name"] or "").lower(), record) for record in node_records]
+        self._nodes_by_id = {record["id"]: record for record in node_records}
+        self._incident = {}
+        for link in link_records:
+            self._incident.setdefault(link["source"], []).append(link)
+            self._incident.setdefault(link["target"], []).append(link)
+
+    @classmethod
+    def synthetic(cls, num_nodes, avg_degree=3.0, seed=42, latency=0.0):
+        node_records, link_records = generate_records(num_nodes, avg_degree, seed)
+        return cls(node_records, link_records, latency)
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+    def execute(self, query, params, latency=True):
+        self.queries += 1
+        if self.latency and latency:
+            time.sleep(self.latency)
+        if query == NODES_QUERY:
+            return self.node_records
+        if query == LINKS_QUERY:
+            return self.link_records
+        if query == SEARCH_QUERY:
+            term = params["query"].lower()
+            results = []
+            for name, record in self._search_index:
+                if term in name:
+                    results.append(record)
+                    if len(results) >= SEARCH_LIMIT:
+                        break
+            return results
+        if query == SEARCH_TEXT_QUERY:
+            return [{"id": record["id"], "name": record["name"], "症状描述": None, "注意事项": None}
+                    for record in self.node_records]
+        if query == NEIGHBORHOOD_NODES_QUERY:
+            return [self._nodes_by_id[i] for i in params["ids"] if i in self._nodes_by_id]
+        if query.lstrip().startswith("MATCH (c {id: $id})"):
+            depth = next(d for d in range(1, 10) if query == neighborhood_links_query(d))
+            return self._neighborhood_links(params["id"], depth, params["limit"])
+        if query == NODE_COUNT_QUERY:
+            return [{"count": len(self.node_records)}]
+        if query == REL_COUNT_QUERY:
+            return [{"count": len(self.link_records)}]
+        if query == GRAPH_META_QUERY:
+            return []
+        if query.strip().upper().startswith("RETURN 1"):
+            return [{"test": 1}]
+        raise NotImplementedError(f"FakeDriver不支持的查询: {query.strip()[:60]}")
+
+
+    def _neighborhood_links(self, node_id, depth, limit):
+        """与NEIGHBORHOOD_LINKS_QUERY一致: depth跳以内的关系(不区分方向), 去重后最多limit条"""
+        links, seen, frontier, visited = [], set(), [node_id], {node_id}
+        for _ in range(depth):
+            next_frontier = []
+            for current in frontier:
+                for link in self._incident.get(current, ()):
+                    if id(link) in seen:
+                        continue
+                    seen.add(id(link))
+                    links.append(link)
+                    if len(links) >= limit:
+                        return links
+                    for end in (link["source"], link["target"]):
+                        if end not in visited:
+                            visited.add(end)
+                            next_frontier.append(end)
+            frontier = next_frontier
+        return links
+
+
+class AsyncFakeResult:
+    def __init__(self, records):
+        self._records = records
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for record in self._records:
+            yield record
+
+    async def single(self):
+        return self._records[0] if self._records else None
+
+
+class AsyncFakeSession:
+    def __init__(self, driver):
+        self._driver = driver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def run(self, query, parameters=None, **kwargs):
+        params = dict(parameters or {}, **kwargs)
+        if self._driver.latency:
+            # 异步驱动等待网络时不占用事件循环
+            await asyncio.sleep(self._driver.latency)
+        return AsyncFakeResult(self._driver.execute(query, params, latency=False))
+
+
+class AsyncFakeDriver:
+    """FakeDriver的异步接口, 与同步版本共享数据与查询计数"""
+
+    def __init__(self, driver):
+        self.sync_driver = driver
+        self.latency = driver.latency
+
+    def session(self, **kwargs):
+        return AsyncFakeSession(self)
+
+    def execute(self, query, params, latency=True):
+        return self.sync_driver.execute(query, params, latency)
+
+    async def close(self):
+        pass
+
+
+class RecordingDriver:
+    """
+    记录写入的假驱动: 统计语句数, 并按参数中的id记录节点与关系(用于计数查询)
+    Args:
+        latency: 每条语句额外等待的秒数
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.writes = 0
+        self.node_ids = set()
+        self.relationships = set()
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+    def execute(self, query, params):
+        self.writes += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if 'count(' in query:
+            count = len(self.relationships) if '[r]' in query else len(self.node_ids)
+            return [{"count": count}]
+        if 'from_id' in params:
+            self.relationships.add((params['from_id'], params['to_id'], query))
+        elif 'id' in params:
+            self.node_ids.add(params['id'])
+        return []
+
+
+@contextmanager
+def use_fake_driver(driver):
+    """在上下文内让 Neo4jKnowledgeGraph 与 AsyncNeo4jKnowledgeGraph 使用给定的假驱动"""
+    async_driver = AsyncFakeDriver(driver)
+    with mock.patch.object(knowledge_graph.GraphDatabase, 'driver', lambda *args, **kwargs: driver), \
+            mock.patch.object(async_knowledge_graph.AsyncGraphDatabase, 'driver',
+                              lambda *args, **kwargs: async_driver):
+        yield driver
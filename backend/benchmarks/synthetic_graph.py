@@ -0,0 +1,120 @@
+"""
+合成医疗知识图谱数据, 用于基准测试
+
+生成的记录与 NODES_QUERY / LINKS_QUERY 的返回列一致, 可直接交给
+node_from_record / link_from_record 转换, 也可作为假Neo4j驱动的数据源。
+"""
+import random
+
+# 实体类型及占比
+ENTITY_TYPES = [
+    ("疾病", 0.30),
+    ("治疗", 0.20),
+    ("检查", 0.15),
+    ("药物", 0.20),
+    ("生命体征", 0.05),
+    ("并发症", 0.10),
+]
+
+ID_PREFIX = {"疾病": "d", "治疗": "t", "检查": "e", "药物": "m", "生命体征": "v", "并发症": "c"}
+
+NAME_STEMS = {
+    "疾病": ["心脏骤停", "急性心肌梗死", "脑卒中", "休克", "急性呼吸衰竭", "消化道出血", "糖尿病酮症酸中毒", "严重创伤"],
+    "治疗": ["心肺复苏", "电除颤", "气管插管", "机械通气", "液体复苏", "溶栓治疗", "介入治疗", "止血"],
+    "检查": ["心电图", "血气分析", "头颅CT", "胸部X线", "超声心动图", "血常规", "凝血功能", "床旁超声"],
+    "药物": ["肾上腺素", "胺碘酮", "阿托品", "去甲肾上腺素", "多巴胺", "硝酸甘油", "甘露醇", "胰岛素"],
+    "生命体征": ["心率", "血压", "呼吸频率", "血氧饱和度", "体温", "意识状态"],
+    "并发症": ["多器官功能衰竭", "缺血缺氧性脑病", "心律失常", "急性肾损伤", "肺水肿", "弥散性血管内凝血"],
+}
+
+NODE_PROPERTY_VALUES = {
+    "疾病": ["危重", "急症", "一般"],
+    "治疗": ["立即", "尽快", "常规"],
+    "检查": ["确诊", "监测", "评估"],
+    "药物": ["静脉注射", "口服", "肌肉注射"],
+    "生命体征": ["60-100次/分", "90-140/60-90mmHg", "95%-100%"],
+    "并发症": ["常见", "少见", "罕见"],
+}
+
+# 目标实体类型 -> 关系类型及属性可选值
+RELATIONSHIPS = {
+    "治疗": ("需要治疗", {"时机": ["立即", "尽快", "必要时"], "顺序": ["首选", "备选"], "条件": ["症状严重时", None]}),
+    "检查": ("需要检查", {"频率": ["持续", "定期", "必要时"], "目的": ["确诊", "监测", "评估"]}),
+    "药物": ("使用药物", {"剂量": ["1mg", "0.5mg", "300mg", None], "给药方式": ["静脉推注", "静脉滴注", "口服"],
+                         "使用时机": ["立即", "复苏后", None], "注意事项": ["监测心率", "注意过敏", None]}),
+    "生命体征": ("监测指标", {"监测频率": ["持续", "每小时", "定期"], "目标值": ["正常范围", "SpO2>94%", None]}),
+    "并发症": ("引起并发症", {"发生率": ["常见", "少见"], "条件": ["未及时治疗", None]}),
+}
+
+
+def generate_records(num_nodes=1000, avg_degree=3.0, seed=42):
+    """
+    生成合成图谱记录
+    Args:
+        num_nodes: 节点数
+        avg_degree: 平均每个节点的出边数
+        seed: 随机种子(相同参数生成相同数据)
+    Returns:
+        (node_records, link_records), 字段与Cypher查询返回列一致
+    """
+    rng = random.Random(seed)
+    type_names = [t for t, _ in ENTITY_TYPES]
+    type_weights = [w for _, w in ENTITY_TYPES]
+
+    node_records = []
+    ids_by_type = {t: [] for t in type_names}
+    counters = {t: 0 for t in type_names}
+    for entity_type in rng.choices(type_names, weights=type_weights, k=num_nodes):
+        counters[entity_type] += 1
+        index = counters[entity_type]
+        node_id = f"{ID_PREFIX[entity_type]}{index}"
+        stem = rng.choice(NAME_STEMS[entity_type])
+        node_records.append({
+            "id": node_id,
+            "name": stem if index <= len(NAME_STEMS[entity_type]) else f"{stem}{index}",
+            "entityType": entity_type,
+            "properties": rng.choice(NODE_PROPERTY_VALUES[entity_type]),
+        })
+        ids_by_type[entity_type].append(node_id)
+
+    # 关系以疾病为主要起点, 少量由治疗指向药物/检查
+    sources = ids_by_type["疾病"] or [r["id"] for r in node_records]
+    target_types = [t for t in RELATIONSHIPS if ids_by_type[t]]
+    num_links = int(num_nodes * avg_degree)
+    seen = set()
+    link_records = []
+    attempts = 0
+    while len(link_records) < num_links and target_types and attempts < num_links * 3:
+        attempts += 1
+        target_type = rng.choice(target_types)
+        if target_type in ("药物", "检查") and ids_by_type["治疗"] and rng.random() < 0.2:
+            source = rng.choice(ids_by_type["治疗"])
+        else:
+            source = rng.choice(sources)
+        target = rng.choice(ids_by_type[target_type])
+        rel_type, options = RELATIONSHIPS[target_type]
+        key = (source, target, rel_type)
+        if key in seen or source == target:
+            continue
+        seen.add(key)
+        link_records.append({
+            "source": source,
+            "target": target,
+            "relationshipType": rel_type,
+            "properties": {name: rng.choice(values) for name, values in options.items()},
+        })
+
+    link_records.sort(key=lambda r: r["source"])
+    node_records.sort(key=lambda r: r["id"])
+    return node_records, link_records
+
+
+def generate_graph(num_nodes=1000, avg_degree=3.0, seed=42):
+    """生成与 get_knowledge_graph() 返回格式相同的图谱数据"""
+    from backend.app.api.knowledge_graph import node_from_record, link_from_record
+
+    node_records, link_records = generate_records(num_nodes, avg_degree, seed)
+    return {
+        "nodes": [node_from_record(r) for r in node_records],
+        "links": [link_from_record(r) for r in link_records],
+    }
@@ -0,0 +1,72 @@
+"""
+生产环境启动脚本
+
+    python -m backend.serve --mode wsgi --workers 4 --threads 8
+    python -m backend.serve --mode asgi --workers 4 --limit-concurrency 512
+
+wsgi模式(默认): gunicorn多线程worker运行原有Flask应用
+asgi模式: uvicorn + Quart, Neo4j与大模型调用为异步I/O; 两个版本共用backend.app.utils.graph_source中的
+数据源回退、状态与限流逻辑, 指标与/metrics一致, 但按请求剖析(PROFILE_ENABLED)只在wsgi模式下提供
+"""
+import argparse
+import os
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="启动后端服务")
+    parser.add_argument('--mode', choices=['asgi', 'wsgi'], default=os.getenv('SERVER_MODE', 'wsgi'))
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVER_PORT', '5000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', str(os.cpu_count() or 1))),
+                        help="工作进程数")
+    parser.add_argument('--threads', type=int, default=int(os.getenv('SERVER_THREADS', '8')),
+                        help="wsgi模式下每个进程的线程数")
+    parser.add_argument('--limit-concurrency', type=int, default=int(os.getenv('SERVER_LIMIT_CONCURRENCY', '512')),
+                        help="asgi模式下每个进程同时处理的最大连接数, 超出时返回503")
+    parser.add_argument('--backlog', type=int, default=int(os.getenv('SERVER_BACKLOG', '2048')))
+    parser.add_argument('--timeout', type=int, default=int(os.getenv('SERVER_TIMEOUT', '120')),
+                        help="wsgi模式下单个请求的超时时间(秒)")
+    parser.add_argument('--keep-alive', type=int, default=int(os.getenv('SERVER_KEEP_ALIVE', '5')))
+    return parser.parse_args(argv)
+
+
+def run_asgi(args, factory="backend.app.async_app:create_async_app"):
+    import uvicorn
+    uvicorn.run(
+        factory,
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        limit_concurrency=args.limit_concurrency,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        access_log=False,
+    )
+
+
+def run_wsgi(args, app='backend.app:create_app()'):
+    cmd = [
+        'gunicorn',
+        '--bind', f'{args.host}:{args.port}',
+        '--workers', str(args.workers),
+        '--worker-class', 'gthread',
+        '--threads', str(args.threads),
+        '--backlog', str(args.backlog),
+        '--timeout', str(args.timeout),
+        '--keep-alive', str(args.keep_alive),
+        app,
+    ]
+    os.execvp(cmd[0], cmd)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.mode == 'asgi':
+        run_asgi(args)
+    else:
+        run_wsgi(args)
+
+
+if __name__ == '__main__':
+    main()
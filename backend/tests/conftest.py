@@ -0,0 +1,23 @@
+import pytest
+
+from backend.app import create_app
+from backend.benchmarks.fake_neo4j import FakeDriver, use_fake_driver
+
+
+@pytest.fixture
+def driver():
+    return FakeDriver.synthetic(200, seed=7)
+
+
+@pytest.fixture
+def app(driver):
+    """使用内存假Neo4j驱动的Flask应用, 不启动后台健康检查"""
+    with use_fake_driver(driver):
+        app = create_app({'TESTING': True, 'NEO4J_HEALTH_INTERVAL': 0})
+        yield app
+        app.extensions['neo4j'].close()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
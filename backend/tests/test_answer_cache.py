@@ -0,0 +1,100 @@
+import pytest
+
+from backend.app.utils import answer_cache as answer_cache_module
+from backend.app.utils.answer_cache import AnswerCache, normalize_question, question_skeleton
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的单调时钟"""
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_normalize_strips_punctuation_and_particles():
+    assert normalize_question("请问 心脏骤停怎么处理？") == normalize_question("心脏骤停怎么处理呢")
+    # 只在句尾去除语气词, 不影响"吗啡"
+    assert normalize_question("吗啡的用法") == "吗啡的用法"
+
+
+def test_exact_and_filler_only_near_hit():
+    cache = AnswerCache()
+    cache.put("心脏骤停时肾上腺素的推荐剂量是多少", "1mg")
+    assert cache.get("心脏骤停时肾上腺素的推荐剂量是多少？") == "1mg"
+    assert cache.get("请问心脏骤停时肾上腺素推荐剂量是多少呢") == "1mg"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["near_hits"] == 1
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("成人心脏骤停时肾上腺素的推荐剂量是多少", "儿童心脏骤停时肾上腺素的推荐剂量是多少"),
+    ("心脏骤停患者是否需要立即使用肾上腺素", "心脏骤停患者是否不需要立即使用肾上腺素"),
+])
+def test_medically_different_questions_do_not_match(cached, asked):
+    cache = AnswerCache()
+    cache.put(cached, "answer")
+    assert question_skeleton(normalize_question(cached)) != question_skeleton(normalize_question(asked))
+    assert cache.get(asked) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_entities_are_part_of_the_key():
+    cache = AnswerCache()
+    cache.put("推荐剂量是多少", "肾上腺素1mg", entities=["m1"])
+    assert cache.get("推荐剂量是多少", entities=["m2"]) is None
+    assert cache.get("推荐剂量是多少", entities=["m1"]) == "肾上腺素1mg"
+
+
+def test_ttl_expiry(clock):
+    cache = AnswerCache(ttl=10)
+    cache.put("心脏骤停怎么处理", "心肺复苏")
+    clock[0] += 9
+    assert cache.get("心脏骤停怎么处理") == "心肺复苏"
+    clock[0] += 2
+    assert cache.get("心脏骤停怎么处理") is None
+    # 过期条目不能再通过近似匹配命中
+    assert cache.get("心脏骤停怎么处理呢") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["size"] == 0
+
+
+def test_lru_eviction():
+    cache = AnswerCache(max_size=2)
+    cache.put("问题一", "a")
+    cache.put("问题二", "b")
+    assert cache.get("问题一") == "a"  # 问题二变为最久未使用
+    cache.put("问题三", "c")
+    assert cache.get("问题二") is None
+    assert cache.get("问题一") == "a"
+    assert cache.get("问题三") == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_replacing_an_entry_keeps_near_match_index_consistent():
+    cache = AnswerCache(max_size=2)
+    cache.put("心脏骤停怎么处理", "old")
+    cache.put("心脏骤停怎么处理", "new")
+    assert cache.stats()["size"] == 1
+    assert cache.get("心脏骤停怎么处理呢") == "new"
+
+
+def test_graph_version_change_invalidates():
+    cache = AnswerCache()
+    cache.put("心脏骤停怎么处理", "v1", graph_version="10-20-2026-01-01T00:00:00")
+    assert cache.get("心脏骤停怎么处理", graph_version="10-20-2026-01-01T00:00:00") == "v1"
+    # 节点数与关系数不变, 只有构建时间变化
+    assert cache.get("心脏骤停怎么处理", graph_version="10-20-2026-01-02T00:00:00") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_unknown_graph_version_does_not_invalidate():
+    cache = AnswerCache()
+    cache.put("心脏骤停怎么处理", "v1", graph_version="10-20")
+    assert cache.get("心脏骤停怎么处理", graph_version=None) == "v1"
+    cache.put("休克怎么处理", "v1", graph_version=None)
+    assert cache.get("心脏骤停怎么处理", graph_version="10-20") == "v1"
+    assert cache.get("休克怎么处理", graph_version="10-20") == "v1"
+    assert cache.stats()["invalidations"] == 0
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from backend.app.async_app import create_async_app
+from backend.app.utils.graph_snapshot import write_snapshot
+
+
+def _rules(app):
+    return {(rule.rule, tuple(sorted(rule.methods - {'HEAD', 'OPTIONS'})))
+            for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+
+
+def _get_all(paths, config=None, headers=None):
+    async def run():
+        app = create_async_app(config)
+        async with app.test_app() as test_app:
+            client = test_app.test_client()
+            results = {}
+            for path in paths:
+                response = await client.get(path, headers=headers)
+                results[path] = (response.status_code, await response.get_data(as_text=True), response.headers)
+            return results
+    return asyncio.run(run())
+
+
+def test_routes_match_flask_app(app):
+    assert _rules(create_async_app()) == _rules(app)
+
+
+def test_pool_status_and_metrics(app):
+    results = _get_all(['/knowledge_graph/search?q=%E5%BF%83', '/knowledge_graph/neo4j/pool',
+                        '/knowledge_graph/neo4j/status', '/metrics'])
+    assert results['/knowledge_graph/search?q=%E5%BF%83'][0] == 200
+    assert '"max_size":50' in results['/knowledge_graph/neo4j/pool'][1]
+    assert '"pool"' in results['/knowledge_graph/neo4j/status'][1]
+    status, body, _ = results['/metrics']
+    assert status == 200
+    assert 'neo4j_query_duration_seconds_count{query="search"}' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/knowledge_graph/search",status="200"}' in body
+    assert 'neo4j_pool_max_size 50' in body
+
+
+def test_uses_app_config(app, driver, tmp_path):
+    """与Flask版本一样读取app.config中的数据源设置"""
+    path = str(tmp_path / 'graph.kgs')
+    write_snapshot(path, driver.node_records, driver.link_records)
+    config = {'GRAPH_SOURCE': 'snapshot', 'GRAPH_SNAPSHOT_PATH': path}
+    status, body, headers = _get_all(['/knowledge_graph/get_kg'], config)['/knowledge_graph/get_kg']
+    assert status == 200
+    assert headers['X-Graph-Source'] == 'snapshot'
+    assert len(json.loads(body)["nodes"]) == len(driver.node_records)
+
+
+def test_connection_checks_database_without_health_monitor(app):
+    status, body, _ = _get_all(['/knowledge_graph/test_connection'],
+                               {'NEO4J_HEALTH_INTERVAL': 0})['/knowledge_graph/test_connection']
+    assert status == 200
+    assert json.loads(body)["database_status"] == "Neo4j数据库状态正常"
+
+
+def test_cors_allows_credentials_like_flask_app(app):
+    origin = {'Origin': 'http://frontend.local'}
+    flask_headers = app.test_client().get('/knowledge_graph/test_connection', headers=origin).headers
+    _, _, headers = _get_all(['/knowledge_graph/test_connection'], headers=origin)['/knowledge_graph/test_connection']
+    for name in ('Access-Control-Allow-Origin', 'Access-Control-Allow-Credentials'):
+        assert headers[name] == flask_headers[name]
+    assert headers['Access-Control-Allow-Origin'] == 'http://frontend.local'
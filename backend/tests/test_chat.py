@@ -0,0 +1,73 @@
+import pytest
+
+from backend.app.api import chat
+from backend.app.utils.answer_cache import AnswerCache
+from backend.app.utils.llm_client import LLMClient
+from backend.benchmarks.fake_llm_server import FakeLLM, FakeLLMServer
+
+
+def test_answer_is_cached(client):
+    first = client.post('/chat/answer_questions', json={"message": "心脏骤停怎么处理"}).get_json()
+    second = client.post('/chat/answer_questions', json={"message": "心脏骤停怎么处理？"}).get_json()
+    assert first["cached"] is False
+    assert second["cached"] is True
+
+
+def test_answer_uses_llm_when_enabled(client, monkeypatch):
+    with FakeLLMServer(FakeLLM()) as server:
+        monkeypatch.setattr(chat, 'CHAT_USE_LLM', True)
+        monkeypatch.setattr(chat, '_llm_client', LLMClient(api_url=server.url, api_key='test'))
+        body = client.post('/chat/answer_questions', json={"message": "休克如何处理"}).get_json()
+        assert server.llm.stats["requests"] == 1
+    assert body["response"] != chat.PLACEHOLDER_ANSWER
+
+
+def test_cache_invalidate_requires_token(client, monkeypatch):
+    monkeypatch.setattr(chat, 'CACHE_ADMIN_TOKEN', '')
+    assert client.post('/chat/cache/invalidate').status_code == 403
+
+    monkeypatch.setattr(chat, 'CACHE_ADMIN_TOKEN', 'secret')
+    assert client.post('/chat/cache/invalidate', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert client.post('/chat/cache/invalidate', headers={'X-Admin-Token': 'secret'}).status_code == 200
+
+
+def test_graph_version_includes_build_time(app, driver, monkeypatch):
+    from backend.app.api.knowledge_graph import GRAPH_META_QUERY
+    execute = driver.execute
+
+    def with_meta(query, params):
+        if query == GRAPH_META_QUERY:
+            return [{"updated_at": "2026-01-01T00:00:00"}]
+        return execute(query, params)
+    monkeypatch.setattr(driver, 'execute', with_meta)
+
+    graph_db = app.extensions['neo4j'].get()
+    assert graph_db.get_graph_version(max_age=0) == f"200-{len(driver.link_records)}-2026-01-01T00:00:00"
+
+
+@pytest.mark.parametrize("body", [
+    {"message": "休克如何处理", "entities": [["d1"]]},
+    {"message": "休克如何处理", "entities": [{"id": "d1"}]},
+    {"message": "休克如何处理", "entities": None},
+    {"message": "休克如何处理", "entities": [None]},
+    {"message": "休克如何处理", "entities": "d1"},
+    {"message": 123},
+    ["休克如何处理"],
+])
+def test_invalid_request_is_rejected(client, body):
+    response = client.post('/chat/answer_questions', json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_unknown_graph_version_keeps_cache(client, app, monkeypatch):
+    """Neo4j暂时不可用(图谱版本为None)时不清空缓存, 恢复后原有条目仍然命中"""
+    monkeypatch.setattr(chat, 'answer_cache', AnswerCache())
+    current_graph_version = chat.current_graph_version
+    question = {"message": "急性心肌梗死溶栓的时间窗"}
+    assert client.post('/chat/answer_questions', json=question).get_json()["cached"] is False
+    monkeypatch.setattr(chat, 'current_graph_version', lambda: None)
+    assert client.post('/chat/answer_questions', json=question).get_json()["cached"] is True
+    monkeypatch.setattr(chat, 'current_graph_version', current_graph_version)
+    assert client.post('/chat/answer_questions', json=question).get_json()["cached"] is True
+    assert chat.answer_cache.stats()["invalidations"] == 0
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from backend.app.utils.graph_analytics import GraphAnalytics, edge_list, label_propagation, pagerank, top_n_subgraph
+
+
+def matrix(n, edges):
+    rows, cols, weights = zip(*edges) if edges else ((), (), ())
+    return edge_list(n, rows, cols, weights)
+
+
+def graph(nodes, links):
+    return {
+        "nodes": [{"id": node_id} for node_id in nodes],
+        "links": [{"source": s, "target": t, "value": v} for s, t, v in links],
+    }
+
+
+def same_community(labels, *nodes):
+    return len({int(labels[i]) for i in nodes}) == 1
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_star_with_lighter_leaf_is_one_community(seed):
+    # 疾病 -> 3个治疗(权重3) + 1个检查(权重1)
+    labels = label_propagation(matrix(5, [(0, 1, 3), (0, 2, 3), (0, 3, 3), (0, 4, 1)]), seed=seed)
+    assert same_community(labels, 0, 1, 2, 3, 4)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_two_cliques_joined_by_a_lighter_bridge(seed):
+    edges = [(a, b, 3) for a in range(4) for b in range(a + 1, 4)]
+    edges += [(a, b, 3) for a in range(4, 8) for b in range(a + 1, 8)]
+    edges.append((3, 4, 1))
+    labels = label_propagation(matrix(8, edges), seed=seed)
+    assert same_community(labels, 0, 1, 2, 3)
+    assert same_community(labels, 4, 5, 6, 7)
+    assert labels[0] != labels[4]
+
+
+def test_bipartite_graph_does_not_oscillate():
+    # 完全二分图K3,3: 同步更新时两侧标签会互换而无法收敛
+    edges = [(a, b, 1) for a in range(3) for b in range(3, 6)]
+    labels = label_propagation(matrix(6, edges))
+    assert same_community(labels, *range(6))
+
+
+def test_components_and_isolated_nodes():
+    labels = label_propagation(matrix(5, [(0, 1, 1), (2, 3, 2)]))
+    assert same_community(labels, 0, 1)
+    assert same_community(labels, 2, 3)
+    assert len(set(labels.tolist())) == 3
+    # 按社区大小编号, 孤立节点的社区最小
+    assert labels[4] == 2
+
+
+def test_empty_graph():
+    assert len(label_propagation(matrix(0, []))) == 0
+
+
+def test_no_connected_singletons_on_random_graph():
+    from backend.benchmarks.synthetic_graph import generate_graph
+    analytics = GraphAnalytics(generate_graph(3000, 3.0, seed=42))
+    counts = np.bincount(analytics.community)
+    connected = analytics.degree > 0
+    assert not np.any(connected & (counts[analytics.community] == 1))
+    assert counts.max() < 0.5 * len(analytics.community)
+
+
+def test_pagerank_merges_duplicate_links():
+    # 0->1 两条连线合并为权重2, 与 0->2(权重1)相比1号节点得到更多权重
+    rank = pagerank(matrix(3, [(0, 1, 1), (0, 1, 1), (0, 2, 1), (1, 0, 1), (2, 0, 1)]))
+    assert rank.sum() == pytest.approx(1.0)
+    assert rank[1] > rank[2]
+    cycle = pagerank(matrix(3, [(0, 1, 1), (1, 2, 1), (2, 0, 1)]))
+    assert cycle == pytest.approx(np.full(3, 1 / 3))
+
+
+def test_analytics_without_scipy(monkeypatch):
+    import importlib
+    import sys
+    from backend.app.utils import graph_analytics
+    monkeypatch.setitem(sys.modules, "scipy", None)
+    monkeypatch.setitem(sys.modules, "scipy.sparse", None)
+    module = importlib.reload(graph_analytics)
+    try:
+        analytics = module.GraphAnalytics(graph(["a", "b", "c"], [("a", "b", 1), ("b", "c", 1)]))
+        assert analytics.degree.tolist() == [1, 2, 1]
+    finally:
+        monkeypatch.undo()
+        importlib.reload(graph_analytics)
+
+
+def test_top_n_subgraph_keeps_most_important_nodes():
+    g = graph(["hub", "a", "b", "c", "lonely"],
+              [("hub", "a", 3), ("hub", "b", 3), ("hub", "c", 1)])
+    analytics = GraphAnalytics(g)
+    sub = top_n_subgraph(g, analytics, 2)
+    assert "hub" in {node["id"] for node in sub["nodes"]}
+    assert len(sub["nodes"]) == 2
+    assert sub["lod"] == {"top": 2, "total_nodes": 5, "total_links": 3}
+
+
+@pytest.mark.parametrize("top", ["-5", "0", "abc", "1.5"])
+def test_get_kg_rejects_invalid_top(client, top):
+    response = client.get(f'/knowledge_graph/get_kg?top={top}')
+    assert response.status_code == 400
+
+
+def test_get_kg_top(client):
+    data = client.get('/knowledge_graph/get_kg?top=10').get_json()
+    assert len(data["nodes"]) == 10
+    assert data["lod"]["top"] == 10
@@ -0,0 +1,92 @@
+import gzip
+import json
+
+import pytest
+
+from backend.app.utils import graph_codec
+from backend.app.utils.graph_codec import (
+    COMPACT_FORMAT, MIN_COMPRESS_SIZE, decode_compact, encode_body, encode_compact, negotiate_encoding,
+)
+from backend.benchmarks.synthetic_graph import generate_graph
+
+
+def _without_null_properties(graph):
+    """decode_compact 不恢复值为null的连线属性"""
+    for link in graph["links"]:
+        link["properties"] = {k: v for k, v in link["properties"].items() if v is not None}
+    return graph
+
+
+def test_round_trip_synthetic_graph():
+    graph = generate_graph(300, seed=3)
+    compact = encode_compact(graph)
+    assert compact["format"] == COMPACT_FORMAT
+    assert decode_compact(json.loads(json.dumps(compact))) == _without_null_properties(generate_graph(300, seed=3))
+
+
+def test_round_trip_optional_columns_and_lod():
+    graph = {
+        "nodes": [
+            {"id": "d1", "label": "休克", "group": 1, "type": "疾病", "properties": 0.3,
+             "x": 1.5, "y": -2.0, "degree": 2, "pagerank": 0.4, "community": 0},
+            {"id": "t1", "label": "t1", "group": 2, "type": "治疗", "properties": None,
+             "x": 0.0, "y": 0.0, "degree": 1, "pagerank": 0.6, "community": 0},
+        ],
+        "links": [{"source": "d1", "target": "t1", "value": 3, "relationshipType": "需要治疗",
+                   "properties": {"时机": "立即", "顺序": 1}}],
+        "lod": {"top": 2, "total_nodes": 10},
+    }
+    compact = encode_compact(graph)
+    assert compact["nodes"]["label"] == ["休克", None]
+    assert compact["links"]["properties"] == [[0, "立即", 1, 1]]
+    assert decode_compact(compact) == graph
+
+
+def test_missing_endpoint_encodes_as_minus_one():
+    graph = {"nodes": [{"id": "a", "label": "a", "group": 0, "type": "疾病", "properties": None}],
+             "links": [{"source": "a", "target": "gone", "value": 1, "relationshipType": "需要检查",
+                        "properties": {}}]}
+    compact = encode_compact(graph)
+    assert compact["links"]["target"] == [-1]
+    assert decode_compact(compact)["links"][0]["target"] is None
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0", None),
+    ("GZIP;q=0.5, identity", "gzip"),
+    ("gzip;q=bad", None),
+])
+def test_negotiate_gzip(monkeypatch, header, expected):
+    monkeypatch.setattr(graph_codec, "brotli", None)
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_prefers_brotli_when_installed(monkeypatch):
+    monkeypatch.setattr(graph_codec, "brotli", object())
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0") == "gzip"
+
+
+def test_encode_body_compresses_only_large_bodies(monkeypatch):
+    monkeypatch.setattr(graph_codec, "brotli", None)
+    small = {"nodes": [], "links": []}
+    assert encode_body(small, "gzip") == (b'{"nodes":[],"links":[]}', None)
+
+    graph = generate_graph(100)
+    body, encoding = encode_body(graph, "gzip")
+    assert encoding == "gzip"
+    raw = gzip.decompress(body)
+    assert len(raw) >= MIN_COMPRESS_SIZE
+    assert json.loads(raw) == graph
+
+
+def test_get_kg_compact_format(client):
+    response = client.get('/knowledge_graph/get_kg?format=compact', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    compact = json.loads(gzip.decompress(response.data))
+    plain = client.get('/knowledge_graph/get_kg').get_json()
+    assert decode_compact(compact) == _without_null_properties(plain)
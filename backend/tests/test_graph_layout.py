@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+
+from backend.app.api import knowledge_graph
+from backend.app.utils import graph_layout
+from backend.app.utils.graph_layout import LayoutCache, _exact_repulsion, _grid_repulsion
+
+
+def random_positions(n, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, 2)) * 80 * np.sqrt(n) / 3
+
+
+def test_grid_repulsion_approximates_exact_forces():
+    pos = random_positions(6000)
+    rows = np.arange(len(pos))
+    approx = _grid_repulsion(pos, 80.0, rows)
+    exact = _exact_repulsion(pos, 80.0, rows)
+    error = np.linalg.norm(approx - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    assert np.median(error) < 0.05
+    assert np.percentile(error, 95) < 0.2
+
+
+def test_grid_repulsion_for_subset_of_rows():
+    pos = random_positions(5000, seed=1)
+    rows = np.arange(0, 5000, 7)
+    assert np.allclose(_grid_repulsion(pos, 80.0, rows), _grid_repulsion(pos, 80.0, np.arange(5000))[rows])
+
+
+def test_far_field_work_is_bounded_per_cell(monkeypatch):
+    # 远场每个单元最多与 9*粗块^2 个细单元和全部粗块作用, 不再构造 单元数 x 单元数 的矩阵
+    sizes = []
+    original = graph_layout._point_forces
+
+    def record(k2, px, py, qx, qy, mass):
+        sizes.append(np.broadcast(px, qx).size)
+        return original(k2, px, py, qx, qy, mass)
+    monkeypatch.setattr(graph_layout, '_point_forces', record)
+    monkeypatch.setattr(graph_layout, '_CHUNK_ELEMENTS', 10 ** 9)
+
+    pos = random_positions(140000)
+    _grid_repulsion(pos, 80.0, np.arange(len(pos)))
+    cells = graph_layout._MAX_GRID ** 2
+    blocks = (graph_layout._MAX_GRID // graph_layout._COARSE_BLOCK) ** 2
+    assert sum(sizes) <= cells * (9 * graph_layout._COARSE_BLOCK ** 2 + blocks)
+    assert sum(sizes) < cells * cells / 10
+
+
+def test_layout_is_cached_and_incremental():
+    cache = LayoutCache()
+    graph = {"nodes": [{"id": str(i)} for i in range(30)],
+             "links": [{"source": str(i), "target": str(i + 1)} for i in range(29)]}
+    first = dict(cache.positions("v1", graph))
+    assert set(first) == {str(i) for i in range(30)}
+
+    graph["nodes"].append({"id": "new"})
+    graph["links"].append({"source": "0", "target": "new"})
+    second = cache.positions("v2", graph)
+    assert all(second[node_id] == xy for node_id, xy in first.items())
+    assert "new" in second
+
+
+def chain(n):
+    return {"nodes": [{"id": str(i)} for i in range(n)],
+            "links": [{"source": str(i), "target": str(i + 1)} for i in range(n - 1)]}
+
+
+def test_layout_is_built_in_background_outside_the_lock(monkeypatch):
+    cache = LayoutCache()
+    started, release = threading.Event(), threading.Event()
+    full_layout = cache._full_layout
+
+    def slow_full_layout(node_ids, links):
+        started.set()
+        release.wait(5)
+        return full_layout(node_ids, links)
+
+    monkeypatch.setattr(cache, "_full_layout", slow_full_layout)
+    graph = chain(20)
+    assert cache.cached("v1", graph) is None
+    thread = cache.warm("v1", graph)
+    assert thread is not None
+    assert started.wait(5)
+    # 计算期间不持有锁: 请求可以立即得知布局尚未就绪, 重复的warm不会再启动线程
+    assert cache.cached("v1", graph) is None
+    assert cache.warm("v1", graph) is None
+    release.set()
+    thread.join(5)
+    assert set(cache.cached("v1", graph)) == {str(i) for i in range(20)}
+    assert cache.warm("v1", graph) is None
+
+
+def test_get_kg_does_not_wait_for_layout(app, client, monkeypatch):
+    monkeypatch.setattr(knowledge_graph, 'layout_cache', LayoutCache())
+    nodes = client.get('/knowledge_graph/get_kg?layout=1').get_json()["nodes"]
+    assert all("x" not in node for node in nodes)
+
+    # 后台健康检查调用warm_layout; 与请求触发的后台计算合并
+    knowledge_graph.warm_layout(app.extensions['neo4j'].get())
+    nodes = client.get('/knowledge_graph/get_kg?layout=1').get_json()["nodes"]
+    assert all("x" in node and "y" in node for node in nodes)
+
+
+def test_layout_skipped_above_node_limit(app, client, monkeypatch):
+    monkeypatch.setattr(knowledge_graph, 'layout_cache', LayoutCache())
+    monkeypatch.setattr(knowledge_graph, 'LAYOUT_MAX_NODES', 100)
+    knowledge_graph.warm_layout(app.extensions['neo4j'].get())
+    assert knowledge_graph.layout_cache.version is None
+    nodes = client.get('/knowledge_graph/get_kg?layout=1').get_json()["nodes"]
+    assert all("x" not in node for node in nodes)
+
+    monkeypatch.setattr(knowledge_graph, 'LAYOUT_MAX_NODES', 1000)
+    knowledge_graph.warm_layout(app.extensions['neo4j'].get())
+    nodes = client.get('/knowledge_graph/get_kg?layout=1').get_json()["nodes"]
+    assert all("x" in node and "y" in node for node in nodes)
@@ -0,0 +1,144 @@
+from contextlib import contextmanager
+
+import pytest
+from neo4j.exceptions import ServiceUnavailable
+
+from backend.app import create_app
+from backend.app.api.knowledge_graph import Neo4jKnowledgeGraph
+from backend.app.utils.graph_snapshot import GraphSnapshot, records_from_kg_data, write_snapshot
+from backend.benchmarks.fake_neo4j import use_fake_driver
+
+NODES = [
+    {"id": "d1", "name": "休克", "entityType": "疾病", "properties": "危重"},
+    {"id": "c1", "name": "肺水肿", "entityType": "并发症", "properties": 0.3},
+    {"id": "t1", "name": "液体复苏", "entityType": "治疗", "properties": None},
+    {"id": "m1", "name": "多巴胺", "entityType": "药物", "properties": "静脉注射"},
+]
+LINKS = [
+    {"source": "d1", "target": "t1", "relationshipType": "需要治疗",
+     "properties": {"时机": "立即", "顺序": 1, "条件": None}},
+    {"source": "d1", "target": "c1", "relationshipType": "引起并发症",
+     "properties": {"发生率": 0.25, "条件": "补液过多"}},
+    {"source": "t1", "target": "m1", "relationshipType": "使用药物", "properties": {}},
+]
+SEARCH_TEXTS = ["休克\x01血压下降、四肢湿冷", "肺水肿", "液体复苏\x01注意监测中心静脉压", "多巴胺"]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / "graph.kgs")
+    write_snapshot(path, NODES, LINKS, SEARCH_TEXTS, graph_updated_at="2026-01-02T03:04:05")
+    return path
+
+
+@pytest.fixture
+def snapshot(snapshot_path):
+    snapshot = GraphSnapshot(snapshot_path)
+    yield snapshot
+    snapshot.close()
+
+
+@contextmanager
+def graph_client(driver, **config):
+    with use_fake_driver(driver):
+        app = create_app({'TESTING': True, 'NEO4J_HEALTH_INTERVAL': 0, **config})
+        try:
+            yield app.test_client()
+        finally:
+            app.extensions['neo4j'].close()
+
+
+def neo4j_unavailable(monkeypatch, driver):
+    def execute(query, params, latency=True):
+        raise ServiceUnavailable("connection refused")
+    monkeypatch.setattr(driver, 'execute', execute)
+
+
+def _by_id(records):
+    return {record["id"]: record for record in records}
+
+
+def test_records_round_trip_with_types(snapshot):
+    assert _by_id(snapshot.node_records()) == _by_id(NODES)
+    assert sorted(snapshot.link_records(), key=lambda link: link["target"]) == \
+        sorted(LINKS, key=lambda link: link["target"])
+    assert _by_id(snapshot.node_records())["c1"]["properties"] == 0.3
+
+
+def test_search_matches_description_fields(snapshot):
+    assert [record["id"] for record in snapshot.search("四肢湿冷")] == ["d1"]
+    assert [record["id"] for record in snapshot.search("中心静脉压")] == ["t1"]
+    assert {record["id"] for record in snapshot.search("肺")} == {"c1"}
+    assert snapshot.search("不存在") == []
+
+
+def test_neighborhood(snapshot):
+    nodes, links = snapshot.neighborhood("d1", depth=1)
+    assert {node["id"] for node in nodes} == {"d1", "t1", "c1"}
+    assert len(links) == 2
+    nodes, links = snapshot.neighborhood("d1", depth=2)
+    assert {node["id"] for node in nodes} == {"d1", "t1", "c1", "m1"}
+    assert snapshot.neighborhood("missing") is None
+
+
+def test_version_matches_neo4j_graph_version(snapshot):
+    assert snapshot.version == "4-3-2026-01-02T03:04:05"
+
+
+def test_records_from_kg_data_search_text():
+    kg_data = {
+        "entities": [{"id": "d1", "name": "休克", "type": "疾病",
+                      "properties": {"严重程度": "危重", "症状描述": "血压下降"}}],
+        "relationships": [{"from": "d1", "to": "missing", "type": "需要治疗"}],
+    }
+    nodes, links, texts = records_from_kg_data(kg_data)
+    assert nodes[0]["properties"] == "危重"
+    assert links == []
+    assert texts == ["休克\x01血压下降"]
+
+
+def test_export_from_neo4j(driver, tmp_path):
+    with use_fake_driver(driver):
+        graph_db = Neo4jKnowledgeGraph('bolt://localhost:7687', 'neo4j', 'neo4j')
+    node_records, link_records, search_texts, updated_at = graph_db.export_records()
+    path = str(tmp_path / "export.kgs")
+    write_snapshot(path, node_records, link_records, search_texts, updated_at)
+    snapshot = GraphSnapshot(path)
+    try:
+        assert snapshot.version == graph_db.get_graph_version()
+        assert _by_id(snapshot.node_records()) == _by_id(driver.node_records)
+        assert len(snapshot.link_records()) == len(driver.link_records)
+    finally:
+        snapshot.close()
+
+
+def _assert_snapshot_routes(client):
+    response = client.get('/knowledge_graph/get_kg')
+    assert response.headers['X-Graph-Source'] == 'snapshot'
+    assert {node["id"] for node in response.get_json()["nodes"]} == {"d1", "c1", "t1", "m1"}
+    assert len(response.get_json()["links"]) == 3
+
+    response = client.get('/knowledge_graph/search?q=四肢湿冷')
+    assert response.headers['X-Graph-Source'] == 'snapshot'
+    assert [node["id"] for node in response.get_json()["results"]] == ["d1"]
+
+    response = client.get('/knowledge_graph/neighborhood?id=d1&depth=1')
+    assert response.headers['X-Graph-Source'] == 'snapshot'
+    assert {node["id"] for node in response.get_json()["nodes"]} == {"d1", "t1", "c1"}
+
+
+def test_snapshot_source_does_not_use_neo4j(driver, snapshot_path, monkeypatch):
+    neo4j_unavailable(monkeypatch, driver)
+    with graph_client(driver, GRAPH_SOURCE='snapshot', GRAPH_SNAPSHOT_PATH=snapshot_path) as client:
+        _assert_snapshot_routes(client)
+    assert driver.queries == 0
+
+
+def test_auto_source_falls_back_when_neo4j_unavailable(driver, snapshot_path, monkeypatch):
+    with graph_client(driver, GRAPH_SOURCE='auto', GRAPH_SNAPSHOT_PATH=snapshot_path) as client:
+        response = client.get('/knowledge_graph/get_kg')
+        assert response.headers['X-Graph-Source'] == 'neo4j'
+        assert len(response.get_json()["nodes"]) == len(driver.node_records)
+
+        neo4j_unavailable(monkeypatch, driver)
+        _assert_snapshot_routes(client)
@@ -0,0 +1,67 @@
+from backend.app import create_app
+from backend.app.api.knowledge_graph import Neo4jKnowledgeGraph, SEARCH_QUERY
+from backend.app.utils.metrics import REGISTRY
+from backend.benchmarks.fake_neo4j import use_fake_driver
+
+
+def test_search_returns_matches(client, driver):
+    name = driver.node_records[0]["name"]
+    response = client.get('/knowledge_graph/search', query_string={'q': name})
+    assert response.status_code == 200
+    assert response.headers['X-Graph-Source'] == 'neo4j'
+    body = response.get_json()
+    assert body["query"] == name
+    assert any(result["label"] == name for result in body["results"])
+
+
+def test_search_requires_term(client):
+    assert client.get('/knowledge_graph/search?q=').status_code == 400
+
+
+def test_query_parameter_named_query(driver):
+    """$query参数与_query/Session.run的形参同名时也能正常传入(曾导致搜索抛出TypeError)"""
+    with use_fake_driver(driver):
+        graph_db = Neo4jKnowledgeGraph('bolt://localhost:7687', 'neo4j', 'neo4j')
+    with graph_db.session() as session:
+        records = graph_db._query(session, "search", SEARCH_QUERY, query="心")
+    assert records and all("心" in record["name"] for record in records)
+
+
+def test_metrics_records_search_query(client):
+    # 指标是进程级的, 其他测试可能已记录过失败, 只比较本次请求前后的变化
+    errors = REGISTRY.get('neo4j_query_errors_total')
+    before = errors.value(query="search")
+    client.get('/knowledge_graph/search?q=%E5%BF%83')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'neo4j_query_duration_seconds_count{query="search"}' in body
+    assert errors.value(query="search") == before
+
+
+def test_connection_checks_database_without_health_monitor(client):
+    """未启动后台健康检查(NEO4J_HEALTH_INTERVAL=0)时同步检查, 不会一直停留在"检查中\""""
+    body = client.get('/knowledge_graph/test_connection').get_json()
+    assert body["database_status"] == "Neo4j数据库状态正常"
+
+
+def test_pool_metrics_without_driver_internals(client):
+    client.get('/knowledge_graph/search?q=%E5%BF%83')
+    pool = client.get('/knowledge_graph/neo4j/pool').get_json()
+    assert pool["in_use"] == 0
+    assert pool["peak_in_use"] == 1
+    assert pool["sessions"] >= 1
+    assert "idle" not in pool
+
+
+def test_driver_and_health_monitor_start_on_first_use(driver):
+    with use_fake_driver(driver):
+        app = create_app({'TESTING': True, 'NEO4J_HEALTH_INTERVAL': 3600})
+        provider = app.extensions['neo4j']
+        try:
+            assert not provider.created
+            assert provider._monitor is None
+            assert app.test_client().get('/knowledge_graph/test_connection').get_json()["database_status"] == \
+                "Neo4j数据库状态正常"
+            assert provider.created
+            assert provider._monitor is not None and provider._monitor.daemon
+        finally:
+            provider.close()
@@ -0,0 +1,36 @@
+import pytest
+
+from backend.app.api import metrics
+from backend.app.utils.metrics import Registry, _Metric
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, 'PROFILE_ENABLED', True)
+    monkeypatch.setattr(metrics, 'PROFILE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_profiling_requires_token(client, profiling, monkeypatch):
+    monkeypatch.setattr(metrics, 'PROFILE_TOKEN', '')
+    response = client.get('/knowledge_graph/test_connection', headers={'X-Profile': '1'})
+    assert 'X-Profile-File' not in response.headers
+    assert list(profiling.iterdir()) == []
+
+
+@pytest.mark.parametrize("header, profiled", [(None, False), ('wrong', False), ('秘密', False), ('s3cret', True)])
+def test_profiling_checks_token(client, profiling, monkeypatch, header, profiled):
+    monkeypatch.setattr(metrics, 'PROFILE_TOKEN', 's3cret')
+    headers = {'X-Profile': header.encode().decode('latin-1')} if header else {}
+    response = client.get('/knowledge_graph/test_connection', headers=headers)
+    assert ('X-Profile-File' in response.headers) == profiled
+    assert len(list(profiling.iterdir())) == int(profiled)
+
+
+def test_metric_subclass_must_implement_samples():
+    class Incomplete(_Metric):
+        type_name = 'gauge'
+
+    with pytest.raises(TypeError):
+        Incomplete('incomplete', '')
+    assert Registry().counter('requests_total', '').samples() is not None
@@ -0,0 +1,80 @@
+import pytest
+
+from backend.app.api.knowledge_graph import get_kg_limiter, neighborhood_limiter, search_limiter
+from backend.app.utils import rate_limit
+from backend.app.utils.rate_limit import RateLimiter, parse_rate
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_parse_rate():
+    assert parse_rate("30/60") == (30.0, 0.5)
+    assert parse_rate("5") == (5.0, 5.0)
+
+
+@pytest.mark.parametrize("value", ["0/60", "-1/60", "30/0", "abc", "30/x"])
+def test_parse_rate_rejects_invalid(value):
+    with pytest.raises(ValueError, match="限流配置"):
+        parse_rate(value)
+
+
+def test_burst_then_reject_with_retry_after(clock):
+    limiter = RateLimiter(3, 0.5)
+    assert [limiter.acquire("a")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.acquire("a")
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+    assert limiter.rejected == 1
+
+
+def test_tokens_refill_over_time(clock):
+    limiter = RateLimiter(2, 1.0)
+    limiter.acquire("a")
+    limiter.acquire("a")
+    assert not limiter.acquire("a")[0]
+    clock[0] += 1.0
+    assert limiter.acquire("a") == (True, None)
+    clock[0] += 100
+    assert [limiter.acquire("a")[0] for _ in range(3)] == [True, True, False]
+
+
+def test_clients_are_limited_separately(clock):
+    limiter = RateLimiter(1, 0.1)
+    assert limiter.acquire("a")[0]
+    assert not limiter.acquire("a")[0]
+    assert limiter.acquire("b")[0]
+
+
+def test_full_buckets_are_pruned(clock):
+    limiter = RateLimiter(1, 1.0, max_clients=2)
+    for client in ("a", "b"):
+        limiter.acquire(client)
+    clock[0] += 5
+    limiter.acquire("c")
+    assert set(limiter._buckets) == {"c"}
+
+
+def test_route_returns_429(client, monkeypatch):
+    # 测试客户端的令牌已经用完
+    monkeypatch.setitem(search_limiter._buckets, '127.0.0.1', (0.0, rate_limit.time.monotonic()))
+    response = client.get('/knowledge_graph/search?q=%E5%BF%83')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_routes_have_separate_buckets(client, monkeypatch):
+    now = rate_limit.time.monotonic()
+    monkeypatch.setitem(search_limiter._buckets, '127.0.0.1', (0.0, now))
+    monkeypatch.setitem(get_kg_limiter._buckets, '127.0.0.1', (0.0, now))
+    assert client.get('/knowledge_graph/search?q=%E5%BF%83').status_code == 429
+    # 邻居查询不与搜索共用令牌
+    node_id = client.get('/knowledge_graph/get_kg?top=1').get_json()["nodes"][0]["id"]
+    assert client.get('/knowledge_graph/neighborhood', query_string={'id': node_id}).status_code == 200
+    # 细节层次预取(top=N)不与完整图谱共用令牌
+    assert client.get('/knowledge_graph/get_kg').status_code == 429
+    assert neighborhood_limiter is not search_limiter
@@ -0,0 +1,63 @@
+from docx import Document
+
+from model.utils.readDocx import parseDocx, readDocx, table_lines
+
+
+def _table(rows):
+    doc = Document()
+    table = doc.add_table(rows=len(rows), cols=len(rows[0]))
+    for r, values in enumerate(rows):
+        for c, value in enumerate(values):
+            table.cell(r, c).text = value
+    return doc, table
+
+
+def test_vertical_merge_is_repeated_on_each_row():
+    _, table = _table([
+        ["类别", "疾病", "处理"],
+        ["循环系统", "休克", "液体复苏"],
+        ["", "心脏骤停", "心肺复苏"],
+    ])
+    table.cell(1, 0).merge(table.cell(2, 0))
+    table.cell(1, 0).text = "循环系统"
+    assert table_lines(table) == [
+        "类别: 循环系统；疾病: 休克；处理: 液体复苏",
+        "类别: 循环系统；疾病: 心脏骤停；处理: 心肺复苏",
+    ]
+
+
+def test_horizontal_merge_and_title_row():
+    _, table = _table([
+        ["急危重症标准", "", ""],
+        ["疾病", "标准", "备注"],
+        ["休克", "收缩压<90mmHg", ""],
+        ["呼吸系统", "", ""],
+    ])
+    table.cell(0, 0).merge(table.cell(0, 2)).text = "急危重症标准"
+    table.cell(2, 1).merge(table.cell(2, 2)).text = "收缩压<90mmHg"
+    table.cell(3, 0).merge(table.cell(3, 2)).text = "呼吸系统"
+    assert table_lines(table) == [
+        "急危重症标准",
+        "疾病: 休克；标准: 收缩压<90mmHg",
+        "呼吸系统",
+    ]
+
+
+def test_table_without_data_rows_outputs_header():
+    _, table = _table([["疾病", "标准"]])
+    assert table_lines(table) == ["疾病；标准"]
+
+
+def test_paragraphs_and_tables_keep_order_and_cache(tmp_path):
+    doc, table = _table([["疾病", "标准"], ["休克", "收缩压<90mmHg"]])
+    doc.add_paragraph("表后说明")
+    body = doc.element.body
+    body.insert(0, doc.add_paragraph("表前说明")._p)
+    path = str(tmp_path / "standard.docx")
+    doc.save(path)
+
+    expected = "表前说明\n疾病: 休克；标准: 收缩压<90mmHg\n表后说明"
+    assert parseDocx(path) == expected
+    cache_dir = str(tmp_path / "cache")
+    assert readDocx(path, cache_dir) == expected
+    assert readDocx(path, cache_dir) == expected
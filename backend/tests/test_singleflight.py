@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.app.utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "graph"
+
+    def request():
+        results.append(flight.do('get_kg', slow))
+
+    leader = threading.Thread(target=request)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=request) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while flight.stats()["shared"] < 4:
+        pass
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("graph", False)] + [("graph", True)] * 4
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "shared": 4}
+
+
+def test_error_reaches_every_caller_and_is_not_cached():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("neo4j down")
+
+    with pytest.raises(ValueError):
+        flight.do('search', fail)
+    assert flight.do('search', lambda: "ok") == ("ok", False)
+
+
+def test_async_concurrent_calls_share_one_execution():
+    async def run():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "graph"
+
+        results = await asyncio.gather(*[flight.do('get_kg', slow) for _ in range(5)])
+        return calls, results, flight.stats()
+
+    calls, results, stats = asyncio.run(run())
+    assert len(calls) == 1
+    assert sorted(results) == [("graph", False)] + [("graph", True)] * 4
+    assert stats == {"in_flight": 0, "executed": 1, "shared": 4}
+
+
+def test_async_cancelled_leader_does_not_cancel_followers():
+    async def run():
+        flight = AsyncSingleFlight()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.02)
+            return "graph"
+
+        leader = asyncio.ensure_future(flight.do('get_kg', slow))
+        await started.wait()
+        follower = asyncio.ensure_future(flight.do('get_kg', slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result, flight.stats()
+
+    result, stats = asyncio.run(run())
+    assert result == ("graph", True)
+    assert stats["in_flight"] == 0
+
+
+def test_async_error_reaches_every_caller():
+    async def run():
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("neo4j down")
+
+        results = await asyncio.gather(*[flight.do('search', fail) for _ in range(3)], return_exceptions=True)
+        retry = await flight.do('search', lambda: asyncio.sleep(0, "ok"))
+        return results, retry
+
+    results, retry = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert retry == ("ok", False)
@@ -37,10 +37,68 @@ export const chatApi = {
   }
 }
 
+const OPTIONAL_NODE_COLUMNS = ['x', 'y', 'degree', 'pagerank', 'community']
+
+// 解码列式紧凑格式(format=compact)的图谱数据
+export const decodeCompactGraph = (data) => {
+  const { groups, types, relationshipTypes, propertyKeys } = data
+  const nodeCols = data.nodes
+  const nodes = nodeCols.id.map((id, i) => ({
+    id,
+    label: nodeCols.label[i] ?? id,
+    group: groups[nodeCols.group[i]],
+    type: types[nodeCols.type[i]],
+    properties: nodeCols.properties[i],
+    // 可选列: 服务端预计算的布局坐标与分析指标
+    ...Object.fromEntries(OPTIONAL_NODE_COLUMNS
+      .filter(column => nodeCols[column])
+      .map(column => [column, nodeCols[column][i]]))
+  }))
+
+  const linkCols = data.links
+  const links = linkCols.source.map((source, i) => {
+    const target = linkCols.target[i]
+    const flat = linkCols.properties[i]
+    const properties = {}
+    for (let j = 0; j < flat.length; j += 2) {
+      properties[propertyKeys[flat[j]]] = flat[j + 1]
+    }
+    return {
+      source: source >= 0 ? nodes[source].id : null,
+      target: target >= 0 ? nodes[target].id : null,
+      value: linkCols.value[i],
+      relationshipType: relationshipTypes[linkCols.relationshipType[i]],
+      properties
+    }
+  })
+  return data.lod ? { nodes, links, lod: data.lod } : { nodes, links }
+}
+
 // 知识图谱接口
 export const knowledgeApi = {
-  getKnowledgeGraph() {
-    return api.get('/knowledge_graph/get_kg')
+  // top: 只获取最重要的N个节点及其之间的连线(细节层次)
+  async getKnowledgeGraph({ top } = {}) {
+    const params = { format: 'compact', layout: 1 }
+    if (top) params.top = top
+    const data = await api.get('/knowledge_graph/get_kg', { params })
+    return decodeCompactGraph(data)
+  },
+  // 按关键词搜索节点, 结果转换为搜索页使用的 {name, type, details}
+  async searchKnowledge(query) {
+    const data = await api.get('/knowledge_graph/search', { params: { q: query } })
+    return {
+      query: data.query,
+      results: data.results.map(node => ({
+        id: node.id,
+        name: node.label,
+        type: node.type,
+        details: node.properties || {}
+      }))
+    }
+  },
+  // 获取节点depth跳以内的子图 {center, nodes, links}, 用于按需展开节点
+  getNeighborhood(id, depth = 1) {
+    return api.get('/knowledge_graph/neighborhood', { params: { id, depth } })
   }
 }
 export const neo4jApi = {
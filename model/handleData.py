@@ -1,18 +1,22 @@
 import json
 import re
+from datetime import datetime
 from neo4j import GraphDatabase
 from typing import Dict, List, Any
 from model.utils.readDocx import readDocx
 import requests
 import os
+import subprocess
+import sys
 
 
 class MedicalKGBuilder:
     def __init__(self, neo4j_uri: str, neo4j_user: str, neo4j_password: str,
-                 deepseek_api_key: str = None):
+                 deepseek_api_key: str = None, deepseek_api_url: str = None):
         self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
         self.deepseek_api_key = deepseek_api_key or os.getenv('DEEPSEEK_API_KEY')
-        self.deepseek_api_url = "https://api.deepseek.com/v1/chat/completions"
+        self.deepseek_api_url = deepseek_api_url or os.getenv(
+            'DEEPSEEK_API_URL', "https://api.deepseek.com/v1/chat/completions")
 
     def close(self):
         """关闭数据库连接"""
@@ -143,22 +147,7 @@ class MedicalKGBuilder:
 
         try:
             response = self._call_deepseek(prompt, max_tokens=1200)
-            response_text = self._clean_json_response(response)
-
-            # 提取JSON数组
-            if not response_text.startswith('['):
-                match = re.search(r'"entities"\s*:\s*(\[.*?\])', response_text, re.DOTALL)
-                if match:
-                    response_text = match.group(1)
-                else:
-                    match = re.search(r'(\[.*\])', response_text, re.DOTALL)
-                    if match:
-                        response_text = match.group(1)
-
-            entities = json.loads(response_text)
-
-            if isinstance(entities, dict) and 'entities' in entities:
-                entities = entities['entities']
+            entities = self._parse_json_array(response, 'entities')
 
             # 确保properties字段存在
             for e in entities:
@@ -214,22 +203,7 @@ class MedicalKGBuilder:
 
         try:
             response = self._call_deepseek(prompt, max_tokens=1800)
-            response_text = self._clean_json_response(response)
-
-            # 提取JSON数组
-            if not response_text.startswith('['):
-                match = re.search(r'"relationships"\s*:\s*(\[.*?\])', response_text, re.DOTALL)
-                if match:
-                    response_text = match.group(1)
-                else:
-                    match = re.search(r'(\[.*\])', response_text, re.DOTALL)
-                    if match:
-                        response_text = match.group(1)
-
-            relationships = json.loads(response_text)
-
-            if isinstance(relationships, dict) and 'relationships' in relationships:
-                relationships = relationships['relationships']
+            relationships = self._parse_json_array(response, 'relationships')
 
             # 确保properties并验证ID存在
             valid_rels = []
@@ -252,6 +226,37 @@ class MedicalKGBuilder:
             print(f"      关系提取失败: {e}")
             return []
 
+    def _parse_json_array(self, response: str, key: str):
+        """
+        解析模型返回的JSON数组, 解析失败时尝试修复被截断的JSON(输出超过max_tokens时常见)
+        Args:
+            response: 模型返回的原始文本
+            key: 模型返回对象时数组所在的字段名
+        Returns:
+            解析后的列表
+        """
+        response_text = self._clean_json_response(response)
+
+        # 提取JSON数组
+        if not response_text.startswith('['):
+            match = re.search(rf'"{key}"\s*:\s*(\[.*?\])', response_text, re.DOTALL)
+            if match:
+                response_text = match.group(1)
+            else:
+                match = re.search(r'(\[.*\])', response_text, re.DOTALL)
+                if match:
+                    response_text = match.group(1)
+
+        try:
+            data = json.loads(response_text)
+        except json.JSONDecodeError:
+            print("      JSON解析失败, 尝试修复截断的JSON...")
+            data = json.loads(self._fix_truncated_json(response_text))
+
+        if isinstance(data, dict) and key in data:
+            data = data[key]
+        return data
+
     def _call_deepseek(self, prompt: str, max_tokens: int = 1000) -> str:
         """调用DeepSeek API"""
         headers = {
@@ -601,12 +606,24 @@ class MedicalKGBuilder:
         # 4. 创建关系
         self.create_relationships(kg_data['relationships'])
 
+        # 5. 更新图谱版本, 使后端的问答缓存失效
+        self.mark_graph_updated()
+
         print("=" * 50)
         print("知识图谱构建完成!")
         print("=" * 50)
 
         return kg_data
 
+    def mark_graph_updated(self):
+        """
+        更新元数据节点的构建时间; 后端的图谱版本包含该时间,
+        只修改属性(节点数与关系数不变)时缓存的问答同样会失效
+        """
+        with self.driver.session() as session:
+            session.run("MERGE (m:GraphMeta {key: 'graph'}) SET m.updated_at = $updated_at",
+                        {'updated_at': datetime.utcnow().isoformat()})
+
     def query_graph(self, cypher: str) -> List[Dict]:
         """
         查询图谱
@@ -641,7 +658,7 @@ class MedicalKGBuilder:
             stats['总关系数'] = result.single()['count']
 
             # 统计总节点数
-            result = session.run("MATCH (n) RETURN count(n) as count")
+            result = session.run("MATCH (n) WHERE NOT n:GraphMeta RETURN count(n) as count")
             stats['总节点数'] = result.single()['count']
 
         return stats
@@ -669,6 +686,17 @@ def main():
             json.dump(kg_data, f, ensure_ascii=False, indent=2)
         print("\n知识图谱数据已保存到 knowledge_graph.json")
 
+        # 同时写出后端可直接内存映射的快照(GRAPH_SNAPSHOT_PATH), Neo4j不可用时用于只读服务;
+        # 从Neo4j导出, 包含之前各次构建MERGE累积的数据, 而不只是本次的kg_data。
+        # 通过后端的快照命令行工具在子进程中导出, 构建脚本本身不导入后端(Flask)代码
+        subprocess.run(
+            [sys.executable, '-m', 'backend.app.utils.graph_snapshot', 'dump-neo4j',
+             os.path.abspath('knowledge_graph.kgs')],
+            cwd=os.path.dirname(base_dir), check=True,
+            env=dict(os.environ, NEO4J_URI=NEO4J_URI, NEO4J_USERNAME=NEO4J_USER, NEO4J_PASSWORD=NEO4J_PASSWORD),
+        )
+        print("图谱快照已保存到 knowledge_graph.kgs")
+
         print("\n图谱统计信息:")
         stats = builder.get_statistics()
         for key, value in stats.items():
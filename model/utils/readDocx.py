@@ -1,17 +1,152 @@
+import hashlib
+import json
+import os
 from docx import Document
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
 
-def readDocx(file_path):
+# 解析结果缓存目录, 设为空字符串时不缓存
+DOCX_CACHE_DIR=os.getenv('DOCX_CACHE_DIR',os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'.docx_cache'))
+# 提取格式变化时递增, 使旧的缓存失效
+EXTRACTOR_VERSION=3
+ROW_FIELD_SEPARATOR='；'
+
+
+def _cell_text(cell):
+    """单元格文本, 单元格内的换行与多余空白合并为一个空格"""
+    return ' '.join(cell.text.split())
+
+
+def _unique_cells(row_cells):
+    """
+    行内去重后的单元格: python-docx对横向合并单元格的每个网格位置都返回同一个单元格,
+    按底层的<w:tc>元素在行内去重, 只保留第一次出现的位置;
+    纵向合并的单元格在它覆盖的每一行都保留(如分组列"类别"), 使每行数据都带有所属分组
+    Returns:
+        [(网格列号, 文本)], 不含空单元格
+    """
+    seen=set()
+    cells=[]
+    for column,cell in enumerate(row_cells):
+        if cell._tc in seen:
+            continue
+        seen.add(cell._tc)
+        text=_cell_text(cell)
+        if text:
+            cells.append((column,text))
+    return cells
+
+
+def table_lines(table):
+    """
+    将表格转换为紧凑的文本行
+    - 表头之前的单个单元格(表格标题)与横跨整行的单元格(分组行)单独输出一行
+    - 第一个包含多个单元格的行作为表头, 之后的每一行输出为 "表头: 值；表头: 值",
+      表头本身只在表格没有数据行时输出
+    - 横向合并的单元格在行内只输出一次, 纵向合并的单元格在覆盖的每一行都输出; 空单元格不输出
+    """
+    lines=[]
+    headers=None
+    header_line=None
+    for row in table.rows:
+        row_cells=row.cells
+        cells=_unique_cells(row_cells)
+        if not cells:
+            continue
+        spans_row=all(cell._tc is row_cells[0]._tc for cell in row_cells)
+        if len(cells)==1 and (headers is None or spans_row):
+            lines.append(cells[0][1])
+        elif headers is None:
+            headers={column:_cell_text(cell) for column,cell in enumerate(row_cells)}
+            header_line=ROW_FIELD_SEPARATOR.join(text for _,text in cells)
+        else:
+            header_line=None
+            fields=[]
+            for column,text in cells:
+                header=headers.get(column)
+                fields.append(f"{header}: {text}" if header and header!=text else text)
+            lines.append(ROW_FIELD_SEPARATOR.join(fields))
+    if header_line:
+        lines.append(header_line)
+    return lines
+
+
+def _iter_blocks(doc):
+    """按文档中的先后顺序遍历段落与表格"""
+    for child in doc.element.body.iterchildren():
+        if child.tag==qn('w:p'):
+            yield Paragraph(child,doc)
+        elif child.tag==qn('w:tbl'):
+            yield Table(child,doc)
+
+
+def parseDocx(file_path):
+    """解析DOCX, 段落与表格按原文顺序输出"""
     doc=Document(file_path)
     full_texts=[]
-    for paragraph in doc.paragraphs:
-        if paragraph.text.strip():
-            full_texts.append(paragraph.text)
-
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                if cell.text.strip():
-                    full_texts.append(cell.text)
-
-    document_text='\n'.join(full_texts)
-    return document_text
\ No newline at end of file
+    for block in _iter_blocks(doc):
+        if isinstance(block,Table):
+            full_texts.extend(table_lines(block))
+        elif block.text.strip():
+            full_texts.append(block.text)
+    return '\n'.join(full_texts)
+
+
+def _file_hash(file_path):
+    digest=hashlib.sha256()
+    with open(file_path,'rb') as f:
+        for chunk in iter(lambda: f.read(1<<20),b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path,text):
+    tmp_path=f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path,'w',encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path,path)
+
+
+def _content_hash(file_path,cache_dir):
+    """
+    文件内容的哈希: 路径、大小与修改时间未变时直接使用索引中记录的哈希, 不再读取文件
+    """
+    stat=os.stat(file_path)
+    key=os.path.abspath(file_path)
+    index_path=os.path.join(cache_dir,'index.json')
+    try:
+        with open(index_path,encoding='utf-8') as f:
+            index=json.load(f)
+    except (OSError,ValueError):
+        index={}
+    entry=index.get(key)
+    if entry and entry["size"]==stat.st_size and entry["mtime_ns"]==stat.st_mtime_ns:
+        return entry["sha256"]
+
+    content_hash=_file_hash(file_path)
+    index[key]={"size":stat.st_size,"mtime_ns":stat.st_mtime_ns,"sha256":content_hash}
+    _write_atomic(index_path,json.dumps(index,ensure_ascii=False))
+    return content_hash
+
+
+def readDocx(file_path,cache_dir=DOCX_CACHE_DIR):
+    """
+    读取DOCX文本; 解析结果按文件内容哈希缓存, 文件未修改时直接读取缓存而不解析DOCX
+    (修改时间变化但内容相同的文件, 重新计算哈希后仍可命中缓存)
+    """
+    if not cache_dir:
+        return parseDocx(file_path)
+
+    os.makedirs(cache_dir,exist_ok=True)
+    content_hash=_content_hash(file_path,cache_dir)
+    cache_path=os.path.join(cache_dir,f"{content_hash}.v{EXTRACTOR_VERSION}.txt")
+    try:
+        with open(cache_path,encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        pass
+
+    document_text=parseDocx(file_path)
+    _write_atomic(cache_path,document_text)
+    return document_text